@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# vim: set foldmethod=marker :
+
+# attach_leak.py - check that attaching and detaching widgets does not leak memory
+# Copyright 2026 agent {{{
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# }}}
+
+'''Attach a panel to a gui and detach it again many times, using the null toolkit.
+The memory in use is measured with tracemalloc after a tenth of the
+cycles and at the end. If it grew by more than the limit, or if the
+gui has more names at the end than at the start, the exit status is 1.'''
+
+# Imports. {{{
+import sys
+import os
+import gc
+import time
+import tempfile
+import tracemalloc
+import argparse
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gui
+# }}}
+
+gui_text = '''<Gtk>
+	<def name="Field"><HBox><Label value=":field"/><SpinButton value="var:1" range=":0,100" value-changed="changed:debounce=100"/></HBox></def>
+	<Window><VBox slot="panels"/></Window>
+</Gtk>
+'''
+
+panel = '''<VBox>
+	<Field var="panel_a"/>
+	<Field var="panel_b"/>
+	<Entry value="panel_text" activate="panel_done"/>
+	<RadioButton group=":panel_choice" value="panel_one">one</RadioButton>
+	<RadioButton group=":panel_choice" value="panel_two">two</RadioButton>
+	<Button clicked="panel_close">Close</Button>
+</VBox>'''
+
+def make_gui(): # {{{
+	d = tempfile.mkdtemp()
+	with open(os.path.join(d, 'attach_leak.gui'), 'w') as f:
+		f.write(gui_text)
+	os.environ['GUI_PATH'] = d
+	os.environ['GUI_CACHE'] = ''
+	return gui.Gui('attach_leak', 'attach_leak', toolkit = 'null')
+# }}}
+
+def names(g): # {{{
+	'''Return the number of names in all registries of the gui.'''
+	return sum(len(r) for r in g.__registries__())
+# }}}
+
+def cycle(g, handlers): # {{{
+	'''Attach the panel, use it, and detach it.'''
+	handle = g._attach('panels', panel, events = handlers)
+	g.panel_a = 5
+	g.panel_text = 'text'
+	handle.widgets[0].children[-1].clicked()
+	g._detach(handle)
+# }}}
+
+def main(): # {{{
+	parser = argparse.ArgumentParser(description = __doc__)
+	parser.add_argument('--cycles', type = int, default = 100000, help = 'number of attach and detach cycles')
+	parser.add_argument('--limit', type = int, default = 64, help = 'allowed growth of memory use in KiB')
+	parser.add_argument('--json', action = 'store_true', help = 'write the result as json')
+	args = parser.parse_args()
+	g = make_gui()
+	# A list that grows would be counted as a leak.
+	closed = [0]
+	def close(): # {{{
+		closed[0] += 1
+	# }}}
+	handlers = {'changed': lambda: None, 'panel_done': lambda: None, 'panel_close': close}
+	start_names = names(g)
+	tracemalloc.start()
+	warmup = max(1, args.cycles // 10)
+	start = time.perf_counter()
+	for c in range(warmup):
+		cycle(g, handlers)
+	gc.collect()
+	before = tracemalloc.get_traced_memory()[0]
+	for c in range(args.cycles - warmup):
+		cycle(g, handlers)
+	t = time.perf_counter() - start
+	gc.collect()
+	after = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	result = {'cycles': args.cycles, 'us per cycle': t / args.cycles * 1e6, 'growth KiB': (after - before) / 1024, 'extra names': names(g) - start_names, 'closed': closed[0]}
+	if args.json:
+		print(json.dumps(result))
+	else:
+		for key in result:
+			print('%-15s %10.2f' % (key, result[key]))
+	if result['growth KiB'] > args.limit or result['extra names'] != 0 or closed[0] != args.cycles:
+		sys.exit(1)
+# }}}
+
+if __name__ == '__main__':
+	main()
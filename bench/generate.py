@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# vim: set foldmethod=marker :
+
+# generate.py - write synthetic gui descriptions for benchmarks
+# Copyright 2026 agent {{{
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# }}}
+
+'''Write a gui description with about the requested number of widgets, in one of several shapes.
+Every widget which is not a container is a SpinButton with an input
+name, or a Button with an event name. The names are returned, so the
+gui can be created with them.'''
+
+# Imports. {{{
+import sys
+import argparse
+# }}}
+
+shapes = ('deep', 'table', 'notebook', 'macro', 'mixed')
+
+class Names: # {{{
+	'''The names which are used in a generated gui.'''
+	def __init__(self):
+		self.inputs = []
+		self.events = []
+	def leaf(self):
+		'''Return the markup for the next widget which is not a container.'''
+		if len(self.inputs) <= len(self.events):
+			name = 'v%d' % len(self.inputs)
+			self.inputs.append(name)
+			return '<SpinButton value="%s:1" range=":0,100"/>' % name
+		name = 'e%d' % len(self.events)
+		self.events.append(name)
+		return '<Button clicked="%s">%s</Button>' % (name, name)
+# }}}
+
+def deep(names, size, depth): # {{{
+	'''A VBox with chains of boxes nested depth levels deep, alternately VBox and HBox, with two widgets per level.'''
+	ret = []
+	while size > 0:
+		levels = min(depth, max(1, size // 3))
+		for level in range(levels):
+			ret.append('<%s>%s%s' % ('VBox' if level % 2 == 0 else 'HBox', names.leaf(), names.leaf()))
+		for level in reversed(range(levels)):
+			ret.append('</%s>' % ('VBox' if level % 2 == 0 else 'HBox'))
+		size -= 3 * levels
+	return '<VBox>%s</VBox>' % ''.join(ret)
+# }}}
+
+def table(names, size, columns): # {{{
+	'''One Table with the given number of columns.'''
+	return '<Table columns="%d">%s</Table>' % (columns, ''.join(names.leaf() for i in range(size)))
+# }}}
+
+def notebook(names, size, per_page): # {{{
+	'''A Notebook with pages of per_page widgets.'''
+	pages = []
+	for p in range(max(1, size // (per_page + 1))):
+		pages.append('<VBox label=":page %d">%s</VBox>' % (p, ''.join(names.leaf() for i in range(per_page))))
+	return '<Notebook>%s</Notebook>' % ''.join(pages)
+# }}}
+
+def macro(names, size, nesting): # {{{
+	'''Uses of a macro which contains nesting levels of other macros.
+	The innermost macro is a labeled SpinButton; every other level
+	puts the level below it in a VBox with a Label.'''
+	defs = ['<def name="Field0"><HBox><Label value=":field"/><SpinButton value="var:1" range=":0,100"/></HBox></def>']
+	for level in range(1, nesting):
+		defs.append('<def name="Field%d"><VBox><Label value=":level %d"/><Field%d var="var"/></VBox></def>' % (level, level, level - 1))
+	uses = []
+	for u in range(max(1, size // (3 + 2 * (nesting - 1)))):
+		name = 'm%d' % u
+		names.inputs.append(name)
+		uses.append('<Field%d var="%s"/>' % (nesting - 1, name))
+	return ''.join(defs), '<VBox>%s</VBox>' % ''.join(uses)
+# }}}
+
+def generate(shape, size, depth = 20, columns = 10, per_page = 20, nesting = 1): # {{{
+	'''Return (text, inputs, events) for a gui of the given shape with about size widgets.'''
+	names = Names()
+	defs = ''
+	if shape == 'deep':
+		body = deep(names, size, depth)
+	elif shape == 'table':
+		body = table(names, size, columns)
+	elif shape == 'notebook':
+		body = notebook(names, size, per_page)
+	elif shape == 'macro':
+		defs, body = macro(names, size, nesting)
+	elif shape == 'mixed':
+		defs, m = macro(names, size // 4, nesting)
+		body = '<VBox>%s%s%s%s</VBox>' % (deep(names, size // 4, depth), table(names, size // 4, columns), notebook(names, size // 4, per_page), m)
+	else:
+		raise ValueError('unknown shape %s' % shape)
+	text = '<Gtk>\n%s\n<Window title=":%s"><ScrolledWindow>%s</ScrolledWindow></Window>\n</Gtk>\n' % (defs, shape, body)
+	return text, names.inputs, names.events
+# }}}
+
+def main(): # {{{
+	parser = argparse.ArgumentParser(description = __doc__)
+	parser.add_argument('shape', choices = shapes, help = 'shape of the gui')
+	parser.add_argument('--size', type = int, default = 3000, help = 'approximate number of widgets')
+	parser.add_argument('--depth', type = int, default = 20, help = 'nesting depth of deep boxes')
+	parser.add_argument('--columns', type = int, default = 10, help = 'number of Table columns')
+	parser.add_argument('--per-page', type = int, default = 20, help = 'number of widgets per Notebook page')
+	parser.add_argument('--nesting', type = int, default = 1, help = 'nesting depth of macros')
+	args = parser.parse_args()
+	sys.stdout.write(generate(args.shape, args.size, args.depth, args.columns, args.per_page, args.nesting)[0])
+# }}}
+
+if __name__ == '__main__':
+	main()
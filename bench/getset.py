@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# vim: set foldmethod=marker :
+
+# getset.py - measure the speed of reading and writing gui variables
+# Copyright 2026 agent {{{
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# }}}
+
+'''Measure get and set throughput on a gui with many SpinButtons, using the null toolkit.
+The dispatch that was used before the callbacks were compiled is measured as well, for comparison.'''
+
+# Imports. {{{
+import sys
+import os
+import time
+import tempfile
+import argparse
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gui
+# }}}
+
+def make_gui(widgets): # {{{
+	'''Create a gui with the given number of SpinButtons, named v0, v1, ...'''
+	names = ['v%d' % i for i in range(widgets)]
+	d = tempfile.mkdtemp()
+	with open(os.path.join(d, 'getset.gui'), 'w') as f:
+		f.write('<Gtk><Window><VBox>\n')
+		for name in names:
+			f.write('<SpinButton value="%s:0" range=":0,1000"/>\n' % name)
+		f.write('</VBox></Window></Gtk>\n')
+	os.environ['GUI_PATH'] = d
+	os.environ['GUI_CACHE'] = ''
+	return gui.Gui('getset', 'getset', toolkit = 'null', inputs = names), names
+# }}}
+
+def legacy_get(g, name): # {{{
+	'''The attribute lookup as it was done before the callbacks were compiled.'''
+	if name.startswith('__'):
+		raise AttributeError(name)
+	if not name in g.__get__:
+		raise AttributeError
+	if g.__get__[name][0] is None:
+		return g.__get__[name][1]
+	if g.__get__[name][1] is gui.NO_ARG:
+		return g.__get__[name][0] ()
+	else:
+		return g.__get__[name][0] (g.__get__[name][1])
+# }}}
+
+def legacy_set(g, name, value): # {{{
+	'''The attribute assignment as it was done before the callbacks were compiled.'''
+	if name.startswith('_'):
+		g.__dict__[name] = value
+	elif name in g.__set__:
+		if g.__set__[name][1] is gui.NO_ARG:
+			g.__set__[name][0] (value)
+		else:
+			g.__set__[name][0] (g.__set__[name][1], value)
+# }}}
+
+class Legacy(gui.Gui): # {{{
+	'''Gui class with the old attribute access, to be used on an existing Gui object.'''
+	__getattr__ = legacy_get
+	__setattr__ = legacy_set
+# }}}
+
+def run(g, names, rounds): # {{{
+	'''Time all access methods; return a dict of million operations per second.'''
+	getters = [g._getter(name) for name in names]
+	setters = [g._setter(name) for name in names]
+	# The same object, with the old attribute access.
+	legacy = object.__new__(Legacy)
+	object.__setattr__(legacy, '__dict__', g.__dict__)
+	tests = {
+		'get legacy': lambda: [getattr(legacy, name) for name in names],
+		'get attribute': lambda: [getattr(g, name) for name in names],
+		'get compiled': lambda: [f() for f in getters],
+		'set legacy': lambda: [setattr(legacy, name, 1.5) for name in names],
+		'set attribute': lambda: [setattr(g, name, 1.5) for name in names],
+		'set string': lambda: [setattr(g, name, '1.5') for name in names],
+		'set native': lambda: [f(1.5) for f in setters],
+		}
+	ret = {}
+	for test in tests:
+		f = tests[test]
+		start = time.perf_counter()
+		for r in range(rounds):
+			f()
+		t = time.perf_counter() - start
+		ret[test] = rounds * len(names) / t / 1e6
+	return ret
+# }}}
+
+def main(): # {{{
+	parser = argparse.ArgumentParser(description = __doc__)
+	parser.add_argument('--widgets', type = int, default = 200, help = 'number of SpinButtons')
+	parser.add_argument('--rounds', type = int, default = 500, help = 'number of times every variable is accessed')
+	parser.add_argument('--json', action = 'store_true', help = 'write the result as json')
+	args = parser.parse_args()
+	g, names = make_gui(args.widgets)
+	result = run(g, names, args.rounds)
+	if args.json:
+		print(json.dumps(result))
+	else:
+		for test in result:
+			print('%-15s %8.2f M/s' % (test, result[test]))
+# }}}
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# vim: set foldmethod=marker :
+
+# import_time.py - measure the time needed for "import gui"
+# Copyright 2026 agent {{{
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# }}}
+
+'''Measure how long "import gui" takes, in a fresh interpreter for every run.
+The module must not import the toolkit; if it does, or if the median time is
+above the limit, the exit status is 1.'''
+
+# Imports. {{{
+import sys
+import os
+import argparse
+import subprocess
+import py_compile
+import json
+# }}}
+
+# The code that runs in the child interpreter. It prints the import time in seconds and whether gi was imported.
+child = '''
+import sys, time
+sys.path.insert(0, %r)
+start = time.perf_counter()
+import gui
+end = time.perf_counter()
+print(end - start, 'gi' in sys.modules)
+'''
+
+def measure(runs): # {{{
+	'''Import the module in runs new interpreters; return the times and whether gi was ever imported.'''
+	src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	# Make sure the byte code is up to date, so it is not compiled on every run.
+	py_compile.compile(os.path.join(src, 'gui.py'))
+	times = []
+	gi = False
+	for r in range(runs):
+		out = subprocess.check_output((sys.executable, '-c', child % src)).split()
+		times.append(float(out[0]))
+		gi = gi or out[1] == b'True'
+	times.sort()
+	return times, gi
+# }}}
+
+def main(): # {{{
+	parser = argparse.ArgumentParser(description = __doc__)
+	parser.add_argument('--runs', type = int, default = 20, help = 'number of imports to time')
+	parser.add_argument('--limit', type = float, default = 50, help = 'maximum allowed median import time in ms')
+	parser.add_argument('--json', action = 'store_true', help = 'write the result as json')
+	args = parser.parse_args()
+	times, gi = measure(args.runs)
+	result = {'runs': args.runs, 'median_ms': times[len(times) // 2] * 1e3, 'min_ms': times[0] * 1e3, 'max_ms': times[-1] * 1e3, 'toolkit_imported': gi}
+	if args.json:
+		print(json.dumps(result))
+	else:
+		print('import gui: median %(median_ms).2f ms, min %(min_ms).2f ms, max %(max_ms).2f ms over %(runs)d runs' % result)
+	ok = True
+	if gi:
+		sys.stderr.write('Error: importing gui imports the toolkit\n')
+		ok = False
+	if result['median_ms'] > args.limit:
+		sys.stderr.write('Error: median import time is above %.2f ms\n' % args.limit)
+		ok = False
+	return 0 if ok else 1
+# }}}
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# vim: set foldmethod=marker :
+
+# macro_scaling.py - measure how applying defs scales with the number of uses
+# Copyright 2026 agent {{{
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# }}}
+
+'''Measure the time to apply defs to a gui with an increasing number of uses of a nested macro in one VBox.
+The time per use should stay the same. The way defs were applied
+before they were compiled into templates is measured as well, for
+comparison; it splices every expansion into the child list.'''
+
+# Imports. {{{
+import sys
+import os
+import time
+import gc
+import argparse
+import json
+import xml.etree.ElementTree as ET
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gui
+# }}}
+
+def make_gui(uses, nesting): # {{{
+	'''Return the text of a gui with uses uses of a macro in a VBox.
+	The macros put their elements directly in the VBox, so the child
+	list grows with every expansion.'''
+	defs = ['<def name="Field0"><Label value=":field"/><SpinButton value="var:1" range=":0,100"/></def>']
+	for level in range(1, nesting):
+		defs.append('<def name="Field%d"><Label value=":level %d"/><Field%d var="var"/></def>' % (level, level, level - 1))
+	body = ''.join('<Field%d var="m%d"/>' % (nesting - 1, u) for u in range(uses))
+	return '<Gtk>%s<Window><VBox>%s</VBox></Window></Gtk>' % (''.join(defs), body)
+# }}}
+
+class Legacy: # {{{
+	'''The def expansion as it was done before templates.'''
+	__element__ = gui.Gui.__element__
+	__parse__ = gui.Gui.__parse__
+	def __init__(self):
+		self.__defs__ = {}
+	def __expand__(self, tree): # {{{
+		i = 0
+		while i < len(tree.children):
+			w = tree.children[i]
+			if w.tag != 'def':
+				i += self.__apply_defs__(tree, i)
+				continue
+			self.__defs__[w.attributes['name']] = w.children
+			i += 1
+		tree.children = [w for w in tree.children if w.tag != 'def']
+		return tree
+	# }}}
+	def __copy_def__(self, tags, attrs): # {{{
+		ret = []
+		for t in tags:
+			rattrs = {}
+			for a in t.attributes:
+				val = t.attributes[a]
+				if ':' in val:
+					n, d = val.split(':', 1)
+					if n in attrs:
+						if ':' in attrs[n]:
+							rattrs[a] = attrs[n]
+						else:
+							rattrs[a] = '%s:%s' % (attrs[n], d)
+					else:
+						rattrs[a] = val
+				elif val in attrs:
+					rattrs[a] = attrs[val]
+				else:
+					rattrs[a] = val
+			children = self.__copy_def__(t.children, attrs)
+			ret.append(self.__element__(t.tag, rattrs, children))
+		return ret
+	# }}}
+	def __apply_defs__(self, parent, idx): # {{{
+		if parent.children[idx].tag in self.__defs__:
+			subst = self.__copy_def__(self.__defs__[parent.children[idx].tag], parent.children[idx].attributes)
+			parent.children[idx:idx + 1] = subst
+			return 0
+		i = 0
+		while i < len(parent.children[idx].children):
+			i += self.__apply_defs__(parent.children[idx], i)
+		return 1
+	# }}}
+# }}}
+
+class Current: # {{{
+	'''Object with the attributes that Gui.__expand__ uses.'''
+	__element__ = gui.Gui.__element__
+	__parse__ = gui.Gui.__parse__
+	__apply_defs__ = gui.Gui.__apply_defs__
+	__expand__ = gui.Gui.__expand__
+	def __init__(self):
+		self.__defs__ = {}
+# }}}
+
+def measure(cls, root, runs): # {{{
+	'''Return the median time in seconds to apply the defs to the parsed root.'''
+	times = []
+	for r in range(runs):
+		expander = cls()
+		tree = expander.__parse__(root)
+		# Garbage collection runs take time that grows with the number of objects.
+		gc.collect()
+		gc.disable()
+		start = time.perf_counter()
+		expander.__expand__(tree)
+		times.append(time.perf_counter() - start)
+		gc.enable()
+	times.sort()
+	return times[len(times) // 2]
+# }}}
+
+def main(): # {{{
+	parser = argparse.ArgumentParser(description = __doc__)
+	parser.add_argument('--uses', type = int, nargs = '+', default = (250, 500, 1000, 2000, 4000), help = 'numbers of macro uses')
+	parser.add_argument('--nesting', type = int, default = 3, help = 'nesting depth of the macro')
+	parser.add_argument('--runs', type = int, default = 5, help = 'number of runs per measurement')
+	parser.add_argument('--legacy', action = 'store_true', help = 'also measure the old expansion')
+	parser.add_argument('--json', action = 'store_true', help = 'write the result as json')
+	args = parser.parse_args()
+	result = []
+	for uses in args.uses:
+		root = ET.fromstring(make_gui(uses, args.nesting))
+		item = {'uses': uses, 'current': measure(Current, root, args.runs) / uses * 1e6}
+		if args.legacy:
+			item['legacy'] = measure(Legacy, root, args.runs) / uses * 1e6
+		result.append(item)
+		if not args.json:
+			print('%6d uses: %8.2f us/use' % (uses, item['current']) + ('   legacy %8.2f us/use' % item['legacy'] if args.legacy else ''))
+	if args.json:
+		print(json.dumps(result))
+# }}}
+
+if __name__ == '__main__':
+	main()
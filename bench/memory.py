@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# vim: set foldmethod=marker :
+
+# memory.py - measure the memory that is used by a large gui
+# Copyright 2026 agent {{{
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# }}}
+
+'''Build a gui made by generate.py and report the Python memory it uses, in total and per tag (from Gui._memory).
+Only memory that is allocated by Python is counted; with gtk, the
+memory of the widgets themselves is not included.'''
+
+# Imports. {{{
+import sys
+import os
+import gc
+import time
+import tempfile
+import tracemalloc
+import argparse
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gui
+import generate
+# }}}
+
+def run(shape, size, toolkit): # {{{
+	text, inputs, events = generate.generate(shape, size)
+	d = tempfile.mkdtemp()
+	with open(os.path.join(d, 'memory.gui'), 'w') as f:
+		f.write(text)
+	os.environ['GUI_PATH'] = d
+	os.environ['GUI_CACHE'] = ''
+	# Load the toolkit before measuring.
+	gui.get_toolkit(toolkit)
+	gc.collect()
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	start = time.perf_counter()
+	g = gui.Gui('memory', 'memory', toolkit = toolkit, inputs = inputs, events = {name: None for name in events})
+	t = time.perf_counter() - start
+	gc.collect()
+	total = tracemalloc.get_traced_memory()[0] - before
+	tags = g._memory()
+	tracemalloc.stop()
+	return {'widgets': len(inputs) + len(events), 'build s': t, 'total KiB': total / 1024, 'bytes per name': total / (len(inputs) + len(events)), 'tags': tags}
+# }}}
+
+def main(): # {{{
+	parser = argparse.ArgumentParser(description = __doc__)
+	parser.add_argument('shape', nargs = '?', default = 'mixed', choices = generate.shapes, help = 'shape of the gui')
+	parser.add_argument('--size', type = int, default = 10000, help = 'approximate number of widgets')
+	parser.add_argument('--toolkit', default = 'null', help = 'toolkit to use (null or gtk)')
+	parser.add_argument('--json', action = 'store_true', help = 'write the result as json')
+	args = parser.parse_args()
+	result = run(args.shape, args.size, args.toolkit)
+	if args.json:
+		print(json.dumps(result))
+		return
+	for key in result:
+		if key != 'tags':
+			print('%-15s %12.2f' % (key, result[key]))
+	for tag in sorted(result['tags'], key = lambda t: -result['tags'][t]['bytes']):
+		info = result['tags'][tag]
+		print('%-15s %6d x %8.0f bytes = %8.1f KiB' % (tag, info['count'], info['bytes'] / info['count'], info['bytes'] / 1024))
+# }}}
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# vim: set foldmethod=marker :
+
+# suite.py - time the phases of creating and using a gui
+# Copyright 2026 agent {{{
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# }}}
+
+'''Time the phases of creating and using guis of several shapes, made by generate.py.
+The phases are parsing the XML (__parse__), applying the defs
+(__expand__ and __apply_defs__), loading the expanded tree from the
+cache or from a module written by compile_gui instead, building the
+widgets (__build__),
+reading and writing all inputs, and dispatching all events. The
+median time of each phase over several runs is reported in
+milliseconds. The results can be written as JSON, and compared with
+a previous result; if a phase became slower than the tolerance
+allows, the exit status is 1. The null toolkit is used by default;
+to measure Gtk without a display, run this under xvfb-run with
+--toolkit gtk.'''
+
+# Imports. {{{
+import sys
+import os
+import time
+import tempfile
+import argparse
+import platform
+import json
+import xml.etree.ElementTree as ET
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gui
+import generate
+# }}}
+
+class Prebuilt(gui.Gui): # {{{
+	'''Gui which takes its expanded tree from a list instead of reading the file, so only building is timed.'''
+	trees = []
+	def __load__(self, filename):
+		return self.trees.pop()
+# }}}
+
+def median(f, runs): # {{{
+	'''Call f runs times; return the median time in milliseconds.'''
+	times = []
+	for r in range(runs):
+		start = time.perf_counter()
+		f()
+		times.append((time.perf_counter() - start) * 1e3)
+	times.sort()
+	return times[len(times) // 2]
+# }}}
+
+def run(shape, args): # {{{
+	'''Time all phases for one shape; return a dict of phase names to milliseconds.'''
+	text, inputs, events = generate.generate(shape, args.size, args.depth, args.columns, args.per_page, args.nesting)
+	d = tempfile.mkdtemp()
+	filename = os.path.join(d, shape + os.extsep + 'gui')
+	with open(filename, 'w') as f:
+		f.write(text)
+	os.environ['GUI_PATH'] = d
+	os.environ['GUI_CACHE'] = ''
+	handlers = {name: lambda: None for name in events}
+	g = gui.Gui(shape, shape, toolkit = args.toolkit, events = handlers, inputs = inputs)
+	ret = {}
+	root = ET.parse(filename).getroot()
+	ret['parse'] = median(lambda: (ET.parse(filename), g.__parse__(root)), args.runs)
+	trees = [g.__parse__(root) for r in range(args.runs)]
+	def expand(): # {{{
+		g.__defs__ = {}
+		g.__expand__(trees.pop())
+	# }}}
+	ret['apply_defs'] = median(expand, args.runs)
+	os.environ['GUI_CACHE'] = os.path.join(d, 'cache')
+	def load(): # {{{
+		g.__defs__ = {}
+		g.__load__(filename)
+	# }}}
+	# The first load writes the cache.
+	load()
+	ret['cache_hit'] = median(load, args.runs)
+	os.environ['GUI_CACHE'] = ''
+	# Without a cache entry, the module from compile_gui is used.
+	gui.compile_gui(filename)
+	ret['compiled'] = median(load, args.runs)
+	os.remove(gui.compiled_path(filename))
+	g.__defs__ = {}
+	packed = g.__expand__(g.__parse__(root)).pack()
+	Prebuilt.trees = [gui.Gui.__element__.unpack(packed) for r in range(args.runs)]
+	ret['build'] = median(lambda: Prebuilt(shape, shape, toolkit = args.toolkit, events = handlers, inputs = inputs), args.runs)
+	ret['get'] = median(lambda: [getattr(g, name) for name in inputs], args.runs)
+	ret['set'] = median(lambda: [setattr(g, name, 2) for name in inputs], args.runs)
+	ret['events'] = median(lambda: [g.__event_cb__(None, name) for name in events], args.runs)
+	ret['names'] = len(inputs) + len(events)
+	return ret
+# }}}
+
+def compare(result, baseline, tolerance): # {{{
+	'''Print the phases which became slower than baseline allows; return whether there were any.'''
+	slower = False
+	for shape in result['shapes']:
+		if shape not in baseline['shapes']:
+			continue
+		for phase, t in result['shapes'][shape].items():
+			old = baseline['shapes'][shape].get(phase)
+			if phase == 'names' or old is None or old <= 0:
+				continue
+			if t > old * (1 + tolerance):
+				print('%s %s: %.3f ms, was %.3f ms (+%.0f%%)' % (shape, phase, t, old, (t / old - 1) * 100))
+				slower = True
+	return slower
+# }}}
+
+def main(): # {{{
+	parser = argparse.ArgumentParser(description = __doc__)
+	parser.add_argument('shapes', nargs = '*', default = generate.shapes, help = 'shapes to measure (default: all)')
+	parser.add_argument('--size', type = int, default = 3000, help = 'approximate number of widgets')
+	parser.add_argument('--depth', type = int, default = 20, help = 'nesting depth of deep boxes')
+	parser.add_argument('--columns', type = int, default = 10, help = 'number of Table columns')
+	parser.add_argument('--per-page', type = int, default = 20, help = 'number of widgets per Notebook page')
+	parser.add_argument('--nesting', type = int, default = 3, help = 'nesting depth of macros')
+	parser.add_argument('--runs', type = int, default = 5, help = 'number of runs per phase')
+	parser.add_argument('--toolkit', default = 'null', help = 'toolkit to use (null or gtk)')
+	parser.add_argument('--output', help = 'file to write the result to, as json')
+	parser.add_argument('--baseline', help = 'json file with an earlier result to compare with')
+	parser.add_argument('--tolerance', type = float, default = .2, help = 'fraction by which a phase may be slower than the baseline')
+	args = parser.parse_args()
+	result = {'python': platform.python_version(), 'toolkit': args.toolkit, 'size': args.size, 'shapes': {}}
+	for shape in args.shapes:
+		result['shapes'][shape] = run(shape, args)
+		print('%-10s %s' % (shape, '  '.join('%s %.3f' % (phase, t) if phase != 'names' else '%s %d' % (phase, t) for phase, t in result['shapes'][shape].items())))
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(result, f, indent = '\t')
+	if args.baseline:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+		if compare(result, baseline, args.tolerance):
+			sys.exit(1)
+# }}}
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# vim: set foldmethod=marker :
+
+# table_scroll.py - measure scrolling through a large DataTable
+# Copyright 2026 agent {{{
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# }}}
+
+'''Measure the time per frame while scrolling through a DataTable with many rows, and the time to sort and filter it.
+With the null toolkit, a frame is computing the visible rows; with gtk, it is also painting them to an image surface.
+NumPy is used for the data if it is available.'''
+
+# Imports. {{{
+import sys
+import os
+import time
+import tempfile
+import argparse
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gui
+# }}}
+
+def make_data(rows): # {{{
+	'''Create the table data: an id, a value and a category per row.'''
+	try:
+		import numpy
+	except ImportError:
+		return [(r, (r * 7919) % 1000003 / 1000., 'c%d' % (r % 13)) for r in range(rows)]
+	data = numpy.zeros(rows, dtype = [('id', 'i8'), ('value', 'f8'), ('category', 'U4')])
+	data['id'] = numpy.arange(rows)
+	data['value'] = (data['id'] * 7919) % 1000003 / 1000.
+	data['category'] = numpy.char.add('c', (data['id'] % 13).astype('U2'))
+	return data
+# }}}
+
+def make_gui(toolkit): # {{{
+	'''Create a gui with one DataTable; return the gui and the table widget.'''
+	d = tempfile.mkdtemp()
+	with open(os.path.join(d, 'table_scroll.gui'), 'w') as f:
+		f.write('<Gtk><Window><DataTable columns=":id,value,category" data="rows" sort="sort" filter="filter"/></Window></Gtk>\n')
+	os.environ['GUI_PATH'] = d
+	os.environ['GUI_CACHE'] = ''
+	tables = []
+	class Table(gui.get_toolkit(toolkit).builtins['DataTable']):
+		def __init__(self, g):
+			super().__init__(g)
+			tables.append(self)
+	g = gui.Gui('table_scroll', 'table_scroll', toolkit = toolkit, widgets = {'DataTable': Table}, inputs = ('rows', 'sort', 'filter'))
+	return g, tables[0]
+# }}}
+
+def frame(table, toolkit, first, surface): # {{{
+	'''Show the page of rows starting at first.'''
+	table.first = first
+	if toolkit == 'gtk':
+		import cairo
+		table.paint(cairo.Context(surface), surface.get_width(), surface.get_height())
+	else:
+		table.shown()
+# }}}
+
+def run(rows, frames, toolkit): # {{{
+	'''Return a dict of timings in milliseconds.'''
+	g, table = make_gui(toolkit)
+	data = make_data(rows)
+	ret = {}
+	start = time.perf_counter()
+	g.rows = data
+	ret['set data'] = (time.perf_counter() - start) * 1e3
+	surface = None
+	if toolkit == 'gtk':
+		import cairo
+		surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 800, 600)
+		frame(table, toolkit, 0, surface)
+	def scroll(name): # {{{
+		times = []
+		step = max(1, len(table.table) // frames)
+		for i in range(frames):
+			start = time.perf_counter()
+			frame(table, toolkit, i * step, surface)
+			times.append((time.perf_counter() - start) * 1e3)
+		times.sort()
+		ret[name + ' median'] = times[len(times) // 2]
+		ret[name + ' max'] = times[-1]
+	# }}}
+	scroll('frame')
+	start = time.perf_counter()
+	g.sort = '-value'
+	ret['sort'] = (time.perf_counter() - start) * 1e3
+	scroll('sorted frame')
+	if isinstance(data, list):
+		f = lambda row: row[2] == 'c3'
+	else:
+		f = data['category'] == 'c3'
+	start = time.perf_counter()
+	g.filter = f
+	ret['filter'] = (time.perf_counter() - start) * 1e3
+	scroll('filtered frame')
+	return ret
+# }}}
+
+def main(): # {{{
+	parser = argparse.ArgumentParser(description = __doc__)
+	parser.add_argument('--rows', type = int, default = 1000000, help = 'number of rows in the table')
+	parser.add_argument('--frames', type = int, default = 200, help = 'number of frames to scroll through the table')
+	parser.add_argument('--toolkit', default = 'null', help = 'toolkit to use (null or gtk)')
+	parser.add_argument('--json', action = 'store_true', help = 'write the result as json')
+	args = parser.parse_args()
+	result = run(args.rows, args.frames, args.toolkit)
+	if args.json:
+		print(json.dumps(result))
+	else:
+		for test in result:
+			print('%-22s %10.3f ms' % (test, result[test]))
+# }}}
+
+if __name__ == '__main__':
+	main()
@@ -21,14 +21,27 @@
 # Imports. {{{
 import sys
 import os
-import xml.etree.ElementTree as ET
-import gi
-gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk
+import time
+import math
+import heapq
+import marshal
+import threading
+import contextlib
+import functools
+import collections
+import types
 import fhs
 # }}}
 
 # Global helper stuff {{{
+# Module version; part of the key for compiled gui descriptions. {{{
+__version__ = '0.1'
+# }}}
+
+# Format of the cached gui descriptions; change it whenever the stored data changes. {{{
+CACHE_FORMAT = 2
+# }}}
+
 # Sentinel object for specifying "no argument". {{{
 NO_ARG = object()
 # }}}
@@ -53,10 +66,10 @@ def find_path(name, packagename): # {{{
 	# Allow overriding with environment keys.
 	d = os.getenv('GUI_PATH_' + packagename.upper())
 	if d is not None and os.path.exists(os.path.join(d, name)):
-		return d
+		return os.path.join(d, name)
 	d = os.getenv('GUI_PATH')
 	if d is not None and os.path.exists(os.path.join(d, name)):
-		return d
+		return os.path.join(d, name)
 	ret = fhs.read_data(name, opened = False, packagename = packagename)
 	if ret is not None:
 		return ret
@@ -65,6 +78,36 @@ def find_path(name, packagename): # {{{
 	return None
 # }}}
 
+def program_names(packagename, execname): # {{{
+	'''Return packagename and execname, using defaults for the ones that are not set.
+	execname defaults to the name of the running program, without .py;
+	packagename defaults to execname.'''
+	if not execname:
+		execname = os.path.basename(sys.argv[0])
+		e = os.extsep + 'py'
+		if execname.endswith(e):
+			execname = execname[:-len(e)]
+	if not packagename:
+		packagename = execname
+	return packagename, execname
+# }}}
+
+def compiled_path(filename): # {{{
+	'''Return the name of the compiled module for the gui description in filename.
+	For foo.gui, it is foo_gui.py in the same directory.'''
+	return os.path.splitext(filename)[0] + '_gui' + os.extsep + 'py'
+# }}}
+
+def cache_dir(): # {{{
+	'''Return the directory for compiled gui descriptions, or None if caching is disabled.
+	The environment variable GUI_CACHE overrides the default; setting it to an empty string disables the cache.'''
+	d = os.getenv('GUI_CACHE')
+	if d is not None:
+		return d or None
+	d = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+	return os.path.join(d, 'python-gui')
+# }}}
+
 def as_bool(value): # {{{
 	'''Internal function to create a bool from a str. Str must be 'True' or 'False'.'''
 	if isinstance(value, str):
@@ -79,29 +122,661 @@ def parse_nums(r): # {{{
 	r = [float(x) for x in r]
 	return r
 # }}}
+
+def parse_event(value): # {{{
+	'''Internal function to split an event attribute into the event name and its options.
+	Options follow the name after a ':' and are separated by commas; they
+	are either a key or key=value, as in "changed:debounce=200,leading".
+	Returns the name and a dict of options; keys without a value map to True.'''
+	name, sep, rest = value.partition(':')
+	options = {}
+	if sep:
+		for option in rest.split(','):
+			key, sep, v = option.strip().partition('=')
+			options[key] = v if sep else True
+	return name, options
+# }}}
+
+@contextlib.contextmanager
+def gc_paused(): # {{{
+	'''Internal context manager to stop the garbage collector while a large tree of objects without cycles is created.
+	Otherwise the collector runs many times while the tree grows, and it
+	takes most of the time.'''
+	import gc
+	enabled = gc.isenabled()
+	gc.disable()
+	try:
+		yield
+	finally:
+		if enabled:
+			gc.enable()
+# }}}
+# }}}
+
+class Background: # {{{
+	'''Event handler which runs outside of the main loop.
+	Use it as a value in the events dict of Gui, or use the background
+	option of an event in the gui description.
+	callback is called in a worker thread, or in a worker process if
+	process is True; its arguments and return value must then be
+	picklable. When it returns, its return value is written to the set
+	name result and passed to done, if they are given; this is done
+	from the main loop.
+	busy selects what happens if the event fires while an earlier call
+	is running: with 'queue', another call is started; with 'skip', the
+	event is ignored; with 'replace', the new call is started when the
+	running one returns, the result of the running call is dropped, and
+	a call which was already waiting is replaced.'''
+	def __init__(self, callback = None, done = None, result = None, process = False, busy = 'queue'): # {{{
+		nice_assert(busy in ('queue', 'skip', 'replace'), 'invalid busy option for background event: %s' % busy)
+		self.callback = callback
+		self.done = done
+		self.result = result
+		self.process = process
+		self.busy = busy
+		# The last call that was started, and the (callback, args, kwargs) of the call that waits for it.
+		self.future = None
+		self.waiting = None
+	# }}}
+	def copy(self): # {{{
+		'''Return a new Background with the same settings, which is not running.'''
+		return Background(self.callback, self.done, self.result, self.process, self.busy)
+	# }}}
+# }}}
+
+class RateLimit: # {{{
+	'''Limit the rate at which an event handler is called.
+	mode is 'debounce' or 'throttle'; interval is in milliseconds.
+	A debounced handler is called when the event has not fired for interval ms.
+	A throttled handler is called at most once every interval ms.
+	leading and trailing select whether the handler is called at the start
+	and at the end of a burst of events; a trailing call uses the arguments
+	of the last event.'''
+	def __init__(self, GLib, mode, interval, leading, trailing): # {{{
+		self.GLib = GLib
+		self.mode = mode
+		self.interval = interval
+		self.leading = leading
+		self.trailing = trailing
+		self.source = None
+		self.pending = None
+	# }}}
+	def __call__(self, call, *args): # {{{
+		'''Handle an event; call(*args) runs the handler.'''
+		if self.source is None:
+			if self.leading:
+				call(*args)
+				self.pending = None
+			else:
+				self.pending = (call, args)
+		else:
+			self.pending = (call, args)
+			if self.mode != 'debounce':
+				return
+			# Restart the timer.
+			self.GLib.source_remove(self.source)
+		self.source = self.GLib.timeout_add(self.interval, self.timeout)
+	# }}}
+	def timeout(self): # {{{
+		'''Internal callback for the end of an interval.'''
+		self.source = None
+		if self.pending is None:
+			return False
+		call, args = self.pending
+		self.pending = None
+		if self.trailing:
+			call(*args)
+			if self.mode == 'throttle':
+				# Don't allow another call within the interval.
+				self.source = self.GLib.timeout_add(self.interval, self.timeout)
+		return False
+	# }}}
+# }}}
+
+def numpy_module(data): # {{{
+	'''Return the numpy module if data is a NumPy array, otherwise None.
+	NumPy is not imported by this module: if data is an array, it has already been imported.'''
+	numpy = sys.modules.get('numpy')
+	if numpy is not None and isinstance(data, numpy.ndarray):
+		return numpy
+	return None
+# }}}
+
+class RowColumn: # {{{
+	'''Internal view of one column of a sequence of rows.'''
+	__slots__ = ('rows', 'column')
+	def __init__(self, rows, column): # {{{
+		self.rows = rows
+		self.column = column
+	# }}}
+	def __getitem__(self, row): # {{{
+		return self.rows[row][self.column]
+	# }}}
+	def __len__(self): # {{{
+		return len(self.rows)
+	# }}}
+# }}}
+
+class TableData: # {{{
+	'''Rows of a table, for the DataTable widgets.
+	The data is a sequence of rows, a dict of columns, or a NumPy array
+	(two-dimensional, or one-dimensional with named fields). It is not
+	copied. Sorting and filtering create a view: a list or array of the
+	indices of the visible rows in the data. Rows are only read from the
+	data when they are requested with window.'''
+	def __init__(self): # {{{
+		self.data = None
+		self.columns = []
+		self.names = None
+		self.titles = None
+		self.length = 0
+		# The sort column as it was given (a title or an index), and its index once there is data.
+		self.sort_key = None
+		self.sort_column = None
+		self.sort_reverse = False
+		self.filter = None
+		self.view = None
+	# }}}
+	def set_data(self, data): # {{{
+		self.data = data
+		numpy = numpy_module(data)
+		names = None
+		if data is None:
+			self.columns = []
+			self.length = 0
+		elif numpy is not None and data.dtype.names is not None:
+			names = list(data.dtype.names)
+			self.columns = [data[name] for name in names]
+			self.length = len(data)
+		elif numpy is not None and data.ndim == 2:
+			self.columns = [data[:, c] for c in range(data.shape[1])]
+			self.length = data.shape[0]
+		elif numpy is not None:
+			self.columns = [data]
+			self.length = len(data)
+		elif isinstance(data, dict):
+			names = list(data.keys())
+			self.columns = [data[name] for name in names]
+			self.length = len(self.columns[0]) if len(self.columns) > 0 else 0
+		else:
+			self.length = len(data)
+			self.columns = [RowColumn(data, c) for c in range(len(data[0]) if self.length > 0 else 0)]
+		self.names = names
+		self.update()
+		self.check_sort()
+	# }}}
+	def get_titles(self): # {{{
+		'''Return the column titles: the ones that were set, or else the field names, or else the column numbers.'''
+		if self.titles is not None:
+			return self.titles
+		if self.names is not None:
+			return self.names
+		return [str(c) for c in range(len(self.columns))]
+	# }}}
+	def set_sort(self, value): # {{{
+		'''Sort by a column, given as its index or title; prefix it with '-' to sort in reverse.
+		None or an empty string restores the data order. A title may be
+		given before there is data; it is looked up when the data is set.'''
+		if value is None or value == '':
+			self.sort_key = None
+		else:
+			value = str(value)
+			self.sort_reverse = value.startswith('-')
+			self.sort_key = value.lstrip('-')
+		self.update()
+		self.check_sort()
+	# }}}
+	def check_sort(self): # {{{
+		'''Report a sort column which does not exist in the data.'''
+		if self.data is not None and self.sort_key is not None:
+			nice_assert(self.sort_column is not None, 'invalid sort column %s' % self.sort_key)
+	# }}}
+	def sort_index(self): # {{{
+		'''Return the index of the sort column, or None if it is not set or not found.'''
+		if self.sort_key is None:
+			return None
+		titles = self.get_titles()
+		if self.sort_key in titles:
+			return titles.index(self.sort_key)
+		if self.sort_key.isdigit():
+			return int(self.sort_key)
+		return None
+	# }}}
+	def get_sort(self): # {{{
+		if self.sort_key is None:
+			return None
+		titles = self.get_titles()
+		if self.sort_column is not None and self.sort_column < len(titles):
+			name = titles[self.sort_column]
+		else:
+			name = self.sort_key
+		return ('-' if self.sort_reverse else '') + name
+	# }}}
+	def set_filter(self, value): # {{{
+		'''Show only some rows. The filter is a function that is called with a
+		tuple of the cells of a row and returns whether to show it, or a
+		sequence (for example a NumPy array) of bools with one element per
+		row. None shows all rows.'''
+		self.filter = value
+		self.update()
+	# }}}
+	def update(self): # {{{
+		'''Recompute the view, after the data, titles, sort or filter changed.'''
+		self.sort_column = self.sort_index()
+		indices = None
+		if self.filter is not None:
+			if callable(self.filter):
+				indices = [r for r in range(self.length) if self.filter(self.row(r))]
+			elif numpy_module(self.filter) is not None:
+				indices = numpy_module(self.filter).flatnonzero(self.filter)
+			else:
+				indices = [r for r, show in enumerate(self.filter) if show]
+		if self.sort_column is not None and self.sort_column < len(self.columns):
+			column = self.columns[self.sort_column]
+			numpy = numpy_module(column)
+			if numpy is not None:
+				if indices is None:
+					indices = numpy.arange(self.length)
+				else:
+					indices = numpy.asarray(indices, dtype = numpy.intp)
+				# Equal keys keep their order in descending sorts too, like sorted does:
+				# sort the reversed rows and reverse the result.
+				if self.sort_reverse:
+					indices = indices[::-1]
+				indices = indices[numpy.argsort(column[indices], kind = 'stable')]
+				if self.sort_reverse:
+					indices = indices[::-1]
+			else:
+				indices = sorted(range(self.length) if indices is None else indices, key = column.__getitem__, reverse = self.sort_reverse)
+		self.view = indices
+	# }}}
+	def __len__(self): # {{{
+		'''Return the number of visible rows.'''
+		return self.length if self.view is None else len(self.view)
+	# }}}
+	def data_row(self, index): # {{{
+		'''Return the row in the data for a row in the view.'''
+		return index if self.view is None else int(self.view[index])
+	# }}}
+	def view_row(self, row): # {{{
+		'''Return the position of a data row in the view, or None if it is not visible.'''
+		if self.view is None:
+			return row if 0 <= row < self.length else None
+		numpy = numpy_module(self.view)
+		if numpy is not None:
+			found = numpy.flatnonzero(self.view == row)
+			return int(found[0]) if len(found) > 0 else None
+		return self.view.index(row) if row in self.view else None
+	# }}}
+	def row(self, row): # {{{
+		'''Return the cells of a row in the data, as a tuple.'''
+		return tuple(c[row] for c in self.columns)
+	# }}}
+	def window(self, first, count): # {{{
+		'''Return (data row, cells) pairs for count visible rows, starting at first.'''
+		end = min(first + count, len(self))
+		return [(r, self.row(r)) for r in (self.data_row(i) for i in range(max(first, 0), end))]
+	# }}}
+# }}}
+
+class Registry(dict): # {{{
+	'''Internal dict of get or set callbacks.
+	Values are (callback, arg) tuples. For every name, the dict compiled
+	holds a function that calls the callback, with arg if it is not NO_ARG.
+	Only item assignment, del and pop keep compiled up to date.'''
+	def __init__(self): # {{{
+		dict.__init__(self)
+		self.compiled = {}
+	# }}}
+	def __setitem__(self, name, value): # {{{
+		dict.__setitem__(self, name, value)
+		self.compiled[name] = self.compile(*value)
+	# }}}
+	def __delitem__(self, name): # {{{
+		dict.__delitem__(self, name)
+		del self.compiled[name]
+	# }}}
+	def pop(self, name, *default): # {{{
+		self.compiled.pop(name, None)
+		return dict.pop(self, name, *default)
+	# }}}
+	@staticmethod	# compile {{{
+	def compile(cb, arg):
+		if arg is NO_ARG:
+			return cb
+		return functools.partial(cb, arg)
+	# }}}
+# }}}
+
+class GetRegistry(Registry): # {{{
+	'''Internal Registry for get callbacks. A callback of None means that arg is a constant value.'''
+	@staticmethod	# compile {{{
+	def compile(cb, arg):
+		if cb is None:
+			return lambda: arg
+		return Registry.compile(cb, arg)
+	# }}}
+# }}}
+
+class Histogram: # {{{
+	'''Number of calls and distribution of their durations.
+	Durations are counted in buckets which are a factor 2 ** (1 / 8)
+	apart, so percentiles are accurate to about 9% and the memory use
+	does not grow with the number of calls.'''
+	__slots__ = ('count', 'total', 'max', 'buckets')
+	def __init__(self): # {{{
+		self.count = 0
+		self.total = 0.
+		self.max = 0.
+		self.buckets = {}
+	# }}}
+	def add(self, seconds): # {{{
+		self.count += 1
+		self.total += seconds
+		if seconds > self.max:
+			self.max = seconds
+		bucket = math.floor(math.log2(seconds) * 8) if seconds > 0 else None
+		self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+	# }}}
+	def percentile(self, p): # {{{
+		'''Return the upper limit of the bucket which holds the call at fraction p.'''
+		if self.count == 0:
+			return 0.
+		seen = 0
+		for bucket in sorted(self.buckets, key = lambda b: -math.inf if b is None else b):
+			seen += self.buckets[bucket]
+			if seen >= p * self.count:
+				return 0. if bucket is None else min(self.max, 2 ** ((bucket + 1) / 8))
+		return self.max
+	# }}}
+	def summary(self): # {{{
+		'''Return the count, and the total, mean, p50, p99 and max durations in milliseconds.'''
+		return {'count': self.count, 'total': self.total * 1e3, 'mean': self.total / self.count * 1e3 if self.count > 0 else 0., 'p50': self.percentile(.5) * 1e3, 'p99': self.percentile(.99) * 1e3, 'max': self.max * 1e3}
+	# }}}
+# }}}
+
+class WrappedCalls(dict): # {{{
+	'''Internal replacement for a dict of compiled callbacks, which wraps the callbacks.
+	The wrappers are made by the wrap method when they are first
+	requested, and made again if the callback in source is replaced.'''
+	def __init__(self, source): # {{{
+		dict.__init__(self)
+		self.source = source
+	# }}}
+	def __getitem__(self, name): # {{{
+		f = self.source[name]
+		wrapped = dict.get(self, name)
+		if wrapped is None or wrapped.__wrapped__ is not f:
+			wrapped = self.wrap(f, name)
+			dict.__setitem__(self, name, wrapped)
+		return wrapped
+	# }}}
+	def get(self, name, default = None): # {{{
+		if name not in self.source:
+			return default
+		return self[name]
+	# }}}
+	def __contains__(self, name): # {{{
+		return name in self.source
+	# }}}
+# }}}
+
+class TimedCalls(WrappedCalls): # {{{
+	'''Internal replacement for a dict of compiled callbacks, which times the calls.'''
+	def __init__(self, source, histograms): # {{{
+		WrappedCalls.__init__(self, source)
+		self.histograms = histograms
+	# }}}
+	def wrap(self, f, name): # {{{
+		return self.time(f, name, self.histograms)
+	# }}}
+	@staticmethod	# time {{{
+	def time(f, name, histograms):
+		'''Return a function which calls f and adds its duration to histograms[name].'''
+		@functools.wraps(f)
+		def timed(*args, **kwargs):
+			start = time.perf_counter()
+			try:
+				return f(*args, **kwargs)
+			finally:
+				histogram = histograms.get(name)
+				if histogram is None:
+					histogram = histograms.setdefault(name, Histogram())
+				histogram.add(time.perf_counter() - start)
+		return timed
+	# }}}
+# }}}
+
+class Packing: # {{{
+	'''Base class for the packing options of a child widget, which are stored in its mem_packing attribute.'''
+	__slots__ = ()
+	@classmethod	# get {{{
+	def get(cls, widget):
+		'''Return the packing options of widget, creating them if it doesn't have them yet.'''
+		packing = getattr(widget, 'mem_packing', None)
+		if packing is None:
+			packing = cls()
+			widget.mem_packing = packing
+		return packing
+	# }}}
+# }}}
+
+class BoxPacking(Packing): # {{{
+	'''Packing options of a child of a Box.'''
+	__slots__ = ('expand', 'fill')
+	def __init__(self): # {{{
+		self.expand = True
+		self.fill = True
+	# }}}
+# }}}
+
+class TablePacking(Packing): # {{{
+	'''Packing options of a child of a Table; None means the default is used.'''
+	__slots__ = ('xopts', 'yopts', 'left', 'right', 'top', 'bottom')
+	def __init__(self): # {{{
+		self.xopts = None
+		self.yopts = None
+		self.left = None
+		self.right = None
+		self.top = None
+		self.bottom = None
+	# }}}
+# }}}
+
+class MemoryAccount: # {{{
+	'''Internal record of the Python memory that is allocated while building widgets, by tag.
+	It is only used while tracemalloc is tracing.'''
+	__slots__ = ('tags', 'nested', 'traced')
+	def __init__(self): # {{{
+		import tracemalloc
+		self.traced = tracemalloc.get_traced_memory
+		# For every tag, the number of widgets and the bytes that were allocated.
+		self.tags = {}
+		# For every widget that is being built, the bytes that were allocated by its children.
+		self.nested = []
+	# }}}
+	def build(self, build, desc, fromparent): # {{{
+		'''Call build(desc, fromparent) and count the memory it allocates for desc.tag, excluding that of the child widgets.'''
+		tag = desc.tag
+		start = self.traced()[0]
+		self.nested.append(0)
+		try:
+			return build(desc, fromparent)
+		finally:
+			used = self.traced()[0] - start
+			children = self.nested.pop()
+			if len(self.nested) > 0:
+				self.nested[-1] += used
+			usage = self.tags.get(tag)
+			if usage is None:
+				usage = self.tags[tag] = [0, 0]
+			usage[0] += 1
+			usage[1] += used - children
+	# }}}
+# }}}
+
+# Subclasses of widget classes which register their instance in the Wrapper, by widget class.
+wrapper_classes = {}
+
+# Callbacks for the attributes of all widgets. {{{
+# They are registered with the widget as arg, so they are shared by all widgets.
+def get_visible(widget): # {{{
+	return widget.get_visible()
+# }}}
+def set_visible(widget, value): # {{{
+	if as_bool(value):
+		widget.show()
+	else:
+		widget.hide()
+# }}}
+def get_sensitive(widget): # {{{
+	return widget.get_sensitive()
+# }}}
+def set_sensitive(widget, value): # {{{
+	widget.set_sensitive(as_bool(value))
+# }}}
+def get_can_focus(widget): # {{{
+	return widget.get_can_focus()
+# }}}
+def set_can_focus(widget, value): # {{{
+	widget.set_can_focus(as_bool(value))
+# }}}
+# }}}
+
+class Mirror(WrappedCalls): # {{{
+	'''Internal replacement for the dict of compiled get callbacks, which keeps the values.
+	A value is read from the widget when it is first requested, and again
+	after the widget signals a change, a gui event comes from it, or one
+	of its set names is written. Names of widgets which the toolkit
+	cannot watch are always read from the widget.'''
+	def __init__(self, gui): # {{{
+		WrappedCalls.__init__(self, gui.__get__.compiled)
+		self.widgets = gui.__name_widgets__
+		self.toolkit_watch = gui.__toolkit__.watch
+		self.values = {}
+		# Watched get names by widget, and functions which stop watching, by widget.
+		self.names = {}
+		self.stop = {}
+	# }}}
+	def __getitem__(self, name): # {{{
+		widget = self.widgets.get(name)
+		if widget not in self.names or name not in self.names[widget]:
+			return self.source[name]
+		return WrappedCalls.__getitem__(self, name)
+	# }}}
+	def wrap(self, f, name): # {{{
+		values = self.values
+		@functools.wraps(f)
+		def read():
+			value = values.get(name, NO_ARG)
+			if value is NO_ARG:
+				value = values[name] = f()
+			return value
+		return read
+	# }}}
+	def watch(self, names): # {{{
+		'''Start keeping the values of get names.'''
+		for name in names:
+			widget = self.widgets.get(name)
+			if widget is None:
+				continue
+			if widget not in self.names:
+				stop = self.toolkit_watch(widget, self.changer(widget))
+				if stop is None:
+					# This widget cannot be watched.
+					continue
+				self.names[widget] = set()
+				self.stop[widget] = stop
+			self.names[widget].add(name)
+			self.values.pop(name, None)
+	# }}}
+	def changer(self, widget): # {{{
+		'''Return a callback for the signals of widget.'''
+		return lambda *args: self.changed(widget)
+	# }}}
+	def changed(self, widget): # {{{
+		'''Forget the values of the names of widget.'''
+		for name in self.names.get(widget, ()):
+			self.values.pop(name, None)
+	# }}}
+	def setter(self, f, name): # {{{
+		'''Return a function which calls f and then forgets the values of the widget of set name.'''
+		@functools.wraps(f)
+		def call(*args, **kwargs):
+			try:
+				return f(*args, **kwargs)
+			finally:
+				self.changed(self.widgets.get(name))
+		return call
+	# }}}
+	def forget(self, widgets): # {{{
+		'''Stop keeping the values of widgets which are destroyed.'''
+		for widget in widgets:
+			for name in self.names.pop(widget, ()):
+				self.values.pop(name, None)
+				dict.pop(self, name, None)
+			self.stop.pop(widget, None)
+	# }}}
+	def close(self): # {{{
+		'''Stop watching all widgets.'''
+		for stop in self.stop.values():
+			stop()
+		self.names.clear()
+		self.stop.clear()
+		self.values.clear()
+		self.clear()
+	# }}}
+# }}}
+
+class MirrorSetters(WrappedCalls): # {{{
+	'''Internal replacement for a dict of compiled set callbacks, which tells a Mirror about writes.'''
+	def __init__(self, source, mirror): # {{{
+		WrappedCalls.__init__(self, source)
+		self.mirror = mirror
+	# }}}
+	def wrap(self, f, name): # {{{
+		return self.mirror.setter(f, name)
+	# }}}
 # }}}
 
 class Wrapper: # {{{
+	# place is the position for the next automatically placed child of a table.
+	# page is the child that a notebook shows when its children are added, and labels are the tab labels of children which are not added yet.
+	__slots__ = ('gui', 'desc', 'data', 'widget', 'adder', 'place', 'page', 'labels')
 	def __init__(self, gui, desc, widget, data): # {{{
 		self.gui = gui
 		self.desc = desc
 		self.data = data
-		class wrapper(widget):
-			def __init__(self, parent):
-				parent.widget = self
-				widget.__init__(self, parent)
+		wrapper = wrapper_classes.get(widget)
+		if wrapper is None:
+			# Create the subclass only once for every widget class; with Gtk, every new subclass is also a new GType.
+			class wrapper(widget):
+				def __init__(self, parent):
+					parent.widget = self
+					widget.__init__(self, parent)
+			wrapper_classes[widget] = wrapper
 		wrapper(self)
 	# }}}
 	@classmethod	# create {{{
 	def create(cls, gui, desc, widget, data):
 		return cls(gui, desc, widget, data)
 	# }}}
+	@classmethod	# adopt {{{
+	def adopt(cls, gui, desc, widget, data):
+		'''Create a Wrapper for a widget that already exists, for example because Gtk.Builder created it.'''
+		ret = cls.__new__(cls)
+		ret.gui = gui
+		ret.desc = desc
+		ret.data = data
+		ret.widget = widget
+		return ret
+	# }}}
 	def normalize_indices(self, start, end, target): # {{{
 		if start < 0:
 			start += len(self.desc.children)
 		if end < 0:
 			end += len(self.desc.children)
-		nice_assert(0 <= start < len(self.desc.children) and 0 <= end < len(self.desc.children) and start <= end, 'invalid target range for child widgets: %d, %d' % (start, end))
+		nice_assert(len(self.desc.children) == 0 or (0 <= start < len(self.desc.children) and 0 <= end < len(self.desc.children) and start <= end), 'invalid target range for child widgets: %d, %d' % (start, end))
 		if target is None:
 			target = self.widget
 		return start, end, target
@@ -114,7 +789,10 @@ class Wrapper: # {{{
 			max = len(self.desc.children)
 		return nice_assert(min <= len(self.desc.children) <= max, '%s needs %d-%d children, not %d' % (self.desc.tag, min, max, len(self.desc.children)))
 	# }}}
-	def register_attribute(self, name, getcb, setcb, arg = NO_ARG, default = NO_ARG): # {{{
+	def register_attribute(self, name, getcb, setcb, arg = NO_ARG, default = NO_ARG, native = None): # {{{
+		'''Register get and set callbacks for an attribute.
+		native, if given, is a set callback which accepts values of the
+		right type without converting them; it is returned by Gui._setter.'''
 		def get_value(name, with_default): # {{{
 			if name not in self.desc.attributes:
 				return None
@@ -157,22 +835,38 @@ class Wrapper: # {{{
 					setcb(arg, default)
 			if sval[0] != '':
 				# A set callback is set.
-				self.gui.__set__[sval[0]] = (setcb, arg)
+				self.gui.__add_name__(self.gui.__set__, sval[0], (setcb, arg))
+				self.gui.__add_name__(self.gui.__name_widgets__, sval[0], self.widget)
+				if native is not None:
+					self.gui.__add_name__(self.gui.__native__, sval[0], Registry.compile(native, arg))
 		if gval is not None and gval[0] != '':
 			# A get callback is set.
-			self.gui.__get__[gval[0]] = (getcb, arg)
+			self.gui.__add_name__(self.gui.__get__, gval[0], (getcb, arg))
+			self.gui.__add_name__(self.gui.__name_widgets__, gval[0], self.widget)
 	# }}}
 	def register_bool_attribute(self, name, getcb, setcb): # {{{
-		self.register_attribute(name, lambda: as_bool(getcb()), lambda x: setcb(as_bool(x)))
+		self.register_attribute(name, lambda: as_bool(getcb()), lambda x: setcb(as_bool(x)), native = setcb)
+	# }}}
+	def register_event_name(self, value): # {{{
+		'''Internal function to add an event name, with its options, to the gui.
+		Returns the name without the options.'''
+		value, options = parse_event(value)
+		if value not in self.gui.__event__:
+			self.gui.__add_name__(self.gui.__event__, value, [None, None])
+		else:
+			self.gui.__use_name__(self.gui.__event__, value)
+		if len(options) > 0:
+			self.gui.__event_options__(value, options)
+		return value
 	# }}}
 	def register_gtk_event(self, name, gtk_widget = None): # {{{
 		'''Internal function to register a Gtk event.'''
 		value = self.get_attribute(name)
 		if value is None:
 			return
-		if nice_assert(value not in self.gui.__get__ and value not in self.gui.__set__, 'gui event name is already registered as get or set property'):
-			if value not in self.gui.__event__:
-				self.gui.__event__[value] = [None, None]
+		event = parse_event(value)[0]
+		if nice_assert(event not in self.gui.__get__ and event not in self.gui.__set__, 'gui event name is already registered as get or set property'):
+			value = self.register_event_name(value)
 			if gtk_widget is None:
 				gtk_widget = self.widget
 			gtk_widget.connect(name, self.gui.__event_cb__, value)
@@ -182,10 +876,10 @@ class Wrapper: # {{{
 		value = self.get_attribute(name)
 		if value is None:
 			return lambda *args, **kwargs: None
-		if nice_assert(value not in self.gui.__get__ and value not in self.gui.__set__, 'gui custom event name is already registered as get or set property'):
-			if value not in self.gui.__event__:
-				self.gui.__event__[value] = [None, None]
-		return lambda *args, **kwargs: self.gui.__event_cb__(self.widget, *(args + (value,)), **kwargs)
+		event = parse_event(value)[0]
+		if nice_assert(event not in self.gui.__get__ and event not in self.gui.__set__, 'gui custom event name is already registered as get or set property'):
+			self.register_event_name(value)
+		return lambda *args, **kwargs: self.gui.__event_cb__(self.widget, *(args + (event,)), **kwargs)
 	# }}}
 	def add(self, start = 0, end = -1, target = None): # {{{
 		'''Internal function to create contents of a widget which should use add.'''
@@ -198,62 +892,76 @@ class Wrapper: # {{{
 	def pack_add(self, start = 0, end = -1, target = None): # {{{
 		'''Internal function to create contents of a widget which should use pack.'''
 		start, end, target = self.normalize_indices(start, end, target)
+		self.adder = self.pack_add
+		fromparent = self.pack_attributes()
+		for c in self.desc.children[start:end + 1]:
+			x = self.gui.__build__(c, fromparent)
+			if x is None:
+				continue
+			packing = BoxPacking.get(x)
+			target.pack_start(x, packing.expand, packing.fill, 0)
+	# }}}
+	def pack_attributes(self): # {{{
+		'''Internal function to get the attributes that children of a Box get from it, for __build__.'''
 		def expand(widget, value): # {{{
-			widget.mem_expand = as_bool(value)
+			packing = BoxPacking.get(widget)
+			packing.expand = as_bool(value)
 			parent = widget.get_parent()
 			if parent == None:
 				return
-			widget.set_child_packing(parent, widget.mem_expand, widget.mem_fill, 0, Gtk.PACK_START)
+			parent.set_child_packing(widget, packing.expand, packing.fill, 0, self.gui.__toolkit__.Gtk.PACK_START)
 		# }}}
 		def fill(widget, value): # {{{
-			widget.mem_fill = as_bool(value)
+			packing = BoxPacking.get(widget)
+			packing.fill = as_bool(value)
 			parent = widget.get_parent()
 			if parent == None:
 				return
-			widget.set_child_packing(parent, widget.mem_expand, widget.mem_fill, 0, Gtk.PACK_START)
+			parent.set_child_packing(widget, packing.expand, packing.fill, 0, self.gui.__toolkit__.Gtk.PACK_START)
 		# }}}
-		for c in self.desc.children[start:end + 1]:
-			x = self.gui.__build__(c, {'expand': (lambda x: x.mem_expand, expand), 'fill': (lambda x: x.mem_fill, fill)})
-			if x is None:
-				continue
-			if not hasattr(x, 'mem_expand'):
-				x.mem_expand = True
-			if not hasattr(x, 'mem_fill'):
-				x.mem_fill = True
-			target.pack_start(x, x.mem_expand, x.mem_fill, 0)
+		return {'expand': (lambda x: BoxPacking.get(x).expand, expand), 'fill': (lambda x: BoxPacking.get(x).fill, fill)}
 	# }}}
 	def notebook_add(self, start = 0, end = -1, target = None): # {{{
 		'''Internal function to create contents of a notebook.'''
 		start, end, target = self.normalize_indices(start, end, target)
-		target.mem_page = None
+		self.adder = self.notebook_add
+		self.page = None
+		self.labels = {}
 		def set_page(widget, value): # {{{
 			'''View this child in the Notebook.
 			If the page isn't attached yet, record that it should be shown when it is.'''
-			target.mem_page = widget
+			self.page = widget
 			p = widget.get_parent()
 			if p is not None:
 				p.set_current_page(p.page_num(widget))
 		# }}}
+		def get_label(widget): # {{{
+			p = widget.get_parent()
+			if p is None:
+				return self.labels.get(widget)
+			return p.get_tab_label_text(widget)
+		# }}}
 		def set_label(widget, value): # {{{
-			widget.mem_label = value
 			p = widget.get_parent()
-			if p is not None:
+			if p is None:
+				self.labels[widget] = value
+			else:
 				p.set_tab_label_text(widget, value)
 		# }}}
+		fromparent = {'page': (None, set_page), 'label': (get_label, set_label)}
 		for c in self.desc.children[start:end + 1]:
 			if 'name' in c.attributes and c.tag != 'Setting':
 				name = c.attributes.pop('name')
 				nice_assert(name not in self.gui.__get__, 'tab name %s is already defined as a getter' % name)
-				self.gui.__get__[name] = (None, self.widget.get_n_pages())
-			x = self.gui.__build__(c, {'page': (None, set_page), 'label': (lambda x: x.mem_label, set_label)})
+				self.gui.__add_name__(self.gui.__get__, name, (None, self.widget.get_n_pages()))
+			x = self.gui.__build__(c, fromparent)
 			if x is None:
 				continue
 			target.append_page(x)
-			if hasattr(x, 'mem_label'):
-				label = x.mem_label
-				if label != None:
-					target.set_tab_label_text(x, label)
-		page = target.mem_page
+			label = self.labels.pop(x, None)
+			if label is not None:
+				target.set_tab_label_text(x, label)
+		page = self.page
 		if page is not None:
 			target.set_current_page(self.widget.page_num(page))
 	# }}}
@@ -271,83 +979,96 @@ class Wrapper: # {{{
 	def table_add(self, start = 0, end = -1, target = None): # {{{
 		'''Internal function to create contents of a table.'''
 		start, end, target = self.normalize_indices(start, end, target)
+		self.adder = self.table_add
+		AttachOptions = self.gui.__toolkit__.Gtk.AttachOptions
 		def parse(value): # {{{
 			w = value.split(',')
 			v = 0
 			if '' in w:
 				del w[w.index('')]
 			if 'expand' in w:
-				v |= Gtk.AttachOptions.EXPAND
+				v |= AttachOptions.EXPAND
 				del w[w.index('expand')]
 			if 'fill' in w:
-				v |= Gtk.AttachOptions.FILL
+				v |= AttachOptions.FILL
 				del w[w.index('fill')]
 			if 'shrink' in w:
-				v |= Gtk.AttachOptions.SHRINK
+				v |= AttachOptions.SHRINK
 				del w[w.index('shrink')]
 			nice_assert(w == [], 'invalid options for table: %s' % ', '.join(w))
 			return v
 		# }}}
 		def xset(widget, value): # {{{
-			widget.mem_xopts = parse(value)
+			packing = TablePacking.get(widget)
+			packing.xopts = parse(value)
 			parent = widget.get_parent()
 			if parent is not None:
-				parent.child_set_property(widget, 'x-options', widget.mem_xopts)
+				parent.child_set_property(widget, 'x-options', packing.xopts)
 		# }}}
 		def yset(widget, value): # {{{
-			widget.mem_yopts = parse(value)
+			packing = TablePacking.get(widget)
+			packing.yopts = parse(value)
 			parent = widget.get_parent()
 			if parent is not None:
-				parent.child_set_property(widget, 'y-options', widget.mem_yopts)
+				parent.child_set_property(widget, 'y-options', packing.yopts)
 		# }}}
 		def lset(widget, value): # {{{
-			widget.mem_left = int(value)
+			packing = TablePacking.get(widget)
+			packing.left = int(value)
 			parent = widget.get_parent()
 			if parent is not None:
-				parent.child_set_property(widget, 'left-attach', widget.mem_left)
+				parent.child_set_property(widget, 'left-attach', packing.left)
 		# }}}
 		def rset(widget, value): # {{{
-			widget.mem_right = int(value)
+			packing = TablePacking.get(widget)
+			packing.right = int(value)
 			parent = widget.get_parent()
 			if parent is not None:
-				parent.child_set_property(widget, 'right-attach', widget.mem_right)
+				parent.child_set_property(widget, 'right-attach', packing.right)
 		# }}}
 		def tset(widget, value): # {{{
-			widget.mem_top = int(value)
+			packing = TablePacking.get(widget)
+			packing.top = int(value)
 			parent = widget.get_parent()
 			if parent is not None:
-				parent.child_set_property(widget, 'top-attach', widget.mem_top)
+				parent.child_set_property(widget, 'top-attach', packing.top)
 		# }}}
 		def bset(widget, value): # {{{
-			widget.mem_bottom = int(value)
+			packing = TablePacking.get(widget)
+			packing.bottom = int(value)
 			parent = widget.get_parent()
 			if parent is not None:
-				parent.child_set_property(widget, 'bottom-attach', widget.mem_bottom)
+				parent.child_set_property(widget, 'bottom-attach', packing.bottom)
 		# }}}
 		cols = target.get_property('n-columns')
-		current = [0, 0]
+		# Children which are added by _attach continue where the previous ones stopped.
+		current = getattr(self, 'place', None)
+		if current is None:
+			current = self.place = [0, 0]
+		fromparent = {'x-options': (lambda x: TablePacking.get(x).xopts, xset), 'y-options': (lambda x: TablePacking.get(x).yopts, yset), 'left': (lambda x: TablePacking.get(x).left, lset), 'right': (lambda x: TablePacking.get(x).right, rset), 'top': (lambda x: TablePacking.get(x).top, tset), 'bottom': (lambda x: TablePacking.get(x).bottom, bset)}
 		for c in self.desc.children[start:end + 1]:
-			x = self.gui.__build__(c, {'x-options': (lambda x: x.mem_xopts, xset), 'y-options': (lambda x: x.mem_yopts, yset), 'left': (lambda x: x.mem_left, lset), 'right': (lambda x: x.mem_right, rset), 'top': (lambda x: x.mem_top, tset), 'bottom': (lambda x: x.mem_bottom, bset)})
+			x = self.gui.__build__(c, fromparent)
 			if x is None:
 				continue
-			if not hasattr(x, 'mem_xopts'):
-				x.mem_xopts = Gtk.AttachOptions.EXPAND | Gtk.AttachOptions.FILL
-			if not hasattr(x, 'mem_yopts'):
-				x.mem_yopts = Gtk.AttachOptions.EXPAND | Gtk.AttachOptions.FILL
-			if not hasattr(x, 'mem_left'):
-				x.mem_left = current[0]
-			if not hasattr(x, 'mem_right'):
-				x.mem_right = x.mem_left + 1
-			if not hasattr(x, 'mem_top'):
-				x.mem_top = current[1]
-			if not hasattr(x, 'mem_bottom'):
-				x.mem_bottom = x.mem_top + 1
-			current[0] = x.mem_right
-			current[1] = x.mem_top
+			packing = TablePacking.get(x)
+			if packing.xopts is None:
+				packing.xopts = AttachOptions.EXPAND | AttachOptions.FILL
+			if packing.yopts is None:
+				packing.yopts = AttachOptions.EXPAND | AttachOptions.FILL
+			if packing.left is None:
+				packing.left = current[0]
+			if packing.right is None:
+				packing.right = packing.left + 1
+			if packing.top is None:
+				packing.top = current[1]
+			if packing.bottom is None:
+				packing.bottom = packing.top + 1
+			current[0] = packing.right
+			current[1] = packing.top
 			if current[0] >= cols:
 				current[0] = 0
 				current[1] += 1
-			target.attach(x, x.mem_left, x.mem_right, x.mem_top, x.mem_bottom, x.mem_xopts, x.mem_yopts)
+			target.attach(x, packing.left, packing.right, packing.top, packing.bottom, packing.xopts, packing.yopts)
 	# }}}
 	def action_add(self, start = 0, end = -1, target = None): # {{{
 		start, end, target = self.normalize_indices(start, end, target)
@@ -389,9 +1110,7 @@ class Wrapper: # {{{
 			elif c.tag == 'MenuItem':
 				if not nice_assert('action' in c.attributes, 'menu item %s has no action' % name):
 					continue
-				value = c.attributes.pop('action')
-				if value not in self.gui.__event__:
-					self.gui.__event__[value] = [None, None]
+				value = self.register_event_name(c.attributes.pop('action'))
 				retdesc += '<menuitem name="' + name + '" action="' + action + '"/>'
 				# The outer lambda function is needed to get a per-call copy of v; otherwise all options in a menu get the same event.
 				retactions.append((action, None, name, accel, tooltip, (lambda v = value: (lambda *args, **kwargs: self.gui.__event_cb__(self.widget, *(args + (v,)), **kwargs))) ()))
@@ -427,505 +1146,2436 @@ class Setting: # {{{
 			elif t == 'bool':
 				value = as_bool(value)
 			nice_assert('name' not in gui.gui.__get__, 'Setting name %s is already used' % name)
-			gui.gui.__get__[name] = (None, value)
+			gui.gui.__add_name__(gui.gui.__get__, name, (None, value))
 		self.return_object = None
 builtins['Setting'] = Setting
 # }}}
-class Label(Gtk.Label): # {{{
+class External: # {{{
 	def __init__(self, gui):
-		Gtk.Label.__init__(self)
 		gui.assert_children(0)
-		gui.register_attribute('value', self.get_text, self.set_text)
-builtins['Label'] = Label
+		id = gui.get_attribute('id')
+		if not nice_assert(id is not None, 'id of External must be defined') or not nice_assert(id in gui.gui.__gtk__, 'Unknown external object %s defined' % id):
+			self.return_object = None
+			return
+		self.return_object = gui.gui.__gtk__.pop(id)
+builtins['External'] = External
 #}}}
-class Window(Gtk.Window): # {{{
-	gtk_window = True
-	def __init__(self, gui):
-		Gtk.Window.__init__(self)
-		gui.assert_children(1)
-		self.mem_show = True
-		gui.register_attribute('title', self.get_title, self.set_title, default = gui.gui.__packagename__)
-		gui.add()
-builtins['Window'] = Window
+class TextLogBase: # Toolkit-independent part of appending to TextViews. {{{
+	'''Lines which are appended are collected and passed to write_lines,
+	which subclasses provide, at most once per frame. Subclasses call
+	setup_log from their constructor. write_lines must remove lines from
+	the start until at most max_lines remain, if it is not 0, and scroll to
+	the end if autoscroll is set.'''
+	def setup_log(self, gui): # {{{
+		self.log_gui = gui.gui
+		self.log_pending = collections.deque()
+		self.log_last = None
+		self.log_source = None
+		self.log_time = 0
+		self.max_lines = 0
+		self.autoscroll = False
+		gui.register_attribute('append', lambda: self.log_last, self.append)
+		gui.register_attribute('max_lines', lambda: self.max_lines, self.set_max_lines)
+		gui.register_bool_attribute('autoscroll', lambda: self.autoscroll, self.set_autoscroll)
+	# }}}
+	def set_max_lines(self, value): # {{{
+		self.max_lines = max(0, int(value))
+		# Lines which would be removed immediately need not be kept.
+		self.log_pending = collections.deque(self.log_pending, self.max_lines or None)
+	# }}}
+	def set_autoscroll(self, value): # {{{
+		self.autoscroll = value
+	# }}}
+	def append(self, value): # {{{
+		'''Append one or more lines of text.'''
+		value = str(value)
+		lines = value.split('\n')
+		if value.endswith('\n'):
+			lines.pop()
+		self.log_last = lines[-1] if len(lines) > 0 else ''
+		self.log_pending.extend(lines)
+		if self.log_source is not None:
+			return
+		GLib = self.log_gui.__toolkit__.GLib
+		delay = self.log_time + self.log_gui.__frame_time__ - time.monotonic()
+		if delay > 0:
+			self.log_source = GLib.timeout_add(int(delay * 1000) + 1, self.log_idle)
+		else:
+			self.log_source = GLib.idle_add(self.log_idle)
+	# }}}
+	def log_idle(self): # {{{
+		self.log_source = None
+		self.log_time = time.monotonic()
+		lines = list(self.log_pending)
+		self.log_pending.clear()
+		if len(lines) > 0:
+			self.write_lines(lines)
+		return False
+	# }}}
 # }}}
-class ScrolledWindow(Gtk.ScrolledWindow): # {{{
-	def __init__(self, gui):
-		Gtk.ScrolledWindow.__init__(self)
-		gui.assert_children(1)
-		gui.add()
-builtins['ScrolledWindow'] = ScrolledWindow
-#}}}
-class AboutDialog(Gtk.AboutDialog): # {{{
-	gtk_window = True
-	def __init__(self, gui):
-		Gtk.AboutDialog.__init__(self)
-		self.set_program_name(gui.gui.__execname__)
-		self.connect('response', lambda w, v: gui.gui._showwin(self, False))
-		def setup(info): # {{{
-			if isinstance(info, str):
-				i = {}
-				for l in info[1:].split(info[0]):
-					k, v = l.split(None, 1)
-					i[k] = v
-				info = i
-			if 'name' in info:
-				self.set_name(info['name'])
-			if 'program_name' in info:
-				self.set_program_name(info['program_name'])
-			if 'version' in info:
-				self.set_version(info['version'])
-			if 'copyright' in info:
-				self.set_copyright(info['copyright'])
-			if 'comments' in info:
-				self.set_comments(info['comments'])
-			if 'license' in info:
-				self.set_license(info['license'])
-			if 'wrap_license' in info:
-				self.set_wrap_license(as_bool(info['wrap_license']))
-			if 'website' in info:
-				self.set_website(info['website'])
-			if 'website_label' in info:
-				self.set_website_label(info['website_label'])
-			if 'authors' in info:
-				self.set_authors(info['authors'])
-			if 'documenters' in info:
-				self.set_documenters(info['documenters'])
-			if 'artists' in info:
-				self.set_artists(info['artists'])
-			if 'translator_credits' in info:
-				self.set_translator_credits(info['translator_credits'])
-		# }}}
-		gui.register_attribute('setup', None, setup)
-builtins['AboutDialog'] = AboutDialog
+
+def frame_buffer(value): # {{{
+	'''Interpret an image frame for Image.frame.
+	The value is an object which supports the buffer protocol with shape
+	(height, width, channels), such as a NumPy array of uint8, or a tuple
+	(buffer, width, height), where the buffer holds the rows of pixels
+	without padding. There must be 3 (RGB) or 4 (RGBA) channels.
+	Return (data, width, height, channels, rowstride), where data is a
+	flat memoryview of bytes. The pixels are only copied if the rows are
+	not contiguous.'''
+	if isinstance(value, tuple):
+		data, width, height = value
+		data = memoryview(data).cast('B')
+		# A buffer which is too short for RGB is reported below.
+		channels = max(3, len(data) // (width * height)) if width * height > 0 else 3
+		rowstride = width * channels
+	else:
+		data = memoryview(value)
+		if not nice_assert(data.ndim == 3 and data.itemsize == 1, 'image frame must have shape (height, width, channels) and one byte per channel'):
+			return None
+		height, width, channels = data.shape
+		if not data.c_contiguous:
+			data = memoryview(data.tobytes()).cast('B', data.shape)
+		rowstride = data.strides[0]
+		data = data.cast('B')
+	if not nice_assert(channels in (3, 4), 'image frame must contain RGB or RGBA pixels'):
+		return None
+	# The toolkit reads height rows of rowstride bytes from the buffer.
+	if not nice_assert(len(data) >= rowstride * height, 'image frame buffer is too short: %d bytes for %d rows of %d bytes' % (len(data), height, rowstride)):
+		return None
+	return data, width, height, channels, rowstride
 # }}}
-class Dialog(Gtk.Dialog): # {{{
-	gtk_window = True
-	def __init__(self, gui):
-		Gtk.Dialog.__init__(self)
-		self.set_modal(True)
-		buttons = int(gui.get_attribute('buttons', default = 1))
-		if not gui.assert_children(buttons, -1):
-			raise ValueError('not enough buttons defined')
-		cbs = [None] * buttons
-		for i in range(buttons):
-			b = gui.desc.children[i]
-			if b.tag != 'Button':
-				gui.desc.children[i] = gui.gui.__element__('Button', {}, [b])
-			cbs[i] = gui.register_event('response')
-		gui.action_add(0, buttons - 1)
-		def response(widget, choice):
-			gui.gui._showwin(self, False)
-			if cbs[choice] is None:
-				return
-			cbs[choice] ()
-		gui.register_attribute('run', None, lambda x: self.run())
-		gui.register_attribute('title', self.get_title, self.set_title)
-		self.connect('response', response)
-		gui.pack_add(target = self.vbox, start = buttons)
-builtins['Dialog'] = Dialog
+
+class ImageFrameBase: # Toolkit-independent part of showing frames in an Image. {{{
+	'''Subclasses call setup_frame from their constructor and provide
+	show_frame, which is called with the result of frame_buffer. If max_fps
+	is set, at most that many frames per second are shown; when frames are
+	set faster, only the latest one is kept.'''
+	def setup_frame(self, gui): # {{{
+		self.frame_gui = gui.gui
+		self.frame = None
+		self.frame_pending = None
+		self.frame_source = None
+		self.frame_time = 0
+		self.max_fps = 0
+		self.dropped_frames = 0
+		gui.register_attribute('frame', lambda: self.frame, self.set_frame)
+		gui.register_attribute('max_fps', lambda: self.max_fps, self.set_max_fps)
+	# }}}
+	def set_max_fps(self, value): # {{{
+		self.max_fps = max(0, float(value))
+	# }}}
+	def set_frame(self, value): # {{{
+		if self.frame_pending is not None:
+			self.dropped_frames += 1
+		self.frame_pending = value
+		if self.frame_source is not None:
+			return
+		delay = self.frame_time + 1. / self.max_fps - time.monotonic() if self.max_fps > 0 else 0
+		if delay > 0:
+			self.frame_source = self.frame_gui.__toolkit__.GLib.timeout_add(int(delay * 1000) + 1, self.frame_timeout)
+		else:
+			self.frame_timeout()
+	# }}}
+	def frame_timeout(self): # {{{
+		self.frame_source = None
+		self.frame_time = time.monotonic()
+		self.frame = self.frame_pending
+		self.frame_pending = None
+		if self.frame is not None:
+			frame = frame_buffer(self.frame)
+			if frame is not None:
+				self.show_frame(frame)
+		return False
+	# }}}
 # }}}
-class Socket(Gtk.Socket): # {{{
-	def __init__(self, gui):
-		Gtk.Socket.__init__(self)
-		gui.register_attribute('id', self.get_id, None)
-builtins['Socket'] = Socket
-#}}}
-class VBox(Gtk.VBox): # {{{
-	def __init__(self, gui):
-		Gtk.VBox.__init__(self)
-		gui.pack_add()
-builtins['VBox'] = VBox
-#}}}
-class HBox(Gtk.HBox): # {{{
-	def __init__(self, gui):
-		Gtk.HBox.__init__(self)
-		gui.pack_add()
-builtins['HBox'] = HBox
-#}}}
-class Notebook(Gtk.Notebook): # {{{
-	def __init__(self, gui):
-		Gtk.Notebook.__init__(self)
-		gui.register_bool_attribute('show_tabs', self.get_show_tabs, self.set_show_tabs)
-		tab_pos = {Gtk.PositionType.TOP: 'top', Gtk.PositionType.BOTTOM: 'bottom', Gtk.PositionType.LEFT: 'left', Gtk.PositionType.RIGHT: 'right'}
-		gui.register_attribute('tab_pos', lambda: tab_pos[self.get_tab_pos()], lambda x: self.set_tab_pos([t[0] for t in tab_pos.items() if t[1] == x][0]))
-		def save_page():
-			p = self.get_current_page()
-			return lambda: self.set_current_page(p)
-		gui.register_attribute('save_page', lambda: save_page, None)
-		gui.register_gtk_event('switch_page')
-		gui.notebook_add()
-builtins['Notebook'] = Notebook
-#}}}
-class Button(Gtk.Button): # {{{
-	def __init__(self, gui):
-		Gtk.Button.__init__(self)
-		gui.register_gtk_event('clicked')
-		gui.add()
-builtins['Button'] = Button
-#}}}
-class CheckButton(Gtk.CheckButton): # {{{
-	def __init__(self, gui):
-		Gtk.CheckButton.__init__(self)
-		def get(): # {{{
-			if self.get_inconsistent():
-				return None
-			return self.get_active()
-		# }}}
-		def set(value): # {{{
-			if value is None:
-				self.set_inconsistent(True)
-			else:
-				self.set_inconsistent(False)
-				self.set_active(as_bool(value))
-		# }}}
-		gui.register_attribute('value', get, set)
-		gui.register_gtk_event('toggled')
-		gui.add()
-builtins['CheckButton'] = CheckButton
-#}}}
-class RadioButton(Gtk.RadioButton): # {{{
-	def __init__(self, gui):
-		Gtk.RadioButton.__init__(self)
-		self.group = ''
-		if len(gui.gui.__radio_groups__[self.group]) > 0:
-			self.set_group(gui.gui.__radio_groups__[self.group][0])
-		gui.gui.__radio_groups__[self.group].append(self)
-		def get(): # {{{
-			if self.get_inconsistent():
-				return None
-			return self.get_active()
-		# }}}
-		def get_group(): # {{{
-			return self.group
-		# }}}
-		def set(value): # {{{
-			if value is None:
-				self.set_inconsistent(True)
-			else:
-				self.set_inconsistent(False)
-				self.set_active(as_bool(value))
-		# }}}
-		def set_group(group): # {{{
-			gui.gui.__radio_groups__[self.group].remove(self)
-			if self.group != '' and len(gui.gui.__radio_groups__[self.group]) == 0:
-				del gui.gui.__radio_groups__[self.group]
-			if group in gui.gui.__radio_groups__:
-				self.set_group(gui.gui.__radio_groups__[group][0])
-			else:
-				self.set_group(None)
-				gui.gui.__radio_groups__[group] = []
-			gui.gui.__radio_groups__[group].append(self)
-			self.group = group
-		# }}}
-		gui.register_attribute('value', get, set)
-		gui.register_attribute('group', get_group, set_group)
-		gui.register_gtk_event('toggled')
-		gui.add()
-builtins['RadioButton'] = RadioButton
-#}}}
-class Entry(Gtk.Entry): # {{{
-	def __init__(self, gui):
-		Gtk.Entry.__init__(self)
-		gui.assert_children(0)
-		gui.register_attribute('value', self.get_text, self.set_text)
-		gui.register_gtk_event('activate')
-		gui.register_gtk_event('changed')
-builtins['Entry'] = Entry
-#}}}
-class Frame(Gtk.Frame): # {{{
-	def __init__(self, gui):
-		Gtk.Frame.__init__(self)
-		gui.register_attribute('label', self.get_label, lambda value: self.set_label(None if value == '' else value))
-		gui.add()
-builtins['Frame'] = Frame
+
+def extremes(values): # {{{
+	'''Return the minimum and maximum of a nonempty list or NumPy array, as floats.'''
+	if numpy_module(values) is not None:
+		return float(values.min()), float(values.max())
+	return float(min(values)), float(max(values))
 # }}}
-class Table(Gtk.Table): # {{{
-	def __init__(self, gui):
-		cols = int(gui.get_attribute('columns', default = 1))
-		Gtk.Table.__init__(self, 1, cols)
-		gui.table_add()
-builtins['Table'] = Table
-#}}}
-class SpinButton(Gtk.SpinButton): # {{{
-	def __init__(self, gui):
-		Gtk.SpinButton.__init__(self)
+
+class PlotData: # {{{
+	'''Samples of a Plot, as a NumPy array of floats if the data was an array, or else a list.
+	If window is not 0, only the last window samples are shown, and
+	at most twice as many are kept. Appended samples are written into
+	spare room at the end of the array, which grows by doubling.
+	Samples are put in columns by their index since the data was set,
+	not by their place in the window, so when samples scroll out of the
+	window, the drawing moves and the other columns do not change.'''
+	def __init__(self): # {{{
+		self.buffer = []
+		self.length = 0
+		self.window = 0
+		# Index of the first sample in buffer, counted from the first sample after set.
+		self.offset = 0
+		# Number of samples in the width of the plot if window is 0; it grows by doubling.
+		self.scale = 0
+	# }}}
+	def set(self, data): # {{{
+		numpy = numpy_module(data)
+		if numpy is not None:
+			# This does not copy arrays of floats; the array is not modified when samples are appended.
+			self.buffer = numpy.asarray(data, dtype = float).ravel()
+		elif data is None:
+			self.buffer = []
+		else:
+			self.buffer = [float(x) for x in data]
+		self.length = len(self.buffer)
+		self.offset = 0
+		self.scale = self.length
+	# }}}
+	def get(self): # {{{
+		return self.buffer[:self.length]
+	# }}}
+	def append(self, values): # {{{
+		'''Append one or more samples; return them as an array or list.'''
+		numpy = numpy_module(self.buffer)
+		if numpy is not None:
+			values = numpy.asarray(values, dtype = self.buffer.dtype).ravel()
+			if self.length + len(values) > len(self.buffer):
+				keep = self.samples()
+				buffer = numpy.empty(max(1024, 2 * (len(keep) + len(values))), dtype = self.buffer.dtype)
+				buffer[:len(keep)] = keep
+				self.offset += self.start()
+				self.buffer = buffer
+				self.length = len(keep)
+			self.buffer[self.length:self.length + len(values)] = values
+			self.length += len(values)
+		else:
+			values = [float(x) for x in values] if hasattr(values, '__iter__') else [float(values)]
+			self.buffer.extend(values)
+			if self.window > 0 and len(self.buffer) > 2 * self.window:
+				self.offset += len(self.buffer) - self.window
+				del self.buffer[:len(self.buffer) - self.window]
+			self.length = len(self.buffer)
+		if self.length > self.scale:
+			self.scale = max(self.length, 2 * self.scale)
+		return values
+	# }}}
+	def start(self): # {{{
+		'''Return the position of the first shown sample in buffer.'''
+		return max(0, self.length - self.window) if self.window > 0 else 0
+	# }}}
+	def first(self): # {{{
+		'''Return the index of the first shown sample, counted from the first sample after set.'''
+		return self.offset + self.start()
+	# }}}
+	def samples(self): # {{{
+		'''Return the samples that are shown.'''
+		return self.buffer[self.start():self.length]
+	# }}}
+	def span(self): # {{{
+		'''Return the number of samples that fit in the width of the plot.'''
+		return self.window if self.window > 0 else max(self.scale, self.length)
+	# }}}
+	def origin(self, width, first = None): # {{{
+		'''Return the number of columns by which the drawing moved since the data was set.
+		It is chosen so that the last place in the window is in the last
+		column that is used; the first shown sample may be in column -1,
+		which is not drawn.'''
+		span = self.span()
+		if first is None:
+			first = self.first()
+		return (first + span - 1) * width // span - (span - 1) * width // span
+	# }}}
+	def column(self, index, width): # {{{
+		'''Return the column of the shown sample at index.'''
+		return (self.first() + index) * width // self.span() - self.origin(width)
+	# }}}
+	def shift(self, samples, width): # {{{
+		'''Return the number of columns by which the drawing moves when samples scrolled out of the window.'''
+		return self.origin(width) - self.origin(width, self.first() - samples)
+	# }}}
+	def columns(self, width, first, last): # {{{
+		'''Decimate the shown samples to width columns.
+		Return (columns, minima, maxima) for the columns from first up to
+		last which contain samples. A sample with index i (counted as
+		by the first method) is in column i * width // span - origin.'''
+		samples = self.samples()
+		n = len(samples)
+		span = self.span()
+		first = max(0, first)
+		last = min(width, last)
+		if n == 0 or first >= last:
+			return [], [], []
+		start = self.first()
+		origin = self.origin(width)
+		numpy = numpy_module(samples)
+		if numpy is not None:
+			# Column c starts at the first sample i with i * width // span >= c + origin.
+			bounds = numpy.clip(-(-(numpy.arange(first, last + 1) + origin) * span // width) - start, 0, n)
+			used = numpy.flatnonzero(bounds[:-1] < bounds[1:])
+			if len(used) == 0:
+				return [], [], []
+			# reduceat reduces each range up to the next start, and the last one up to the end.
+			part = samples[:bounds[used[-1] + 1]]
+			starts = bounds[used]
+			return used + first, numpy.minimum.reduceat(part, starts), numpy.maximum.reduceat(part, starts)
+		columns, minima, maxima = [], [], []
+		for c in range(first, last):
+			begin = min(n, max(0, -(-(c + origin) * span // width) - start))
+			end = min(n, max(0, -(-(c + 1 + origin) * span // width) - start))
+			if begin < end:
+				part = samples[begin:end]
+				columns.append(c)
+				minima.append(min(part))
+				maxima.append(max(part))
+		return columns, minima, maxima
+	# }}}
+# }}}
+
+class PlotBase: # Toolkit-independent part of the Plot widgets. {{{
+	'''Subclasses call setup_plot from their constructor and provide
+	redraw(first, last), which is called with the range of samples that
+	changed, or with None, None if everything must be drawn again, and
+	scroll(samples), which is called when samples scrolled out of the
+	window, before the new samples are redrawn.'''
+	def setup_plot(self, gui): # {{{
 		gui.assert_children(0)
-		self.set_increments(1, 10)
-		gui.register_attribute('range', self.get_range, lambda r: self.set_range(*parse_nums(r)))
-		gui.register_attribute('digits', self.get_digits, lambda v: self.set_digits(int(v)))
-		gui.register_attribute('value', self.get_value, lambda v: self.set_value(float(v)))
-		gui.register_attribute('increment', self.get_increments, lambda r: self.set_increments(*parse_nums(r)))
-		gui.register_gtk_event('value-changed')
-builtins['SpinButton'] = SpinButton
-#}}}
-class ComboBoxText(Gtk.ComboBox): # {{{
-	def __init__(self, gui):
-		def setcontent(value): # {{{
+		self.plot = PlotData()
+		self.fixed_range = None
+		self.auto_range = None
+		self.last_append = None
+		gui.register_attribute('data', self.plot.get, self.set_content)
+		gui.register_attribute('append', lambda: self.last_append, self.append)
+		gui.register_attribute('window', lambda: self.plot.window, self.set_window)
+		gui.register_attribute('range', lambda: self.fixed_range, self.set_range)
+	# }}}
+	def value_range(self): # {{{
+		'''Return the minimum and maximum value on the vertical axis.'''
+		if self.fixed_range is not None:
+			return self.fixed_range
+		if self.auto_range is None:
+			samples = self.plot.samples()
+			if len(samples) == 0:
+				return 0., 1.
+			self.auto_range = extremes(samples)
+		return self.auto_range
+	# }}}
+	def set_content(self, data): # {{{
+		self.plot.set(data)
+		self.auto_range = None
+		self.redraw(None, None)
+	# }}}
+	def set_window(self, value): # {{{
+		self.plot.window = max(0, int(value))
+		self.auto_range = None
+		self.redraw(None, None)
+	# }}}
+	def set_range(self, value): # {{{
+		'''Set the vertical range as (min, max) or "min,max"; None or an empty string scales to the data.'''
+		if value is None or value == '':
+			self.fixed_range = None
+		else:
 			if isinstance(value, str):
-				l = value.split('\n')
+				value = value.split(',')
+			self.fixed_range = (float(value[0]), float(value[1]))
+		self.redraw(None, None)
+	# }}}
+	def append(self, values): # {{{
+		'''Append samples, and redraw only the columns that show them, if possible.
+		Once the window is full, the drawing is scrolled. Without a window,
+		the horizontal scale doubles when the samples no longer fit, and
+		only then everything is drawn again.'''
+		first = self.plot.first()
+		span = self.plot.span()
+		values = self.plot.append(values)
+		self.last_append = values
+		if len(values) == 0:
+			return
+		if self.fixed_range is None:
+			if self.auto_range is None:
+				# The range is computed when everything is drawn.
+				self.redraw(None, None)
+				return
+			low, high = extremes(values)
+			if low < self.auto_range[0] or high > self.auto_range[1]:
+				self.auto_range = (min(low, self.auto_range[0]), max(high, self.auto_range[1]))
+				self.redraw(None, None)
+				return
+		shown = len(self.plot.samples())
+		if self.plot.span() != span or len(values) >= shown:
+			self.redraw(None, None)
+			return
+		if self.plot.first() != first:
+			self.scroll(self.plot.first() - first)
+			# The first column may have lost samples.
+			self.redraw(0, 0)
+		# The line from the previous sample changes as well.
+		self.redraw(shown - len(values) - 1, shown)
+	# }}}
+# }}}
+
+class RepeatRow: # {{{
+	'''Internal record for a row of a Repeat.'''
+	__slots__ = ('scope', 'widget', 'item')
+	def __init__(self, scope, widget):
+		self.scope = scope
+		self.widget = widget
+		self.item = None
+# }}}
+
+class RepeatBase: # Toolkit-independent part of the Repeat widgets. {{{
+	'''The only child element is the template for a row; it is built once
+	for every item that is set. Subclasses call setup from their
+	constructor, and provide insert_row(widget, position),
+	move_row(widget, position) and remove_row(widget).'''
+	def setup(self, gui): # {{{
+		self.repeat_gui = gui.gui
+		self.template = None
+		if nice_assert(len(gui.desc.children) == 1, 'Repeat needs exactly one child, the template for its rows'):
+			self.template = gui.desc.children[0].pack()
+		gui.desc.children = []
+		self.key = gui.get_attribute('key')
+		self.rows = {}
+		self.order = []
+		self.items = []
+		for attr in ('items', 'set_items'):
+			name = gui.desc.attributes.get(attr, '').partition(':')[0]
+			if name != '':
+				self.repeat_gui.__add_name__(self.repeat_gui.__repeats__, name, self)
+		gui.register_attribute('items', lambda: self.items, self.set_items)
+		if self.template is not None:
+			# Build a row, so its events are registered with the gui before it checks them.
+			# Its other names, including slots and nested Repeats, are in its own scope, so nothing else is left behind.
+			row = self.build_row(None)
+			if row is not None:
+				row.widget.destroy()
+	# }}}
+	def build_row(self, key): # {{{
+		scope = RowScope(self.repeat_gui, key)
+		widget = scope.__build__(self.repeat_gui.__element__.unpack(self.template))
+		if widget is None:
+			return None
+		return RepeatRow(scope, widget)
+	# }}}
+	def item_key(self, item): # {{{
+		'''Return the key of an item: the item itself if no key attribute was given, otherwise the value of that field.'''
+		if self.key is None:
+			return item
+		if isinstance(item, dict):
+			return item[self.key]
+		return getattr(item, self.key)
+	# }}}
+	def update_row(self, row, item): # {{{
+		'''Write the values of item which changed to the set names of the row.
+		For a dict, every entry is written to the set name with the same
+		name; another item is written to the set name "item".'''
+		setters = row.scope.__setters__
+		old = row.item
+		if isinstance(item, dict):
+			for name, value in item.items():
+				if name in setters and (not isinstance(old, dict) or name not in old or old[name] != value):
+					setters[name](value)
+			# Keep a copy, so changes are found if the caller modifies the dict.
+			row.item = dict(item)
+		else:
+			if 'item' in setters and (old is None or old != item):
+				setters['item'](item)
+			row.item = item
+	# }}}
+	def set_items(self, items): # {{{
+		'''Show a row for every item. Rows are matched to the items by key:
+		rows with a new key are created, rows whose key is gone are
+		destroyed, and the others are moved and updated if needed.'''
+		items = list(items)
+		keys = [self.item_key(item) for item in items]
+		if not nice_assert(len(set(keys)) == len(keys), 'duplicate keys in items of Repeat'):
+			return
+		new = set(keys)
+		for key in self.order:
+			if key not in new:
+				self.remove_row(self.rows.pop(key).widget)
+		# The keys of the rows in the container, in order.
+		current = [key for key in self.order if key in new]
+		position = 0
+		for key, item in zip(keys, items):
+			row = self.rows.get(key)
+			if row is None:
+				row = self.build_row(key)
+				if row is None:
+					continue
+				self.rows[key] = row
+				current.insert(position, key)
+				self.insert_row(row.widget, position)
+			elif current[position] != key:
+				current.remove(key)
+				current.insert(position, key)
+				self.move_row(row.widget, position)
+			self.update_row(row, item)
+			position += 1
+		self.order = current
+		self.items = items
+	# }}}
+# }}}
+
+class DataTableBase: # Toolkit-independent part of the DataTable widgets. {{{
+	'''Subclasses call setup from their constructor, keep the first visible
+	row in self.first, and provide redraw, which is called when the visible
+	rows may have changed.'''
+	def setup(self, gui): # {{{
+		gui.assert_children(0)
+		self.table = TableData()
+		self.first = 0
+		self.selected = None
+		gui.register_attribute('columns', self.table.get_titles, self.set_titles)
+		gui.register_attribute('data', lambda: self.table.data, self.set_content)
+		gui.register_attribute('sort', self.table.get_sort, self.set_sort)
+		gui.register_attribute('filter', lambda: self.table.filter, self.set_filter)
+		gui.register_attribute('selected', lambda: self.selected, self.set_selected)
+		self.select_event = gui.register_event('select')
+		self.activate_event = gui.register_event('activate')
+	# }}}
+	def set_titles(self, titles): # {{{
+		if isinstance(titles, str):
+			titles = [t.strip() for t in titles.split(',')]
+		self.table.titles = titles
+		# The sort column may be given as a title.
+		self.table.update()
+		self.redraw()
+	# }}}
+	def set_content(self, data): # {{{
+		self.table.set_data(data)
+		self.redraw()
+	# }}}
+	def set_sort(self, value): # {{{
+		self.table.set_sort(value)
+		self.redraw()
+	# }}}
+	def set_filter(self, value): # {{{
+		self.table.set_filter(value)
+		self.redraw()
+	# }}}
+	def set_selected(self, row): # {{{
+		'''Select a row, given as its index in the data, or None.'''
+		self.selected = None if row is None or row == '' else int(row)
+		self.redraw()
+	# }}}
+	def select(self, index, activate = False): # {{{
+		'''Select the visible row at index, as the result of a user action, and fire the events.'''
+		if not 0 <= index < len(self.table):
+			return
+		self.selected = self.table.data_row(index)
+		self.redraw()
+		self.select_event(self.selected)
+		if activate:
+			self.activate_event(self.selected)
+	# }}}
+# }}}
+
+class Builder: # {{{
+	'''Internal creator of trees of builtin widgets with a single Gtk.Builder call.
+	classes maps tags to (class name for Gtk.Builder, builtin class,
+	number of children); a number of None means any number, packed
+	in a Box. The builtin classes provide a setup method which
+	registers the attributes and events for an existing object, if
+	they have any, and optionally a builder_properties method, which
+	moves constant attributes to properties of the object.'''
+	# Subtrees with fewer elements are built in Python, because parsing the XML costs more than it saves.
+	minimum = 8
+	def __init__(self, Gtk, classes): # {{{
+		self.Gtk = Gtk
+		self.classes = classes
+	# }}}
+	def size(self, gui, desc): # {{{
+		'''Return the number of elements in desc, if Gtk.Builder can create all of them, or 0.
+		The result is stored in the element, so every element is checked once.'''
+		ret = getattr(desc, 'builder_size', None)
+		if ret is not None:
+			return ret
+		ret = 0
+		info = self.classes.get(desc.tag)
+		# The tag must not be overridden by a custom widget, and anything unusual is left to the Python code, which also reports errors.
+		if info is not None and gui.__widget_class__(desc.tag) is info[1] and 'slot' not in desc.attributes and (info[2] is None or len(desc.children) == info[2]):
+			ret = 1
+			for c in desc.children:
+				size = self.size(gui, c)
+				if ret > 0 and size > 0:
+					ret += size
+				else:
+					ret = 0
+		desc.builder_size = ret
+		return ret
+	# }}}
+	def xml(self, ET, desc, parent, ids): # {{{
+		'''Internal function to add the object for desc and its children to parent.'''
+		classname, cls, children = self.classes[desc.tag]
+		obj = ET.SubElement(parent, 'object', {'class': classname, 'id': 'gui%d' % ids[0]})
+		ids[0] += 1
+		properties = {'visible': 'True'}
+		if hasattr(cls, 'builder_properties'):
+			properties.update(cls.builder_properties(desc.attributes))
+		for name in properties:
+			ET.SubElement(obj, 'property', {'name': name}).text = properties[name]
+		for c in desc.children:
+			child = ET.SubElement(obj, 'child')
+			self.xml(ET, c, child, ids)
+			if children is None:
+				# Box children are packed like pack_add does by default; packing attributes are applied afterwards.
+				packing = ET.SubElement(child, 'packing')
+				for name in ('expand', 'fill'):
+					ET.SubElement(packing, 'property', {'name': name}).text = 'True'
+	# }}}
+	def register(self, gui, desc, fromparent, builder, ids): # {{{
+		'''Internal function to register the attributes of the object for desc and its children.'''
+		classname, cls, children = self.classes[desc.tag]
+		widget = builder.get_object('gui%d' % ids[0])
+		ids[0] += 1
+		wrap = Wrapper.adopt(gui, desc, widget, gui.__data__)
+		if hasattr(cls, 'setup'):
+			# The widget is not an instance of cls, but it has the same Gtk class, which is all that setup uses.
+			cls.setup(widget, wrap)
+		child_attributes = wrap.pack_attributes() if children is None else None
+		for c in desc.children:
+			self.register(gui, c, child_attributes, builder, ids)
+		return gui.__finish__(wrap, widget, fromparent, None)
+	# }}}
+	def build(self, gui, desc, fromparent): # {{{
+		'''Create the widgets for desc and register their attributes with gui; return the top widget.'''
+		# This import is done here, because it is slow and not needed for most uses of the module.
+		import xml.etree.ElementTree as ET
+		interface = ET.Element('interface')
+		self.xml(ET, desc, interface, [0])
+		builder = self.Gtk.Builder()
+		builder.add_from_string(ET.tostring(interface, encoding = 'unicode'))
+		return self.register(gui, desc, fromparent, builder, [0])
+	# }}}
+# }}}
+
+def label_properties(attributes): # {{{
+	'''Move a constant value of a Label to the label property, for Builder.'''
+	value = attributes.get('value')
+	if value is None or not value.startswith(':'):
+		return {}
+	del attributes['value']
+	return {'label': value[1:]}
+# }}}
+
+def load_gtk(): # {{{
+	'''Import Gtk and define the Gtk builtin widget classes.
+	This is done when the Gtk toolkit is first used, not when the module is imported.'''
+	global Gtk, GLib
+	import gi
+	gi.require_version('Gtk', '3.0')
+	gi.require_version('PangoCairo', '1.0')
+	gi.require_version('GdkPixbuf', '2.0')
+	from gi.repository import Gtk, GLib, Gdk, GdkPixbuf, Pango, PangoCairo
+	class Label(Gtk.Label): # {{{
+		def __init__(self, gui):
+			Gtk.Label.__init__(self)
+			gui.assert_children(0)
+			self.setup(gui)
+		def setup(self, gui):
+			gui.register_attribute('value', self.get_text, self.set_text)
+		builder_properties = staticmethod(label_properties)
+	builtins['Label'] = Label
+	#}}}
+	class Window(Gtk.Window): # {{{
+		gtk_window = True
+		def __init__(self, gui):
+			Gtk.Window.__init__(self)
+			gui.assert_children(1)
+			self.mem_show = True
+			gui.register_attribute('title', self.get_title, self.set_title, default = gui.gui.__packagename__)
+			gui.add()
+	builtins['Window'] = Window
+	# }}}
+	class ScrolledWindow(Gtk.ScrolledWindow): # {{{
+		def __init__(self, gui):
+			Gtk.ScrolledWindow.__init__(self)
+			gui.assert_children(1)
+			gui.add()
+	builtins['ScrolledWindow'] = ScrolledWindow
+	#}}}
+	class AboutDialog(Gtk.AboutDialog): # {{{
+		gtk_window = True
+		lazy = True
+		def __init__(self, gui):
+			Gtk.AboutDialog.__init__(self)
+			self.set_program_name(gui.gui.__execname__)
+			self.connect('response', lambda w, v: gui.gui._showwin(self, False))
+			def setup(info): # {{{
+				if isinstance(info, str):
+					i = {}
+					for l in info[1:].split(info[0]):
+						k, v = l.split(None, 1)
+						i[k] = v
+					info = i
+				if 'name' in info:
+					self.set_name(info['name'])
+				if 'program_name' in info:
+					self.set_program_name(info['program_name'])
+				if 'version' in info:
+					self.set_version(info['version'])
+				if 'copyright' in info:
+					self.set_copyright(info['copyright'])
+				if 'comments' in info:
+					self.set_comments(info['comments'])
+				if 'license' in info:
+					self.set_license(info['license'])
+				if 'wrap_license' in info:
+					self.set_wrap_license(as_bool(info['wrap_license']))
+				if 'website' in info:
+					self.set_website(info['website'])
+				if 'website_label' in info:
+					self.set_website_label(info['website_label'])
+				if 'authors' in info:
+					self.set_authors(info['authors'])
+				if 'documenters' in info:
+					self.set_documenters(info['documenters'])
+				if 'artists' in info:
+					self.set_artists(info['artists'])
+				if 'translator_credits' in info:
+					self.set_translator_credits(info['translator_credits'])
+			# }}}
+			gui.register_attribute('setup', None, setup)
+	builtins['AboutDialog'] = AboutDialog
+	# }}}
+	class Dialog(Gtk.Dialog): # {{{
+		gtk_window = True
+		lazy = True
+		def __init__(self, gui):
+			Gtk.Dialog.__init__(self)
+			self.set_modal(True)
+			buttons = int(gui.get_attribute('buttons', default = 1))
+			if not gui.assert_children(buttons, -1):
+				raise ValueError('not enough buttons defined')
+			cbs = [None] * buttons
+			for i in range(buttons):
+				b = gui.desc.children[i]
+				if b.tag != 'Button':
+					gui.desc.children[i] = gui.gui.__element__('Button', {}, [b])
+				cbs[i] = gui.register_event('response')
+			gui.action_add(0, buttons - 1)
+			def response(widget, choice):
+				gui.gui._showwin(self, False)
+				if cbs[choice] is None:
+					return
+				cbs[choice] ()
+			gui.register_attribute('run', None, lambda x: self.run())
+			gui.register_attribute('title', self.get_title, self.set_title)
+			self.connect('response', response)
+			gui.pack_add(target = self.vbox, start = buttons)
+	builtins['Dialog'] = Dialog
+	# }}}
+	class Socket(Gtk.Socket): # {{{
+		def __init__(self, gui):
+			Gtk.Socket.__init__(self)
+			gui.register_attribute('id', self.get_id, None)
+	builtins['Socket'] = Socket
+	#}}}
+	class VBox(Gtk.VBox): # {{{
+		def __init__(self, gui):
+			Gtk.VBox.__init__(self)
+			gui.pack_add()
+	builtins['VBox'] = VBox
+	#}}}
+	class HBox(Gtk.HBox): # {{{
+		def __init__(self, gui):
+			Gtk.HBox.__init__(self)
+			gui.pack_add()
+	builtins['HBox'] = HBox
+	#}}}
+	class Notebook(Gtk.Notebook): # {{{
+		def __init__(self, gui):
+			Gtk.Notebook.__init__(self)
+			gui.register_bool_attribute('show_tabs', self.get_show_tabs, self.set_show_tabs)
+			tab_pos = {Gtk.PositionType.TOP: 'top', Gtk.PositionType.BOTTOM: 'bottom', Gtk.PositionType.LEFT: 'left', Gtk.PositionType.RIGHT: 'right'}
+			gui.register_attribute('tab_pos', lambda: tab_pos[self.get_tab_pos()], lambda x: self.set_tab_pos([t[0] for t in tab_pos.items() if t[1] == x][0]))
+			def save_page():
+				p = self.get_current_page()
+				return lambda: self.set_current_page(p)
+			gui.register_attribute('save_page', lambda: save_page, None)
+			gui.register_gtk_event('switch_page')
+			gui.notebook_add()
+	builtins['Notebook'] = Notebook
+	#}}}
+	class Button(Gtk.Button): # {{{
+		def __init__(self, gui):
+			Gtk.Button.__init__(self)
+			self.setup(gui)
+			gui.add()
+		def setup(self, gui):
+			gui.register_gtk_event('clicked')
+	builtins['Button'] = Button
+	#}}}
+	class CheckButton(Gtk.CheckButton): # {{{
+		def __init__(self, gui):
+			Gtk.CheckButton.__init__(self)
+			self.setup(gui)
+			gui.add()
+		def setup(self, gui):
+			def get(): # {{{
+				if self.get_inconsistent():
+					return None
+				return self.get_active()
+			# }}}
+			def set(value): # {{{
+				if value is None:
+					self.set_inconsistent(True)
+				else:
+					self.set_inconsistent(False)
+					self.set_active(as_bool(value))
+			# }}}
+			gui.register_attribute('value', get, set)
+			gui.register_gtk_event('toggled')
+	builtins['CheckButton'] = CheckButton
+	#}}}
+	class RadioButton(Gtk.RadioButton): # {{{
+		def __init__(self, gui):
+			Gtk.RadioButton.__init__(self)
+			self.group = ''
+			if len(gui.gui.__radio_groups__[self.group]) > 0:
+				self.set_group(gui.gui.__radio_groups__[self.group][0])
+			gui.gui.__radio_groups__[self.group].append(self)
+			def get(): # {{{
+				if self.get_inconsistent():
+					return None
+				return self.get_active()
+			# }}}
+			def get_group(): # {{{
+				return self.group
+			# }}}
+			def set(value): # {{{
+				if value is None:
+					self.set_inconsistent(True)
+				else:
+					self.set_inconsistent(False)
+					self.set_active(as_bool(value))
+			# }}}
+			def set_group(group): # {{{
+				gui.gui.__radio_groups__[self.group].remove(self)
+				if self.group != '' and len(gui.gui.__radio_groups__[self.group]) == 0:
+					del gui.gui.__radio_groups__[self.group]
+				if group in gui.gui.__radio_groups__:
+					gui.gui.__use_name__(gui.gui.__radio_groups__, group)
+					self.set_group(gui.gui.__radio_groups__[group][0])
+				else:
+					self.set_group(None)
+					gui.gui.__add_name__(gui.gui.__radio_groups__, group, [])
+				gui.gui.__radio_groups__[group].append(self)
+				self.group = group
+			# }}}
+			gui.register_attribute('value', get, set)
+			gui.register_attribute('group', get_group, set_group)
+			gui.register_gtk_event('toggled')
+			gui.add()
+	builtins['RadioButton'] = RadioButton
+	#}}}
+	class Entry(Gtk.Entry): # {{{
+		def __init__(self, gui):
+			Gtk.Entry.__init__(self)
+			gui.assert_children(0)
+			self.setup(gui)
+		def setup(self, gui):
+			gui.register_attribute('value', self.get_text, self.set_text)
+			gui.register_gtk_event('activate')
+			gui.register_gtk_event('changed')
+	builtins['Entry'] = Entry
+	#}}}
+	class Frame(Gtk.Frame): # {{{
+		def __init__(self, gui):
+			Gtk.Frame.__init__(self)
+			self.setup(gui)
+			gui.add()
+		def setup(self, gui):
+			gui.register_attribute('label', self.get_label, lambda value: self.set_label(None if value == '' else value))
+	builtins['Frame'] = Frame
+	# }}}
+	class Table(Gtk.Table): # {{{
+		def __init__(self, gui):
+			cols = int(gui.get_attribute('columns', default = 1))
+			Gtk.Table.__init__(self, 1, cols)
+			gui.table_add()
+	builtins['Table'] = Table
+	#}}}
+	class SpinButton(Gtk.SpinButton): # {{{
+		def __init__(self, gui):
+			Gtk.SpinButton.__init__(self)
+			gui.assert_children(0)
+			self.setup(gui)
+		def setup(self, gui):
+			self.set_increments(1, 10)
+			gui.register_attribute('range', self.get_range, lambda r: self.set_range(*parse_nums(r)), native = lambda r: self.set_range(*r))
+			gui.register_attribute('digits', self.get_digits, lambda v: self.set_digits(int(v)), native = self.set_digits)
+			gui.register_attribute('value', self.get_value, lambda v: self.set_value(float(v)), native = self.set_value)
+			gui.register_attribute('increment', self.get_increments, lambda r: self.set_increments(*parse_nums(r)), native = lambda r: self.set_increments(*r))
+			gui.register_gtk_event('value-changed')
+	builtins['SpinButton'] = SpinButton
+	#}}}
+	class ComboBoxText(Gtk.ComboBox): # {{{
+		def __init__(self, gui):
+			# The texts in the model, and the row of the first occurrence of every text.
+			self.mem_texts = []
+			self.mem_index = {}
+			def setcontent(value): # {{{
+				if isinstance(value, str):
+					l = value.split('\n')
+				else:
+					l = value
+				# Fill a new model while it is not attached to the widget, then replace the old one.
+				model = Gtk.ListStore(str)
+				self.mem_texts = [i.strip() for i in l]
+				self.mem_index = {}
+				for row, text in enumerate(self.mem_texts):
+					model.append((text,))
+					self.mem_index.setdefault(text, row)
+				self.set_model(model)
+			# }}}
+			def set(value): # {{{
+				row = self.mem_index.get(value)
+				if row is None:
+					row = len(self.mem_texts)
+					self.get_model().append((value,))
+					self.mem_texts.append(value)
+					self.mem_index[value] = row
+				self.set_active(row)
+			# }}}
+			def get(): # {{{
+				row = self.get_active()
+				return self.mem_texts[row] if row >= 0 else ''
+			# }}}
+			Gtk.ComboBox.__init__(self)
+			self.set_model(Gtk.ListStore(str))
+			renderer = Gtk.CellRendererText()
+			self.pack_start(renderer, True)
+			self.add_attribute(renderer, 'text', 0)
+			gui.assert_children(0, 1)
+			if len(gui.desc.children) > 0:
+				if nice_assert(gui.desc.children[0].tag == 'Label' and gui.desc.children[0].attributes['value'].startswith(':'), 'ComboBoxText child must be a Label'):
+					setcontent(gui.desc.children[0].attributes['value'][1:])
+			gui.register_attribute('content', None, setcontent)
+			gui.register_attribute('value', self.get_active, self.set_active)
+			gui.register_attribute('text', get, set)
+			gui.register_gtk_event('changed')
+	builtins['ComboBoxText'] = ComboBoxText
+	#}}}
+	'''
+	class ComboBoxEntryText(Gtk.ComboBoxEntry): # {{{
+		def __init__(self, gui):
+			def setcontent(value): # {{{
+				if isinstance(value, str):
+					l = value.split('\n')
+				else:
+					l = value
+				self.get_model().clear()
+				for i in l:
+					self.get_model().append((i.strip(),))
+			# }}}
+			def set(value): # {{{
+				def fill(model, path, iter, d): # {{{
+					d += (model.get_value(iter, 0),)
+					return False
+				# }}}
+				d = []
+				self.get_model().foreach(fill, d)
+				if value in d:
+					self.set_active(d.index(value))
+				else:
+					self.get_model().append((value,))
+					self.set_active(len(d))
+			# }}}
+			Gtk.ComboBoxEntry.__init__(self, Gtk.ListStore(str))
+			gui.assert_children(0, 1)
+			if len(gui.desc.children) > 0:
+				if nice_assert(gui.desc.children[0].tag == 'Label' and gui.desc.children[0].attributes['value'].startswith(':'), 'ComboBoxEntryText child must be a Label'):
+					setcontent(gui.desc.children[0].attributes['value'][1:])
+			gui.register_attribute('content', None, setcontent)
+			gui.register_attribute('value', self.get_active, self.set_active)
+			gui.register_attribute('text', self.child.get_text, set)
+			gui.register_gtk_event('changed')
+			gui.register_gtk_event('activate', gtk_widget = self.child)
+	builtins['ComboBoxEntryText'] = ComboBoxEntryText
+	#}}}
+	#'''
+	class FileChooser(object): # Base class for FileChooserButton and FileChooserDialog.{{{
+		def __init__(self, gui, signal, hide):
+			self.must_hide = hide
+			gui.assert_children(0)
+			def set_action(value): # {{{
+				if value == 'open':
+					self.set_action(Gtk.FileChooserAction.OPEN)
+				elif value == 'save':
+					self.set_action(Gtk.FileChooserAction.SAVE)
+				elif value == 'select_folder':
+					self.set_action(Gtk.FileChooserAction.SELECT_FOLDER)
+				elif value == 'create_folder':
+					self.set_action(Gtk.FileChooserAction.CREATE_FOLDER)
+				else:
+					error('invalid action type %s for FileChooser' % value)
+			# }}}
+			def get_action(): # {{{
+				a = self.get_action()
+				if a == Gtk.FileChooserAction.OPEN:
+					return 'open'
+				if a == Gtk.FileChooserAction.SAVE:
+					return 'save'
+				if a == Gtk.FileChooserAction.SELECT_FOLDER:
+					return 'select_folder'
+				if a == Gtk.FileChooserAction.CREATE_FOLDER:
+					return 'create_folder'
+				error('invalid action type for FileChooser')
+			# }}}
+			gui.register_attribute('title', self.get_title, self.set_title)
+			gui.register_attribute('action', get_action, set_action)
+			gui.register_attribute('filename', self.get_filename, self.set_filename)
+			gui.register_bool_attribute('overwrite_confirmation', self.get_do_overwrite_confirmation, self.set_do_overwrite_confirmation)
+			v = gui.register_event('response')
+			if v is not None:
+				def response(widget): # {{{
+					if self.must_hide:
+						gui.gui._showwin(self, False)
+					v(widget.get_filename())
+				# }}}
+				# A FileChooserDialog provides a response and fills the dummy argument; a FileChooserButton doesn't provide a response, puts ACCEPT there, and omits the dummy argument.
+				self.connect(signal, response)
+	class FileChooserButton(FileChooser, Gtk.FileChooserButton): # {{{
+		def __init__(self, gui):
+			Gtk.FileChooserButton.__init__(self, '')
+			FileChooser.__init__(self, gui, 'file-set', False)
+	builtins['FileChooserButton'] = FileChooserButton
+	# }}}
+	class FileChooserDialog(FileChooser, Gtk.FileChooserDialog): # {{{
+		gtk_window = True
+		lazy = True
+		def __init__(self, gui):
+			Gtk.FileChooserDialog.__init__(self, '', buttons = (Gtk.STOCK_CANCEL, Gtk.ResponseType.REJECT, Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT))
+			FileChooser.__init__(self, gui, 'response', True)
+	builtins['FileChooserDialog'] = FileChooserDialog
+	# }}}
+	# }}}
+	class HSeparator(Gtk.HSeparator): # {{{
+		def __init__(self, gui):
+			Gtk.HSeparator.__init__(self)
+			gui.assert_children(0)
+	builtins['HSeparator'] = HSeparator
+	#}}}
+	class VSeparator(Gtk.VSeparator): # {{{
+		def __init__(self, gui):
+			Gtk.VSeparator.__init__(self)
+			gui.assert_children(0)
+	builtins['VSeparator'] = VSeparator
+	#}}}
+	class VScale(Gtk.VScale): # {{{
+		def __init__(self, gui):
+			Gtk.VScale.__init__(self)
+			gui.assert_children(0)
+			gui.register_attribute('digits', self.get_digits, lambda v: self.set_digits(int(v)), native = self.set_digits)
+			gui.register_attribute('draw_value', self.get_draw_value, lambda v: self.set_draw_value(as_bool(v)), native = self.set_draw_value)
+			pos2str = {Gtk.PositionType.LEFT: 'left', Gtk.PositionType.RIGHT: 'right', Gtk.PositionType.TOP: 'top', Gtk.PositionType.BOTTOM: 'bottom'}
+			str2pos = {'left': Gtk.PositionType.LEFT, 'right': Gtk.PositionType.RIGHT, 'top': Gtk.PositionType.TOP, 'bottom': Gtk.PositionType.BOTTOM}
+			gui.register_attribute('value_pos', lambda: pos2str[self.get_value_pos()], lambda v: self.set_value_pos(str2pos[v]))
+			# marks
+			self.mem_marks = []
+			def set_marks(marks):
+				self.mem_marks = marks
+				self.clear_marks()
+				for m in marks:
+					self.add_mark(m[0], str2pos[m[1]], m[2])
+			gui.register_attribute('marks', lambda: self.mem_marks, set_marks)
+			self.set_increments(1, 10)
+			gui.register_attribute('range', (self.get_adjustment().get_lower(), self.get_adjustment().get_upper()), lambda r: self.set_range(*parse_nums(r)))
+			gui.register_attribute('value', self.get_value, lambda v: self.set_value(float(v)), native = self.set_value)
+			gui.register_attribute('increment', (self.get_adjustment().get_step_increment(), self.get_adjustment().get_page_increment()), lambda r: self.set_increments(*parse_nums(r)))
+			gui.register_gtk_event('value-changed')
+
+	builtins['VScale'] = VScale
+	#}}}
+	class HScale(Gtk.HScale): # {{{
+		def __init__(self, gui):
+			Gtk.HScale.__init__(self)
+			gui.assert_children(0)
+			gui.register_attribute('digits', self.get_digits, lambda v: self.set_digits(int(v)), native = self.set_digits)
+			gui.register_attribute('draw_value', self.get_draw_value, lambda v: self.set_draw_value(as_bool(v)), native = self.set_draw_value)
+			pos2str = {Gtk.PositionType.LEFT: 'left', Gtk.PositionType.RIGHT: 'right', Gtk.PositionType.TOP: 'top', Gtk.PositionType.BOTTOM: 'bottom'}
+			str2pos = {'left': Gtk.PositionType.LEFT, 'right': Gtk.PositionType.RIGHT, 'top': Gtk.PositionType.TOP, 'bottom': Gtk.PositionType.BOTTOM}
+			gui.register_attribute('value_pos', lambda: pos2str[self.get_value_pos()], lambda v: self.set_value_pos(str2pos[v]))
+			# marks
+			self.mem_marks = []
+			def set_marks(marks):
+				self.mem_marks = marks
+				self.clear_marks()
+				for m in marks:
+					self.add_mark(m[0], str2pos[m[1]], m[2])
+			gui.register_attribute('marks', lambda: self.mem_marks, set_marks)
+			self.set_increments(1, 10)
+			gui.register_attribute('range', (self.get_adjustment().get_lower(), self.get_adjustment().get_upper()), lambda r: self.set_range(*parse_nums(r)))
+			gui.register_attribute('value', self.get_value, lambda v: self.set_value(float(v)), native = self.set_value)
+			gui.register_attribute('increment', (self.get_adjustment().get_step_increment(), self.get_adjustment().get_page_increment()), lambda r: self.set_increments(*parse_nums(r)))
+			gui.register_gtk_event('value-changed')
+
+	builtins['HScale'] = HScale
+	#}}}
+	class MenuBar: # {{{
+		def __init__(self, gui):
+			ui = Gtk.UIManager()
+			gui.gui.__accel_groups__.append(ui.get_accel_group())
+			actiongroup = Gtk.ActionGroup('actiongroup')
+			childdesc, actions = gui.parse_menubar()
+			actiongroup.add_actions(actions)
+			ui.add_ui_from_string('<ui><menubar>' + childdesc + '</menubar></ui>')
+			ui.insert_action_group(actiongroup)
+			self.return_object = ui.get_widget('/menubar')
+	builtins['MenuBar'] = MenuBar
+	#}}}
+	class HPaned(Gtk.HPaned): # {{{
+		def __init__(self, gui):
+			Gtk.HPaned.__init__(self)
+			gui.assert_children(2)
+			gui.paned_add()
+	builtins['HPaned'] = HPaned
+	#}}}
+	class VPaned(Gtk.VPaned): # {{{
+		def __init__(self, gui):
+			Gtk.VPaned.__init__(self)
+			gui.assert_children(2)
+			gui.paned_add()
+	builtins['VPaned'] = VPaned
+	#}}}
+	class Statusbar(Gtk.Statusbar): # {{{
+		def __init__(self, gui):
+			Gtk.Statusbar.__init__(self)
+			gui.assert_children(0)
+			self.value = ''
+			self.push(0, self.value)
+			def set(v): # {{{
+				self.pop(0)
+				self.value = v
+				self.push(0, self.value)
+			# }}}
+			gui.register_attribute('text', lambda: self.value, set)
+	builtins['Statusbar'] = Statusbar
+	#}}}
+	class Image(ImageFrameBase, Gtk.Image): # {{{
+		def __init__(self, gui):
+			Gtk.Image.__init__(self)
+			gui.assert_children(0)
+			gui.register_attribute('pixbuf', self.get_pixbuf, self.set_from_pixbuf)
+			self.setup_frame(gui)
+		def show_frame(self, frame): # {{{
+			data, width, height, channels, rowstride = frame
+			# GLib.Bytes takes the only copy of the pixels, directly from the buffer.
+			pixbuf = GdkPixbuf.Pixbuf.new_from_bytes(GLib.Bytes.new(data), GdkPixbuf.Colorspace.RGB, channels == 4, 8, width, height, rowstride)
+			self.set_from_pixbuf(pixbuf)
+		# }}}
+	builtins['Image'] = Image
+	#}}}
+	class TextView(TextLogBase, Gtk.TextView): # {{{
+		def __init__(self, gui):
+			Gtk.TextView.__init__(self)
+			gui.assert_children(0)
+			buffer = self.get_buffer()
+			self.log_end = buffer.create_mark(None, buffer.get_end_iter(), False)
+			gui.register_attribute('text', lambda: self.get_buffer().get_text(self.get_buffer().get_start_iter(), self.get_buffer().get_end_iter(), True), self.get_buffer().set_text)
+			wrap_modes = {} #{Gtk.WRAP_NONE: 'none', Gtk.WRAP_CHAR: 'char', Gtk.WRAP_WORD: 'word', Gtk.WRAP_WORD_CHAR: 'word_char'}
+			gui.register_attribute('wrap_mode', lambda: wrap_modes[self.get_wrap_mode()], lambda x: self.set_wrap_mode([t[0] for t in wrap_modes.items() if t[1] == x][0]))
+			gui.register_bool_attribute('editable', self.get_editable, self.set_editable)
+			self.setup_log(gui)
+		def write_lines(self, lines): # {{{
+			buffer = self.get_buffer()
+			buffer.insert(buffer.get_end_iter(), '\n'.join(lines) + '\n')
+			if self.max_lines > 0:
+				# A buffer which ends with a newline has an empty line after it, which is not counted.
+				count = buffer.get_line_count()
+				if buffer.get_end_iter().starts_line():
+					count -= 1
+				excess = count - self.max_lines
+				if excess > 0:
+					buffer.delete(buffer.get_start_iter(), buffer.get_iter_at_line(excess))
+			if self.autoscroll:
+				self.scroll_to_mark(self.log_end, 0, False, 0, 0)
+		# }}}
+	builtins['TextView'] = TextView
+	#}}}
+	class DataTable(DataTableBase, Gtk.Grid): # {{{
+		'''Table which only draws the visible rows of its data.'''
+		def __init__(self, gui):
+			Gtk.Grid.__init__(self)
+			self.row_height = None
+			self.page = 1
+			self.adjustment = Gtk.Adjustment(value = 0, lower = 0, upper = 0, step_increment = 1, page_increment = 1, page_size = 1)
+			self.area = Gtk.DrawingArea()
+			self.area.set_hexpand(True)
+			self.area.set_vexpand(True)
+			self.area.add_events(Gdk.EventMask.SCROLL_MASK | Gdk.EventMask.BUTTON_PRESS_MASK)
+			scrollbar = Gtk.Scrollbar(orientation = Gtk.Orientation.VERTICAL, adjustment = self.adjustment)
+			self.attach(self.area, 0, 0, 1, 1)
+			self.attach(scrollbar, 1, 0, 1, 1)
+			self.area.show()
+			scrollbar.show()
+			self.area.connect('draw', lambda widget, cr: self.paint(cr, widget.get_allocated_width(), widget.get_allocated_height()))
+			self.area.connect('size-allocate', lambda widget, rect: self.update_adjustment())
+			self.area.connect('scroll-event', self.scroll)
+			self.area.connect('button-press-event', self.button)
+			self.adjustment.connect('value-changed', self.scrolled)
+			self.setup(gui)
+		def redraw(self): # {{{
+			self.update_adjustment()
+			self.area.queue_draw()
+		# }}}
+		def update_adjustment(self): # {{{
+			if self.row_height is not None:
+				self.page = max(1, self.area.get_allocated_height() // self.row_height - 1)
+			self.adjustment.configure(min(self.first, max(0, len(self.table) - self.page)), 0, len(self.table), 1, self.page, self.page)
+		# }}}
+		def scrolled(self, adjustment): # {{{
+			self.first = int(adjustment.get_value())
+			self.area.queue_draw()
+		# }}}
+		def scroll(self, widget, event): # {{{
+			if event.direction == Gdk.ScrollDirection.UP:
+				delta = -3
+			elif event.direction == Gdk.ScrollDirection.DOWN:
+				delta = 3
 			else:
-				l = value
-			self.get_model().clear()
-			for i in l:
-				self.get_model().append((i.strip(),))
+				return False
+			self.adjustment.set_value(self.adjustment.get_value() + delta)
+			return True
 		# }}}
-		def set(value): # {{{
-			def fill(model, path, iter, d): # {{{
-				d += (model.get_value(iter, 0),)
+		def button(self, widget, event): # {{{
+			if self.row_height is None or event.button != 1:
 				return False
-			# }}}
-			d = []
-			self.get_model().foreach(fill, d)
-			if value in d:
-				self.set_active(d.index(value))
+			index = int(event.y) // self.row_height - 1
+			if index >= 0:
+				self.select(self.first + index, event.type == Gdk.EventType.DOUBLE_BUTTON_PRESS)
+			return True
+		# }}}
+		def paint(self, cr, width, height): # {{{
+			'''Draw the header and the visible rows.'''
+			layout = PangoCairo.create_layout(cr)
+			if self.row_height is None:
+				layout.set_text('Xg', -1)
+				self.row_height = layout.get_pixel_size()[1] + 2
+				self.update_adjustment()
+			rh = self.row_height
+			titles = self.table.get_titles()
+			colw = width / max(1, len(titles))
+			layout.set_width(max(1, int(colw) - 4) * Pango.SCALE)
+			layout.set_ellipsize(Pango.EllipsizeMode.END)
+			style = self.area.get_style_context()
+			fg = style.get_color(Gtk.StateFlags.NORMAL)
+			selected = style.get_background_color(Gtk.StateFlags.SELECTED)
+			cr.set_source_rgba(fg.red, fg.green, fg.blue, fg.alpha)
+			for c, title in enumerate(titles):
+				layout.set_markup('<b>%s</b>' % GLib.markup_escape_text(title), -1)
+				cr.move_to(c * colw + 2, 1)
+				PangoCairo.show_layout(cr, layout)
+			cr.set_line_width(1)
+			cr.move_to(0, rh - .5)
+			cr.line_to(width, rh - .5)
+			cr.stroke()
+			for y, (r, cells) in enumerate(self.table.window(self.first, height // rh)):
+				top = (y + 1) * rh
+				if r == self.selected:
+					cr.set_source_rgba(selected.red, selected.green, selected.blue, selected.alpha)
+					cr.rectangle(0, top, width, rh)
+					cr.fill()
+					cr.set_source_rgba(fg.red, fg.green, fg.blue, fg.alpha)
+				for c, cell in enumerate(cells):
+					layout.set_text(str(cell), -1)
+					cr.move_to(c * colw + 2, top + 1)
+					PangoCairo.show_layout(cr, layout)
+			return False
+		# }}}
+	builtins['DataTable'] = DataTable
+	#}}}
+	class Repeat(RepeatBase, Gtk.Box): # {{{
+		'''Box with a row for every item of a sequence.'''
+		def __init__(self, gui):
+			horizontal = gui.get_attribute('orientation') == 'horizontal'
+			Gtk.Box.__init__(self, orientation = Gtk.Orientation.HORIZONTAL if horizontal else Gtk.Orientation.VERTICAL)
+			self.setup(gui)
+		def insert_row(self, widget, position): # {{{
+			self.pack_start(widget, False, False, 0)
+			self.reorder_child(widget, position)
+		# }}}
+		def move_row(self, widget, position): # {{{
+			self.reorder_child(widget, position)
+		# }}}
+		def remove_row(self, widget): # {{{
+			widget.destroy()
+		# }}}
+	builtins['Repeat'] = Repeat
+	#}}}
+	class Plot(PlotBase, Gtk.DrawingArea): # {{{
+		'''Line plot of many samples, which draws the minimum and maximum per pixel column.'''
+		def __init__(self, gui):
+			Gtk.DrawingArea.__init__(self)
+			self.set_size_request(100, 50)
+			self.connect('draw', lambda widget, cr: self.paint(cr, widget.get_allocated_width(), widget.get_allocated_height()))
+			self.setup_plot(gui)
+		def redraw(self, first, last): # {{{
+			width = self.get_allocated_width()
+			if first is None or self.plot.span() == 0:
+				self.queue_draw()
+				return
+			left = max(0, self.plot.column(first, width))
+			right = self.plot.column(last, width) + 1
+			self.queue_draw_area(left, 0, right - left + 1, self.get_allocated_height())
+		# }}}
+		def scroll(self, samples): # {{{
+			'''Move the drawing to the left; the columns that come in on the right are drawn when the new samples are.'''
+			width = self.get_allocated_width()
+			columns = self.plot.shift(samples, width)
+			window = self.get_window()
+			if window is None or columns >= width:
+				self.queue_draw()
+			elif columns > 0:
+				window.scroll(-columns, 0)
+		# }}}
+		def paint(self, cr, width, height): # {{{
+			'''Draw the columns within the clip region.'''
+			left, top, right, bottom = cr.clip_extents()
+			style = self.get_style_context()
+			Gtk.render_background(style, cr, 0, 0, width, height)
+			# Include the column to the left, for the line from it.
+			columns, minima, maxima = self.plot.columns(width, int(left) - 1, int(right) + 1)
+			if len(columns) == 0:
+				return False
+			low, high = self.value_range()
+			scale = (height - 1) / (high - low) if high > low else 0
+			fg = style.get_color(Gtk.StateFlags.NORMAL)
+			cr.set_source_rgba(fg.red, fg.green, fg.blue, fg.alpha)
+			cr.set_line_width(1)
+			for c, ymin, ymax in zip(columns, minima, maxima):
+				x = c + .5
+				cr.line_to(x, height - .5 - (ymin - low) * scale)
+				cr.line_to(x, height - .5 - (ymax - low) * scale)
+			cr.stroke()
+			return False
+		# }}}
+	builtins['Plot'] = Plot
+	#}}}
+	# Make the classes available as module attributes.
+	for name, value in list(locals().items()):
+		if isinstance(value, type):
+			globals()[name] = value
+	# Builtins which Builder can create, with their class name and number of children.
+	builder = Builder(Gtk, {
+			'Label': ('GtkLabel', Label, 0),
+			'Entry': ('GtkEntry', Entry, 0),
+			'SpinButton': ('GtkSpinButton', SpinButton, 0),
+			'HSeparator': ('GtkHSeparator', HSeparator, 0),
+			'VSeparator': ('GtkVSeparator', VSeparator, 0),
+			'Button': ('GtkButton', Button, 1),
+			'CheckButton': ('GtkCheckButton', CheckButton, 1),
+			'Frame': ('GtkFrame', Frame, 1),
+			'ScrolledWindow': ('GtkScrolledWindow', ScrolledWindow, 1),
+			'VBox': ('GtkVBox', VBox, None),
+			'HBox': ('GtkHBox', HBox, None),
+		})
+	def watch(widget, callback): # {{{
+		'''Call callback when a property of widget changes, or the contents of its buffer, adjustment or model.
+		Only builtin widget types which keep their value in Gtk are watched.'''
+		if not isinstance(widget, (Gtk.Label, Gtk.Entry, Gtk.ToggleButton, Gtk.Range, Gtk.TextView, Gtk.ComboBox, Gtk.Frame, Gtk.Window, Gtk.Notebook)) or isinstance(widget, (DataTableBase, RepeatBase, PlotBase, ImageFrameBase)):
+			return None
+		handlers = [(widget, widget.connect('notify', callback))]
+		sources = []
+		if isinstance(widget, Gtk.TextView):
+			sources.append((widget.get_buffer(), ('changed',)))
+		if isinstance(widget, (Gtk.Range, Gtk.SpinButton)):
+			sources.append((widget.get_adjustment(), ('changed', 'value-changed')))
+		if isinstance(widget, Gtk.ComboBox) and widget.get_model() is not None:
+			sources.append((widget.get_model(), ('row-changed', 'row-inserted', 'row-deleted', 'rows-reordered')))
+		for obj, signals in sources:
+			for signal in signals:
+				handlers.append((obj, obj.connect(signal, callback)))
+		def stop():
+			for obj, handler in handlers:
+				obj.disconnect(handler)
+		return stop
+	# }}}
+	def asyncio_policy(): # {{{
+		'''Return an asyncio event loop policy whose loops run the GLib main context, or None if PyGObject has none.'''
+		try:
+			from gi.events import GLibEventLoopPolicy
+		except ImportError:
+			return None
+		return GLibEventLoopPolicy()
+	# }}}
+	def asyncio_loop(loop): # {{{
+		'''Return True if the asyncio loop runs the GLib main context.'''
+		try:
+			from gi.events import GLibEventLoop
+		except ImportError:
+			return False
+		return isinstance(loop, GLibEventLoop)
+	# }}}
+	return Toolkit('gtk', builtins, Gtk, GLib, builder, watch, asyncio_policy = asyncio_policy, asyncio_loop = asyncio_loop)
+# }}}
+#}}}
+
+# Toolkits. {{{
+class Toolkit: # {{{
+	'''Toolkit-specific parts of a gui.
+	builtins is the dict of builtin widget classes.
+	Gtk and GLib provide the parts of the Gtk and GLib modules that the generic code uses:
+	the main loop functions, idle and timeout sources, and the packing constants.
+	builder is a Builder, or None if the toolkit has no way to build many widgets at once.
+	watch(widget, callback) makes callback get called when the value of
+	widget may have changed; it returns a function that stops this, or
+	None if the widget cannot be watched.
+	asyncio_policy() returns an asyncio event loop policy whose loops also
+	run the toolkit main loop, or None if there is none.
+	asyncio_loop(loop) returns True if the asyncio loop runs the toolkit
+	main loop.
+	next_timeout() returns the number of seconds until a timeout source
+	is due, 0 if a source is ready, or None if there is no source; it is
+	None if the toolkit main loop can only be run by asyncio_loop loops.'''
+	def __init__(self, name, builtins, Gtk, GLib, builder = None, watch = None, next_timeout = None, asyncio_policy = None, asyncio_loop = None):
+		self.name = name
+		self.builtins = builtins
+		self.Gtk = Gtk
+		self.GLib = GLib
+		self.builder = builder
+		self.watch = watch if watch is not None else lambda widget, callback: None
+		self.next_timeout = next_timeout
+		self.asyncio_policy = asyncio_policy if asyncio_policy is not None else lambda: None
+		self.asyncio_loop = asyncio_loop if asyncio_loop is not None else lambda loop: False
+# }}}
+# Toolkits by name; a function in this dict is called on first use, and replaced by the Toolkit it returns.
+toolkits = {}
+toolkits['gtk'] = load_gtk
+
+def get_toolkit(name): # {{{
+	'''Return the toolkit with the given name, loading it if needed.'''
+	if not isinstance(toolkits[name], Toolkit):
+		toolkits[name] = toolkits[name]()
+	return toolkits[name]
+# }}}
+
+# Module attributes which are defined by load_gtk. {{{
+gtk_names = frozenset(('Gtk', 'GLib', 'Label', 'Window', 'ScrolledWindow', 'AboutDialog', 'Dialog', 'Socket', 'VBox', 'HBox', 'Notebook', 'Button', 'CheckButton', 'RadioButton', 'Entry', 'Frame', 'Table', 'SpinButton', 'ComboBoxText', 'FileChooser', 'FileChooserButton', 'FileChooserDialog', 'HSeparator', 'VSeparator', 'VScale', 'HScale', 'MenuBar', 'HPaned', 'VPaned', 'Statusbar', 'Image', 'TextView', 'DataTable', 'Repeat', 'Plot'))
+# }}}
+
+def __getattr__(name): # {{{
+	'''Load the Gtk toolkit when Gtk, GLib or one of the Gtk builtin classes is used.
+	Other names are not looked up, so introspection works without Gtk.'''
+	if name not in gtk_names:
+		raise AttributeError(name)
+	get_toolkit('gtk')
+	if name not in globals():
+		raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+	return globals()[name]
+# }}}
+# }}}
+
+# Null toolkit. {{{
+# The null toolkit implements the builtin widgets as plain Python objects.
+# It needs no display, and can be used to run an application without a gui,
+# for example for testing and benchmarking.
+class NullMainLoop: # {{{
+	'''Main loop for the null toolkit, providing idle and timeout sources.
+	Sources may be added from any thread.'''
+	def __init__(self): # {{{
+		self.cond = threading.Condition()
+		self.next_id = 1
+		self.idle = {}
+		self.timeouts = []
+		self.running = []
+	# }}}
+	def idle_add(self, cb, *args, **kwargs): # {{{
+		with self.cond:
+			ret = self.next_id
+			self.next_id += 1
+			self.idle[ret] = (cb, args)
+			self.cond.notify()
+		return ret
+	# }}}
+	def timeout_add(self, interval, cb, *args, **kwargs): # {{{
+		with self.cond:
+			ret = self.next_id
+			self.next_id += 1
+			heapq.heappush(self.timeouts, (time.monotonic() + interval / 1000., ret, interval, cb, args))
+			self.cond.notify()
+		return ret
+	# }}}
+	def source_remove(self, id): # {{{
+		with self.cond:
+			if id in self.idle:
+				del self.idle[id]
+				return True
+			for i, t in enumerate(self.timeouts):
+				if t[1] == id:
+					self.timeouts[i] = self.timeouts[-1]
+					self.timeouts.pop()
+					heapq.heapify(self.timeouts)
+					return True
+		return False
+	# }}}
+	def next_source(self, blocking): # {{{
+		'''Remove the next source that should be dispatched and return it, or None.
+		Timeouts which are due are dispatched before idle sources.'''
+		with self.cond:
+			while True:
+				now = time.monotonic()
+				if len(self.timeouts) > 0 and self.timeouts[0][0] <= now:
+					due, id, interval, cb, args = heapq.heappop(self.timeouts)
+					return (id, interval, cb, args)
+				if len(self.idle) > 0:
+					id = next(iter(self.idle))
+					cb, args = self.idle.pop(id)
+					return (id, None, cb, args)
+				if not blocking or (len(self.running) > 0 and not self.running[-1]):
+					return None
+				self.cond.wait(self.timeouts[0][0] - now if len(self.timeouts) > 0 else None)
+	# }}}
+	def events_pending(self): # {{{
+		with self.cond:
+			return len(self.idle) > 0 or (len(self.timeouts) > 0 and self.timeouts[0][0] <= time.monotonic())
+	# }}}
+	def next_timeout(self): # {{{
+		'''Return the number of seconds until the next source is due, or None if there are none.'''
+		with self.cond:
+			if len(self.idle) > 0:
+				return 0.
+			if len(self.timeouts) > 0:
+				return max(0., self.timeouts[0][0] - time.monotonic())
+			return None
+	# }}}
+	def main_iteration_do(self, blocking): # {{{
+		source = self.next_source(blocking)
+		if source is None:
+			return False
+		id, interval, cb, args = source
+		if not cb(*args):
+			return False
+		# The callback wants to be called again.
+		with self.cond:
+			if interval is None:
+				self.idle[id] = (cb, args)
 			else:
-				self.get_model().append((value,))
-				self.set_active(len(d))
+				heapq.heappush(self.timeouts, (time.monotonic() + interval / 1000., id, interval, cb, args))
+		return False
+	# }}}
+	def main(self): # {{{
+		self.running.append(True)
+		try:
+			while self.running[-1]:
+				self.main_iteration_do(True)
+		finally:
+			self.running.pop()
+	# }}}
+	def main_quit(self): # {{{
+		with self.cond:
+			if len(self.running) > 0:
+				self.running[-1] = False
+				self.cond.notify()
+	# }}}
+# }}}
+null_loop = NullMainLoop()
+
+class NullGtk: # {{{
+	'''Replacement for the parts of the Gtk module that are used outside the widget classes.'''
+	class AttachOptions:
+		EXPAND = 1
+		SHRINK = 2
+		FILL = 4
+	PACK_START = 0
+	main = null_loop.main
+	main_quit = null_loop.main_quit
+	events_pending = null_loop.events_pending
+	main_iteration_do = null_loop.main_iteration_do
+# }}}
+
+class NullGLib: # {{{
+	'''Replacement for the parts of the GLib module that are used outside the widget classes.'''
+	PRIORITY_DEFAULT = 0
+	PRIORITY_DEFAULT_IDLE = 200
+	idle_add = null_loop.idle_add
+	timeout_add = null_loop.timeout_add
+	source_remove = null_loop.source_remove
+# }}}
+
+class NullWidget: # {{{
+	'''Base class for null toolkit widgets.
+	It keeps the generic widget state, signal handlers, and the children of containers.'''
+	# Callbacks from null_watch; they are called for every signal.
+	watchers = ()
+	def __init__(self): # {{{
+		self.visible = False
+		self.sensitive = True
+		self.can_focus = False
+		self.parent = None
+		self.children = []
+		self.handlers = {}
+		self.child_properties = {}
+	# }}}
+	def show(self): # {{{
+		self.visible = True
+	# }}}
+	def hide(self): # {{{
+		self.visible = False
+	# }}}
+	def get_visible(self): # {{{
+		return self.visible
+	# }}}
+	def get_sensitive(self): # {{{
+		return self.sensitive
+	# }}}
+	def set_sensitive(self, value): # {{{
+		self.sensitive = value
+	# }}}
+	def get_can_focus(self): # {{{
+		return self.can_focus
+	# }}}
+	def set_can_focus(self, value): # {{{
+		self.can_focus = value
+	# }}}
+	def get_parent(self): # {{{
+		return self.parent
+	# }}}
+	def connect(self, signal, cb, *data): # {{{
+		self.handlers.setdefault(signal, []).append((cb, data))
+		return len(self.handlers[signal])
+	# }}}
+	def emit(self, signal, *args): # {{{
+		'''Call all handlers for a signal, like Gtk does when the user interacts with a widget.'''
+		for cb in self.watchers:
+			cb(self, signal)
+		for cb, data in list(self.handlers.get(signal, ())):
+			cb(self, *(args + data))
+	# }}}
+	def destroy(self): # {{{
+		if self.parent is not None:
+			self.parent.remove(self)
+		self.emit('destroy')
+	# }}}
+	def add_accel_group(self, group): # {{{
+		pass
+	# }}}
+	# Container functions. {{{
+	def add(self, child): # {{{
+		self.children.append(child)
+		child.parent = self
+	# }}}
+	def remove(self, child): # {{{
+		self.children.remove(child)
+		self.child_properties.pop(child, None)
+		child.parent = None
+	# }}}
+	def reorder_child(self, child, position): # {{{
+		self.children.remove(child)
+		self.children.insert(position, child)
+	# }}}
+	def pack_start(self, child, expand, fill, padding): # {{{
+		self.add(child)
+		self.child_properties[child] = {'expand': expand, 'fill': fill}
+	# }}}
+	def set_child_packing(self, child, expand, fill, padding, pack_type): # {{{
+		self.child_properties[child] = {'expand': expand, 'fill': fill}
+	# }}}
+	def attach(self, child, left, right, top, bottom, xoptions, yoptions): # {{{
+		self.add(child)
+		self.child_properties[child] = {'left-attach': left, 'right-attach': right, 'top-attach': top, 'bottom-attach': bottom, 'x-options': xoptions, 'y-options': yoptions}
+	# }}}
+	def child_set_property(self, child, name, value): # {{{
+		self.child_properties.setdefault(child, {})[name] = value
+	# }}}
+	def get_property(self, name): # {{{
+		return getattr(self, name.replace('-', '_'))
+	# }}}
+	def set_property(self, name, value): # {{{
+		setattr(self, name.replace('-', '_'), value)
+	# }}}
+	def add1(self, child): # {{{
+		self.add(child)
+	# }}}
+	def add2(self, child): # {{{
+		self.add(child)
+	# }}}
+	def add_action_widget(self, child, response): # {{{
+		self.add(child)
+		child.connect('clicked', lambda w: self.emit('response', response))
+	# }}}
+	# }}}
+# }}}
+
+# Null toolkit builtins. {{{
+null_builtins = {}
+null_builtins['Setting'] = Setting
+null_builtins['External'] = External
+class NullLabel(NullWidget): # {{{
+	def __init__(self, gui = None):
+		NullWidget.__init__(self)
+		self.text = ''
+		if gui is not None:
+			gui.assert_children(0)
+			self.setup(gui)
+	def setup(self, gui):
+		def set(value):
+			self.text = value
+		gui.register_attribute('value', lambda: self.text, set)
+	def set_property(self, name, value):
+		if name == 'label':
+			self.text = value
+		else:
+			NullWidget.set_property(self, name, value)
+	builder_properties = staticmethod(label_properties)
+null_builtins['Label'] = NullLabel
+# }}}
+class NullWindow(NullWidget): # {{{
+	gtk_window = True
+	def __init__(self, gui):
+		NullWidget.__init__(self)
+		gui.assert_children(1)
+		self.mem_show = True
+		self.title = None
+		def set_title(value):
+			self.title = value
+		gui.register_attribute('title', lambda: self.title, set_title, default = gui.gui.__packagename__)
+		gui.add()
+null_builtins['Window'] = NullWindow
+# }}}
+class NullScrolledWindow(NullWidget): # {{{
+	def __init__(self, gui = None):
+		NullWidget.__init__(self)
+		if gui is not None:
+			gui.assert_children(1)
+			gui.add()
+null_builtins['ScrolledWindow'] = NullScrolledWindow
+# }}}
+class NullAboutDialog(NullWidget): # {{{
+	gtk_window = True
+	lazy = True
+	def __init__(self, gui):
+		NullWidget.__init__(self)
+		self.info = {'program_name': gui.gui.__execname__}
+		self.connect('response', lambda w, v: gui.gui._showwin(self, False))
+		def setup(info): # {{{
+			if isinstance(info, str):
+				i = {}
+				for l in info[1:].split(info[0]):
+					k, v = l.split(None, 1)
+					i[k] = v
+				info = i
+			self.info.update(info)
 		# }}}
-		Gtk.ComboBox.__init__(self)
-		self.set_model(Gtk.ListStore(str))
-		renderer = Gtk.CellRendererText()
-		self.pack_start(renderer, True)
-		self.add_attribute(renderer, 'text', 0)
-		gui.assert_children(0, 1)
-		if len(gui.desc.children) > 0:
-			if nice_assert(gui.desc.children[0].tag == 'Label' and gui.desc.children[0].attributes['value'].startswith(':'), 'ComboBoxText child must be a Label'):
-				setcontent(gui.desc.children[0].attributes['value'][1:])
-		gui.register_attribute('content', None, setcontent)
-		gui.register_attribute('value', self.get_active, self.set_active)
-		gui.register_attribute('text', lambda: (self.get_model().get_value(self.get_active_iter(), 0) if self.get_active_iter() is not None else ''), set)
+		gui.register_attribute('setup', None, setup)
+null_builtins['AboutDialog'] = NullAboutDialog
+# }}}
+class NullDialog(NullWidget): # {{{
+	gtk_window = True
+	lazy = True
+	def __init__(self, gui):
+		NullWidget.__init__(self)
+		buttons = int(gui.get_attribute('buttons', default = 1))
+		if not gui.assert_children(buttons, -1):
+			raise ValueError('not enough buttons defined')
+		cbs = [None] * buttons
+		for i in range(buttons):
+			b = gui.desc.children[i]
+			if b.tag != 'Button':
+				gui.desc.children[i] = gui.gui.__element__('Button', {}, [b])
+			cbs[i] = gui.register_event('response')
+		gui.action_add(0, buttons - 1)
+		def response(widget, choice):
+			gui.gui._showwin(self, False)
+			if cbs[choice] is None:
+				return
+			cbs[choice] ()
+		# The dialog only becomes visible; a response is given by clicking one of its buttons.
+		gui.register_attribute('run', None, lambda x: self.show())
+		self.title = None
+		def set_title(value):
+			self.title = value
+		gui.register_attribute('title', lambda: self.title, set_title)
+		self.connect('response', response)
+		self.vbox = NullWidget()
+		self.add(self.vbox)
+		gui.pack_add(target = self.vbox, start = buttons)
+null_builtins['Dialog'] = NullDialog
+# }}}
+class NullSocket(NullWidget): # {{{
+	def __init__(self, gui):
+		NullWidget.__init__(self)
+		gui.register_attribute('id', lambda: 0, None)
+null_builtins['Socket'] = NullSocket
+# }}}
+class NullBox(NullWidget): # {{{
+	def __init__(self, gui = None):
+		NullWidget.__init__(self)
+		if gui is not None:
+			gui.pack_add()
+null_builtins['VBox'] = NullBox
+null_builtins['HBox'] = NullBox
+# }}}
+class NullNotebook(NullWidget): # {{{
+	def __init__(self, gui):
+		NullWidget.__init__(self)
+		self.show_tabs = True
+		self.tab_pos = 'top'
+		self.current_page = -1
+		self.labels = {}
+		def set_show_tabs(value):
+			self.show_tabs = value
+		def set_tab_pos(value):
+			self.tab_pos = value
+		gui.register_bool_attribute('show_tabs', lambda: self.show_tabs, set_show_tabs)
+		gui.register_attribute('tab_pos', lambda: self.tab_pos, set_tab_pos)
+		def save_page():
+			p = self.get_current_page()
+			return lambda: self.set_current_page(p)
+		gui.register_attribute('save_page', lambda: save_page, None)
+		gui.register_gtk_event('switch_page')
+		gui.notebook_add()
+	def append_page(self, child):
+		self.add(child)
+		if self.current_page < 0:
+			self.current_page = 0
+		return len(self.children) - 1
+	def get_n_pages(self):
+		return len(self.children)
+	def page_num(self, child):
+		return self.children.index(child)
+	def get_current_page(self):
+		return self.current_page
+	def set_current_page(self, page):
+		if page != self.current_page:
+			self.current_page = page
+			self.emit('switch_page', self.children[page], page)
+	def set_tab_label_text(self, child, text):
+		self.labels[child] = text
+	def get_tab_label_text(self, child):
+		return self.labels.get(child)
+null_builtins['Notebook'] = NullNotebook
+# }}}
+class NullButton(NullWidget): # {{{
+	def __init__(self, gui = None):
+		NullWidget.__init__(self)
+		if gui is not None:
+			self.setup(gui)
+			gui.add()
+	def setup(self, gui):
+		gui.register_gtk_event('clicked')
+	def clicked(self):
+		self.emit('clicked')
+null_builtins['Button'] = NullButton
+# }}}
+class NullToggle(NullWidget): # Base class for NullCheckButton and NullRadioButton. {{{
+	def __init__(self):
+		NullWidget.__init__(self)
+		self.active = False
+		self.inconsistent = False
+	def get(self):
+		if self.inconsistent:
+			return None
+		return self.active
+	def set(self, value):
+		if value is None:
+			self.inconsistent = True
+		else:
+			self.inconsistent = False
+			self.set_active(as_bool(value))
+	def set_active(self, value):
+		if value != self.active:
+			self.active = value
+			self.emit('toggled')
+	def toggled(self):
+		'''Simulate a click on the button.'''
+		self.set_active(not self.active)
+# }}}
+class NullCheckButton(NullToggle): # {{{
+	def __init__(self, gui = None):
+		NullToggle.__init__(self)
+		if gui is not None:
+			self.setup(gui)
+			gui.add()
+	def setup(self, gui):
+		gui.register_attribute('value', self.get, self.set)
+		gui.register_gtk_event('toggled')
+null_builtins['CheckButton'] = NullCheckButton
+# }}}
+class NullRadioButton(NullToggle): # {{{
+	def __init__(self, gui):
+		NullToggle.__init__(self)
+		self.groups = gui.gui.__radio_groups__
+		self.group = ''
+		self.active = len(self.groups[self.group]) == 0
+		self.groups[self.group].append(self)
+		def set_group(group): # {{{
+			self.groups[self.group].remove(self)
+			if self.group != '' and len(self.groups[self.group]) == 0:
+				del self.groups[self.group]
+			if group not in self.groups:
+				gui.gui.__add_name__(self.groups, group, [])
+			else:
+				gui.gui.__use_name__(self.groups, group)
+			self.active = len(self.groups[group]) == 0
+			self.groups[group].append(self)
+			self.group = group
+		# }}}
+		gui.register_attribute('value', self.get, self.set)
+		gui.register_attribute('group', lambda: self.group, set_group)
+		gui.register_gtk_event('toggled')
+		gui.add()
+	def set_active(self, value):
+		if not value:
+			# Radio buttons can only be deactivated by activating another one.
+			return
+		if self.active:
+			return
+		for other in self.groups[self.group]:
+			if other is not self and other.active:
+				other.active = False
+				other.emit('toggled')
+		NullToggle.set_active(self, True)
+	def toggled(self):
+		self.set_active(True)
+null_builtins['RadioButton'] = NullRadioButton
+# }}}
+class NullEntry(NullWidget): # {{{
+	def __init__(self, gui = None):
+		NullWidget.__init__(self)
+		self.text = ''
+		if gui is not None:
+			gui.assert_children(0)
+			self.setup(gui)
+	def setup(self, gui):
+		gui.register_attribute('value', self.get_text, self.set_text)
+		gui.register_gtk_event('activate')
 		gui.register_gtk_event('changed')
-builtins['ComboBoxText'] = ComboBoxText
-#}}}
-'''
-class ComboBoxEntryText(Gtk.ComboBoxEntry): # {{{
+	def get_text(self):
+		return self.text
+	def set_text(self, value):
+		if value != self.text:
+			self.text = value
+			self.emit('changed')
+null_builtins['Entry'] = NullEntry
+# }}}
+class NullFrame(NullWidget): # {{{
+	def __init__(self, gui = None):
+		NullWidget.__init__(self)
+		self.label = None
+		if gui is not None:
+			self.setup(gui)
+			gui.add()
+	def setup(self, gui):
+		def set_label(value):
+			self.label = None if value == '' else value
+		gui.register_attribute('label', lambda: self.label, set_label)
+null_builtins['Frame'] = NullFrame
+# }}}
+class NullTable(NullWidget): # {{{
+	def __init__(self, gui):
+		NullWidget.__init__(self)
+		self.n_columns = int(gui.get_attribute('columns', default = 1))
+		gui.table_add()
+null_builtins['Table'] = NullTable
+# }}}
+class NullRange(NullWidget): # Base class for NullSpinButton and NullScale. {{{
+	def __init__(self, gui = None):
+		NullWidget.__init__(self)
+		if gui is not None:
+			gui.assert_children(0)
+		self.lower = 0.
+		self.upper = 0.
+		self.value = 0.
+		self.digits = 0
+		self.increments = (1., 10.)
+	def get_value(self):
+		return self.value
+	def set_value(self, value):
+		self.set_value_native(float(value))
+	def set_value_native(self, value):
+		value = min(max(value, self.lower), self.upper)
+		if value != self.value:
+			self.value = value
+			self.emit('value-changed')
+	def get_range(self):
+		return (self.lower, self.upper)
+	def set_range(self, lower, upper):
+		self.lower = lower
+		self.upper = upper
+		self.set_value(self.value)
+	def set_digits(self, digits):
+		self.digits = int(digits)
+	def set_increments(self, step, page):
+		self.increments = (step, page)
+	def register(self, gui):
+		gui.register_attribute('range', self.get_range, lambda r: self.set_range(*parse_nums(r)), native = lambda r: self.set_range(*r))
+		gui.register_attribute('digits', lambda: self.digits, self.set_digits)
+		gui.register_attribute('value', self.get_value, self.set_value, native = self.set_value_native)
+		gui.register_attribute('increment', lambda: self.increments, lambda r: self.set_increments(*parse_nums(r)), native = lambda r: self.set_increments(*r))
+		gui.register_gtk_event('value-changed')
+# }}}
+class NullSpinButton(NullRange): # {{{
+	def __init__(self, gui = None):
+		NullRange.__init__(self, gui)
+		if gui is not None:
+			self.setup(gui)
+	def setup(self, gui):
+		self.register(gui)
+null_builtins['SpinButton'] = NullSpinButton
+# }}}
+class NullScale(NullRange): # {{{
+	def __init__(self, gui):
+		NullRange.__init__(self, gui)
+		self.draw_value = True
+		self.value_pos = 'top'
+		self.marks = []
+		def set_draw_value(value):
+			self.draw_value = as_bool(value)
+		def set_value_pos(value):
+			self.value_pos = value
+		def set_marks(marks):
+			self.marks = marks
+		gui.register_attribute('draw_value', lambda: self.draw_value, set_draw_value)
+		gui.register_attribute('value_pos', lambda: self.value_pos, set_value_pos)
+		gui.register_attribute('marks', lambda: self.marks, set_marks)
+		self.register(gui)
+null_builtins['HScale'] = NullScale
+null_builtins['VScale'] = NullScale
+# }}}
+class NullComboBoxText(NullWidget): # {{{
 	def __init__(self, gui):
+		NullWidget.__init__(self)
+		self.content = []
+		self.index = {}
+		self.active = -1
 		def setcontent(value): # {{{
 			if isinstance(value, str):
 				l = value.split('\n')
 			else:
 				l = value
-			self.get_model().clear()
-			for i in l:
-				self.get_model().append((i.strip(),))
+			self.content = [i.strip() for i in l]
+			self.index = {}
+			for row, text in enumerate(self.content):
+				self.index.setdefault(text, row)
+			self.active = -1
 		# }}}
 		def set(value): # {{{
-			def fill(model, path, iter, d): # {{{
-				d += (model.get_value(iter, 0),)
-				return False
-			# }}}
-			d = []
-			self.get_model().foreach(fill, d)
-			if value in d:
-				self.set_active(d.index(value))
-			else:
-				self.get_model().append((value,))
-				self.set_active(len(d))
+			row = self.index.get(value)
+			if row is None:
+				row = len(self.content)
+				self.content.append(value)
+				self.index[value] = row
+			self.set_active(row)
 		# }}}
-		Gtk.ComboBoxEntry.__init__(self, Gtk.ListStore(str))
 		gui.assert_children(0, 1)
 		if len(gui.desc.children) > 0:
-			if nice_assert(gui.desc.children[0].tag == 'Label' and gui.desc.children[0].attributes['value'].startswith(':'), 'ComboBoxEntryText child must be a Label'):
+			if nice_assert(gui.desc.children[0].tag == 'Label' and gui.desc.children[0].attributes['value'].startswith(':'), 'ComboBoxText child must be a Label'):
 				setcontent(gui.desc.children[0].attributes['value'][1:])
 		gui.register_attribute('content', None, setcontent)
-		gui.register_attribute('value', self.get_active, self.set_active)
-		gui.register_attribute('text', self.child.get_text, set)
+		gui.register_attribute('value', lambda: self.active, self.set_active)
+		gui.register_attribute('text', lambda: self.content[self.active] if self.active >= 0 else '', set)
 		gui.register_gtk_event('changed')
-		gui.register_gtk_event('activate', gtk_widget = self.child)
-builtins['ComboBoxEntryText'] = ComboBoxEntryText
-#}}}
-#'''
-class FileChooser(object): # Base class for FileChooserButton and FileChooserDialog.{{{
-	def __init__(self, gui, signal, hide):
-		self.must_hide = hide
+	def set_active(self, index):
+		index = int(index)
+		if index != self.active:
+			self.active = index
+			self.emit('changed')
+null_builtins['ComboBoxText'] = NullComboBoxText
+# }}}
+class NullFileChooser(NullWidget): # Base class for NullFileChooserButton and NullFileChooserDialog. {{{
+	def __init__(self, gui, hide):
+		NullWidget.__init__(self)
 		gui.assert_children(0)
-		def set_action(value): # {{{
-			if value == 'open':
-				self.set_action(Gtk.FileChooserAction.OPEN)
-			elif value == 'save':
-				self.set_action(Gtk.FileChooserAction.SAVE)
-			elif value == 'select_folder':
-				self.set_action(Gtk.FileChooserAction.SELECT_FOLDER)
-			elif value == 'create_folder':
-				self.set_action(Gtk.FileChooserAction.CREATE_FOLDER)
-			else:
-				error('invalid action type %s for FileChooser' % value)
-		# }}}
-		def get_action(): # {{{
-			a = self.get_action()
-			if a == Gtk.FileChooserAction.OPEN:
-				return 'open'
-			if a == Gtk.FileChooserAction.SAVE:
-				return 'save'
-			if a == Gtk.FileChooserAction.SELECT_FOLDER:
-				return 'select_folder'
-			if a == Gtk.FileChooserAction.CREATE_FOLDER:
-				return 'create_folder'
-			error('invalid action type for FileChooser')
-		# }}}
-		gui.register_attribute('title', self.get_title, self.set_title)
-		gui.register_attribute('action', get_action, set_action)
-		gui.register_attribute('filename', self.get_filename, self.set_filename)
-		gui.register_bool_attribute('overwrite_confirmation', self.get_do_overwrite_confirmation, self.set_do_overwrite_confirmation)
+		self.title = None
+		self.action = 'open'
+		self.filename = None
+		self.overwrite_confirmation = False
+		def set_title(value):
+			self.title = value
+		def set_action(value):
+			if nice_assert(value in ('open', 'save', 'select_folder', 'create_folder'), 'invalid action type %s for FileChooser' % value):
+				self.action = value
+		def set_filename(value):
+			self.filename = value
+		def set_overwrite_confirmation(value):
+			self.overwrite_confirmation = value
+		gui.register_attribute('title', lambda: self.title, set_title)
+		gui.register_attribute('action', lambda: self.action, set_action)
+		gui.register_attribute('filename', lambda: self.filename, set_filename)
+		gui.register_bool_attribute('overwrite_confirmation', lambda: self.overwrite_confirmation, set_overwrite_confirmation)
 		v = gui.register_event('response')
-		if v is not None:
-			def response(widget): # {{{
-				if self.must_hide:
-					gui.gui._showwin(self, False)
-				v(widget.get_filename())
-			# }}}
-			# A FileChooserDialog provides a response and fills the dummy argument; a FileChooserButton doesn't provide a response, puts ACCEPT there, and omits the dummy argument.
-			self.connect(signal, response)
-class FileChooserButton(FileChooser, Gtk.FileChooserButton): # {{{
+		def response(widget, *args): # {{{
+			if hide:
+				gui.gui._showwin(self, False)
+			v(self.filename)
+		# }}}
+		self.connect('response', response)
+	def select(self, filename):
+		'''Simulate the user choosing a file.'''
+		self.filename = filename
+		self.emit('response')
+# }}}
+class NullFileChooserButton(NullFileChooser): # {{{
 	def __init__(self, gui):
-		Gtk.FileChooserButton.__init__(self, '')
-		FileChooser.__init__(self, gui, 'file-set', False)
-builtins['FileChooserButton'] = FileChooserButton
+		NullFileChooser.__init__(self, gui, False)
+null_builtins['FileChooserButton'] = NullFileChooserButton
 # }}}
-class FileChooserDialog(FileChooser, Gtk.FileChooserDialog): # {{{
+class NullFileChooserDialog(NullFileChooser): # {{{
 	gtk_window = True
+	lazy = True
 	def __init__(self, gui):
-		Gtk.FileChooserDialog.__init__(self, '', buttons = (Gtk.STOCK_CANCEL, Gtk.ResponseType.REJECT, Gtk.STOCK_OK, Gtk.ResponseType.ACCEPT))
-		FileChooser.__init__(self, gui, 'response', True)
-builtins['FileChooserDialog'] = FileChooserDialog
+		NullFileChooser.__init__(self, gui, True)
+null_builtins['FileChooserDialog'] = NullFileChooserDialog
 # }}}
+class NullSeparator(NullWidget): # {{{
+	def __init__(self, gui = None):
+		NullWidget.__init__(self)
+		if gui is not None:
+			gui.assert_children(0)
+null_builtins['HSeparator'] = NullSeparator
+null_builtins['VSeparator'] = NullSeparator
 # }}}
-class HSeparator(Gtk.HSeparator): # {{{
-	def __init__(self, gui):
-		Gtk.HSeparator.__init__(self)
-		gui.assert_children(0)
-builtins['HSeparator'] = HSeparator
-#}}}
-class VSeparator(Gtk.VSeparator): # {{{
-	def __init__(self, gui):
-		Gtk.VSeparator.__init__(self)
-		gui.assert_children(0)
-builtins['VSeparator'] = VSeparator
-#}}}
-class VScale(Gtk.VScale): # {{{
-	def __init__(self, gui):
-		Gtk.VScale.__init__(self)
-		gui.assert_children(0)
-		gui.register_attribute('digits', self.get_digits, lambda v: self.set_digits(int(v)))
-		gui.register_attribute('draw_value', self.get_draw_value, lambda v: self.set_draw_value(as_bool(v)))
-		pos2str = {Gtk.PositionType.LEFT: 'left', Gtk.PositionType.RIGHT: 'right', Gtk.PositionType.TOP: 'top', Gtk.PositionType.BOTTOM: 'bottom'}
-		str2pos = {'left': Gtk.PositionType.LEFT, 'right': Gtk.PositionType.RIGHT, 'top': Gtk.PositionType.TOP, 'bottom': Gtk.PositionType.BOTTOM}
-		gui.register_attribute('value_pos', lambda: pos2str[self.get_value_pos()], lambda v: self.set_value_pos(str2pos[v]))
-		# marks
-		self.mem_marks = []
-		def set_marks(marks):
-			self.mem_marks = marks
-			self.clear_marks()
-			for m in marks:
-				self.add_mark(m[0], str2pos[m[1]], m[2])
-		gui.register_attribute('marks', lambda: self.mem_marks, set_marks)
-		self.set_increments(1, 10)
-		gui.register_attribute('range', (self.get_adjustment().get_lower(), self.get_adjustment().get_upper()), lambda r: self.set_range(*parse_nums(r)))
-		gui.register_attribute('value', self.get_value, lambda v: self.set_value(float(v)))
-		gui.register_attribute('increment', (self.get_adjustment().get_step_increment(), self.get_adjustment().get_page_increment()), lambda r: self.set_increments(*parse_nums(r)))
-		gui.register_gtk_event('value-changed')
-
-builtins['VScale'] = VScale
-#}}}
-class HScale(Gtk.HScale): # {{{
-	def __init__(self, gui):
-		Gtk.HScale.__init__(self)
-		gui.assert_children(0)
-		gui.register_attribute('digits', self.get_digits, lambda v: self.set_digits(int(v)))
-		gui.register_attribute('draw_value', self.get_draw_value, lambda v: self.set_draw_value(as_bool(v)))
-		pos2str = {Gtk.PositionType.LEFT: 'left', Gtk.PositionType.RIGHT: 'right', Gtk.PositionType.TOP: 'top', Gtk.PositionType.BOTTOM: 'bottom'}
-		str2pos = {'left': Gtk.PositionType.LEFT, 'right': Gtk.PositionType.RIGHT, 'top': Gtk.PositionType.TOP, 'bottom': Gtk.PositionType.BOTTOM}
-		gui.register_attribute('value_pos', lambda: pos2str[self.get_value_pos()], lambda v: self.set_value_pos(str2pos[v]))
-		# marks
-		self.mem_marks = []
-		def set_marks(marks):
-			self.mem_marks = marks
-			self.clear_marks()
-			for m in marks:
-				self.add_mark(m[0], str2pos[m[1]], m[2])
-		gui.register_attribute('marks', lambda: self.mem_marks, set_marks)
-		self.set_increments(1, 10)
-		gui.register_attribute('range', (self.get_adjustment().get_lower(), self.get_adjustment().get_upper()), lambda r: self.set_range(*parse_nums(r)))
-		gui.register_attribute('value', self.get_value, lambda v: self.set_value(float(v)))
-		gui.register_attribute('increment', (self.get_adjustment().get_step_increment(), self.get_adjustment().get_page_increment()), lambda r: self.set_increments(*parse_nums(r)))
-		gui.register_gtk_event('value-changed')
-
-builtins['HScale'] = HScale
-#}}}
-class MenuBar: # {{{
+class NullMenuBar(NullWidget): # {{{
 	def __init__(self, gui):
-		ui = Gtk.UIManager()
-		gui.gui.__accel_groups__.append(ui.get_accel_group())
-		actiongroup = Gtk.ActionGroup('actiongroup')
+		NullWidget.__init__(self)
 		childdesc, actions = gui.parse_menubar()
-		actiongroup.add_actions(actions)
-		ui.add_ui_from_string('<ui><menubar>' + childdesc + '</menubar></ui>')
-		ui.insert_action_group(actiongroup)
-		self.return_object = ui.get_widget('/menubar')
-builtins['MenuBar'] = MenuBar
-#}}}
-class HPaned(Gtk.HPaned): # {{{
-	def __init__(self, gui):
-		Gtk.HPaned.__init__(self)
-		gui.assert_children(2)
-		gui.paned_add()
-builtins['HPaned'] = HPaned
-#}}}
-class VPaned(Gtk.VPaned): # {{{
+		# Map item titles to their callbacks.
+		self.items = dict((a[2], a[5]) for a in actions if len(a) > 5)
+	def activate(self, title):
+		'''Simulate choosing a menu item.'''
+		self.items[title] ()
+null_builtins['MenuBar'] = NullMenuBar
+# }}}
+class NullPaned(NullWidget): # {{{
 	def __init__(self, gui):
-		Gtk.VPaned.__init__(self)
+		NullWidget.__init__(self)
 		gui.assert_children(2)
 		gui.paned_add()
-builtins['VPaned'] = VPaned
-#}}}
-class Statusbar(Gtk.Statusbar): # {{{
+null_builtins['HPaned'] = NullPaned
+null_builtins['VPaned'] = NullPaned
+# }}}
+class NullStatusbar(NullWidget): # {{{
 	def __init__(self, gui):
-		Gtk.Statusbar.__init__(self)
+		NullWidget.__init__(self)
 		gui.assert_children(0)
 		self.value = ''
-		self.push(0, self.value)
-		def set(v): # {{{
-			self.pop(0)
+		def set(v):
 			self.value = v
-			self.push(0, self.value)
-		# }}}
 		gui.register_attribute('text', lambda: self.value, set)
-builtins['Statusbar'] = Statusbar
-#}}}
-class Image(Gtk.Image): # {{{
+null_builtins['Statusbar'] = NullStatusbar
+# }}}
+class NullImage(ImageFrameBase, NullWidget): # {{{
 	def __init__(self, gui):
-		Gtk.Image.__init__(self)
+		NullWidget.__init__(self)
 		gui.assert_children(0)
-		gui.register_attribute('pixbuf', self.get_pixbuf, self.set_from_pixbuf)
-builtins['Image'] = Image
-#}}}
-class TextView(Gtk.TextView): # {{{
+		self.pixbuf = None
+		self.shown_frames = 0
+		def set(value):
+			self.pixbuf = value
+		gui.register_attribute('pixbuf', lambda: self.pixbuf, set)
+		self.setup_frame(gui)
+	def show_frame(self, frame):
+		self.shown_frames += 1
+		self.pixbuf = frame
+null_builtins['Image'] = NullImage
+# }}}
+class NullTextView(TextLogBase, NullWidget): # {{{
 	def __init__(self, gui):
-		Gtk.TextView.__init__(self)
+		NullWidget.__init__(self)
 		gui.assert_children(0)
-		gui.register_attribute('text', lambda: self.get_buffer().get_text(self.get_buffer().get_start_iter(), self.get_buffer().get_end_iter(), True), self.get_buffer().set_text)
-		wrap_modes = {} #{Gtk.WRAP_NONE: 'none', Gtk.WRAP_CHAR: 'char', Gtk.WRAP_WORD: 'word', Gtk.WRAP_WORD_CHAR: 'word_char'}
-		gui.register_attribute('wrap_mode', lambda: wrap_modes[self.get_wrap_mode()], lambda x: self.set_wrap_mode([t[0] for t in wrap_modes.items() if t[1] == x][0]))
-		gui.register_bool_attribute('editable', self.get_editable, self.set_editable)
-builtins['TextView'] = TextView
-#}}}
-class External: # {{{
+		# The text is stored as a list of lines, so appending does not copy it.
+		self.lines = collections.deque([''])
+		self.wrap_mode = 'none'
+		self.editable = True
+		def set_text(value):
+			self.lines = collections.deque(str(value).split('\n'))
+		def set_wrap_mode(value):
+			self.wrap_mode = value
+		def set_editable(value):
+			self.editable = value
+		gui.register_attribute('text', lambda: '\n'.join(self.lines), set_text)
+		gui.register_attribute('wrap_mode', lambda: self.wrap_mode, set_wrap_mode)
+		gui.register_bool_attribute('editable', lambda: self.editable, set_editable)
+		self.scrolled = False
+		self.setup_log(gui)
+	def write_lines(self, lines):
+		# Like a Gtk buffer, the last line is the text after the final newline.
+		last = self.lines.pop()
+		lines[0] = last + lines[0]
+		self.lines.extend(lines)
+		self.lines.append('')
+		if self.max_lines > 0:
+			# The empty line after the final newline is not counted.
+			while len(self.lines) - (self.lines[-1] == '') > self.max_lines:
+				self.lines.popleft()
+		self.scrolled = self.autoscroll
+		# Like the changed signal of a Gtk buffer.
+		self.emit('changed')
+null_builtins['TextView'] = NullTextView
+# }}}
+class NullDataTable(DataTableBase, NullWidget): # {{{
 	def __init__(self, gui):
-		gui.assert_children(0)
-		id = gui.get_attribute('id')
-		if not nice_assert(id is not None, 'id of External must be defined') or not nice_assert(id in gui.gui.__gtk__, 'Unknown external object %s defined' % id):
-			self.return_object = None
-			return
-		self.return_object = gui.gui.__gtk__.pop(id)
-builtins['External'] = External
-#}}}
-#}}}
+		NullWidget.__init__(self)
+		# Number of rows that fit in the widget.
+		self.page = 20
+		self.setup(gui)
+	def redraw(self):
+		self.first = max(0, min(self.first, len(self.table) - self.page))
+	def scroll_to(self, first):
+		'''Simulate scrolling, so that first is the first visible row.'''
+		self.first = first
+		self.redraw()
+	def shown(self):
+		'''Return (data row, cells) pairs for the visible rows, as they would be drawn.'''
+		return self.table.window(self.first, self.page)
+	def click(self, index, double = False):
+		'''Simulate clicking on the index'th visible row.'''
+		self.select(self.first + index, double)
+null_builtins['DataTable'] = NullDataTable
+# }}}
+class NullRepeat(RepeatBase, NullWidget): # {{{
+	def __init__(self, gui):
+		NullWidget.__init__(self)
+		self.orientation = gui.get_attribute('orientation') or 'vertical'
+		self.setup(gui)
+	def insert_row(self, widget, position):
+		self.pack_start(widget, False, False, 0)
+		self.reorder_child(widget, position)
+	def move_row(self, widget, position):
+		self.reorder_child(widget, position)
+	def remove_row(self, widget):
+		widget.destroy()
+null_builtins['Repeat'] = NullRepeat
+# }}}
+class NullPlot(PlotBase, NullWidget): # {{{
+	def __init__(self, gui):
+		NullWidget.__init__(self)
+		# Width in pixels, the sample ranges that were redrawn (None means everything), and the columns that were scrolled.
+		self.width = 400
+		self.dirty = []
+		self.scrolled = []
+		self.setup_plot(gui)
+	def redraw(self, first, last):
+		self.dirty.append(None if first is None else (first, last))
+	def scroll(self, samples):
+		self.scrolled.append(self.plot.shift(samples, self.width))
+	def render(self):
+		'''Return (columns, minima, maxima) as they would be drawn.'''
+		self.value_range()
+		return self.plot.columns(self.width, 0, self.width)
+null_builtins['Plot'] = NullPlot
+# }}}
+# }}}
+def null_watch(widget, callback): # {{{
+	'''Call callback when widget emits a signal, which is how user actions are simulated.'''
+	if not isinstance(widget, NullWidget) or isinstance(widget, (DataTableBase, RepeatBase, PlotBase, ImageFrameBase)):
+		return None
+	widget.watchers += (callback,)
+	def stop():
+		widget.watchers = tuple(cb for cb in widget.watchers if cb is not callback)
+	return stop
+# }}}
+class NullBuilder: # {{{
+	'''Replacement for Gtk.Builder, which creates null widgets from the interface XML that Builder writes.'''
+	# Null widget classes by Gtk class name; filled from null_builder.
+	classes = {}
+	def __init__(self): # {{{
+		self.objects = {}
+	# }}}
+	def add_from_string(self, text): # {{{
+		import xml.etree.ElementTree as ET
+		for element in ET.fromstring(text).findall('object'):
+			self.create(element)
+	# }}}
+	def create(self, element): # {{{
+		widget = self.classes[element.get('class')]()
+		for p in element.findall('property'):
+			value = p.text or ''
+			widget.set_property(p.get('name'), as_bool(value) if p.get('name') == 'visible' else value)
+		for c in element.findall('child'):
+			child = self.create(c.find('object'))
+			packing = c.find('packing')
+			if packing is None:
+				widget.add(child)
+			else:
+				options = {p.get('name'): as_bool(p.text) for p in packing.findall('property')}
+				widget.pack_start(child, options['expand'], options['fill'], 0)
+		self.objects[element.get('id')] = widget
+		return widget
+	# }}}
+	def get_object(self, id): # {{{
+		return self.objects.get(id)
+	# }}}
+# }}}
+NullGtk.Builder = NullBuilder
+null_builder = Builder(NullGtk, {
+		'Label': ('GtkLabel', NullLabel, 0),
+		'Entry': ('GtkEntry', NullEntry, 0),
+		'SpinButton': ('GtkSpinButton', NullSpinButton, 0),
+		'HSeparator': ('GtkHSeparator', NullSeparator, 0),
+		'VSeparator': ('GtkVSeparator', NullSeparator, 0),
+		'Button': ('GtkButton', NullButton, 1),
+		'CheckButton': ('GtkCheckButton', NullCheckButton, 1),
+		'Frame': ('GtkFrame', NullFrame, 1),
+		'ScrolledWindow': ('GtkScrolledWindow', NullScrolledWindow, 1),
+		'VBox': ('GtkVBox', NullBox, None),
+		'HBox': ('GtkHBox', NullBox, None),
+	})
+NullBuilder.classes = {classname: cls for classname, cls, children in null_builder.classes.values()}
+toolkits['null'] = Toolkit('null', null_builtins, NullGtk, NullGLib, null_builder, null_watch, next_timeout = null_loop.next_timeout)
+# }}}
+
+class DefTemplate: # {{{
+	'''Internal compiled body of a def.
+	Every attribute value is split once into the parameter name and the
+	default, so using the def only needs dict lookups.'''
+	__slots__ = ('nodes',)
+	def __init__(self, body, nodes = None): # {{{
+		'''Compile body, a list of elements, or use nodes from an earlier compilation, for example from the cache.'''
+		self.nodes = [self.compile(e) for e in body] if nodes is None else nodes
+	# }}}
+	@classmethod	# compile {{{
+	def compile(cls, element):
+		'''Return (tag, attributes, children) for an element of the body.
+		Attributes are (key, parameter, default, value) tuples;
+		default is None if the value has no colon.'''
+		attributes = []
+		for key, value in element.attributes.items():
+			name, sep, default = value.partition(':')
+			attributes.append((key, name, default if sep else None, value))
+		return (element.tag, attributes, [cls.compile(c) for c in element.children])
+	# }}}
+	def expand(self, element, defs, params, out): # {{{
+		'''Append new elements for a use of the def with the given attributes to out.
+		A value which is a parameter name is replaced by the value of
+		the parameter. If it has a default, it is kept, unless the
+		parameter value has one of its own. Uses of other defs in the
+		body are expanded while the elements are created, so every
+		element is visited once.'''
+		def build(node, out): # {{{
+			tag, attributes, children = node
+			ret = {}
+			for key, name, default, value in attributes:
+				if name in params:
+					value = params[name]
+					if default is not None and ':' not in value:
+						value = '%s:%s' % (value, default)
+				ret[key] = value
+			template = defs.get(tag)
+			if template is not None:
+				nice_assert(len(children) == 0, 'Macros must not have child elements')
+				template.expand(element, defs, ret, out)
+				return
+			new_children = []
+			for c in children:
+				build(c, new_children)
+			out.append(element(tag, ret, new_children))
+		# }}}
+		for node in self.nodes:
+			build(node, out)
+	# }}}
+# }}}
+
+class Scope: # {{{
+	'''Internal stand-in for a Gui, for building part of an interface after the Gui was created.
+	Methods of Gui are called with the scope as self. Attributes which
+	are passed to the constructor, such as registries, belong to the
+	scope; all other attributes are those of the gui. As on a Gui, names
+	which do not start with an underscore are get and set variables.'''
+	def __init__(self, gui, **attributes): # {{{
+		if isinstance(gui, Scope):
+			# A scope in a scope, such as a row of a nested Repeat, keeps the attributes of the outer scope that it does not replace.
+			outer = dict(gui.__dict__)
+			gui = outer.pop('__gui__')
+			outer.update(attributes)
+			attributes = outer
+		self.__dict__['__gui__'] = gui
+		self.__dict__.update(attributes)
+	# }}}
+	def __getattr__(self, name): # {{{
+		if name[0] != '_':
+			getter = self.__getters__.get(name)
+			if getter is None:
+				raise AttributeError(name)
+			return getter()
+		gui = self.__dict__['__gui__']
+		if name in gui.__dict__:
+			return gui.__dict__[name]
+		value = getattr(type(gui), name)
+		if isinstance(value, types.FunctionType):
+			return value.__get__(self)
+		return value
+	# }}}
+	def __setattr__(self, name, value): # {{{
+		if name[0] != '_':
+			setter = self.__setters__.get(name)
+			if setter is None:
+				error('not setting ' + name + ", because it isn't defined in the scope")
+			else:
+				setter(value)
+		elif name in self.__dict__:
+			self.__dict__[name] = value
+		else:
+			setattr(self.__dict__['__gui__'], name, value)
+	# }}}
+# }}}
+
+class RowScope(Scope): # {{{
+	'''Internal scope for a row of a Repeat.
+	Its get and set names, slots and nested Repeats belong to the row.
+	Its events are those of the gui; their handlers are called with the
+	key of the row as the first argument, after the keys of the rows
+	that contain it if the Repeat is nested.'''
+	def __init__(self, gui, key): # {{{
+		get = GetRegistry()
+		set = Registry()
+		keys = gui.__keys__ + (key,) if isinstance(gui, RowScope) else (key,)
+		Scope.__init__(self, gui, __keys__ = keys, __get__ = get, __set__ = set, __getters__ = get.compiled, __setters__ = set.compiled, __native__ = {}, __name_widgets__ = {}, __event_rate__ = {}, __radio_groups__ = {'': []}, __repeats__ = {}, __containers__ = {})
+	# }}}
+	def __event_cb__(self, object, *args, **kwargs): # {{{
+		Gui.__event_cb__(self, object, *(self.__keys__ + args), **kwargs)
+	# }}}
+# }}}
+
+class Attachment: # {{{
+	'''Handle for widgets that were added by Gui._attach.'''
+	__slots__ = ('slot', 'widgets', 'built', 'names')
+	def __init__(self, slot):
+		self.slot = slot
+		# The widgets that were added to the container.
+		self.widgets = []
+		# All widgets that were built.
+		self.built = []
+		# (registry, names) pairs for the names that were added or shared with other attachments.
+		self.names = []
+	def record(self, registry, name):
+		'''Add a name that was added to registry, or that is used again.
+		Return False if it was already recorded.'''
+		for r, names in self.names:
+			if r is registry:
+				if name in names:
+					return False
+				names.add(name)
+				return True
+		self.names.append((registry, {name}))
+		return True
+# }}}
+
+class LazyWindow: # {{{
+	'''Internal record for a top-level element that is built on first use.'''
+	def __init__(self, desc):
+		self.desc = desc
+		# Placeholder registrations, as (registry, name) pairs.
+		self.stubs = []
+		# Names which cause the window to be built when set; the value is 'show' or 'run'.
+		self.triggers = {}
+		# Values that were set before the window was built.
+		self.pending = {}
+		# Values that placeholder get names report without building the window.
+		self.defaults = {}
+	def value(self, name):
+		'''Return the value of a name without building the window.'''
+		return self.pending.get(name, self.defaults.get(name))
+# }}}
 
 class Gui: # {{{
 	'''Main class for toolkit-independent gui module.'''
 	__widgets__ = {}
+	# Compiled get and set callbacks; these are replaced in __init__, and allow attribute lookups before that.
+	__getters__ = {}
+	__setters__ = {}
 	class __element__: # {{{
 		'''Internal class for holding gui elements.'''
+		# builder_size is set by Builder.size.
+		__slots__ = ('tag', 'attributes', 'children', 'builder_size')
 		def __init__(self, tag, attributes, children): # {{{
 			'''Initialize an element.'''
 			self.tag = tag
@@ -948,55 +3598,137 @@ class Gui: # {{{
 			'''Use the dump function when a string representation is requested.'''
 			return self.dump('')
 		# }}}
+		def pack(self): # {{{
+			'''Convert the element and its children to nested tuples, for storing in the cache.'''
+			return (self.tag, self.attributes, tuple(c.pack() for c in self.children))
+		# }}}
+		@classmethod	# unpack {{{
+		def unpack(cls, packed, copy = True):
+			'''Create an element tree from the output of pack.
+			If copy is False, the tree uses the attribute dicts of packed,
+			which is faster when packed is not used again.'''
+			tag, attributes, children = packed
+			return cls(tag, dict(attributes) if copy else attributes, [cls.unpack(c, copy) for c in children])
+		# }}}
 	# }}}
 	def __parse__(self, element): # {{{
 		'''Internal function for parsing the contents of an element.'''
 		ret = self.__element__(element.tag, element.attrib, [])
 		if element.text and element.text.strip():
 			ret.children += (self.__element__('Label', {'value': ':' + element.text.strip()}, []),)
-		for c in element.getchildren():
+		for c in element:
 			ret.children += (self.__parse__(c),)
 			if c.tail and c.tail.strip():
 				ret.children += (self.__element__('Label', {'value': ':' + c.tail.strip()}, []),)
 		return ret
 	# }}}
-	def __init__(self, packagename = None, execname = None, Gtk = {}, widgets = (), events = {}, inputs = (), outputs = (), data = None): # {{{
+	def __init__(self, packagename = None, execname = None, Gtk = {}, widgets = (), events = {}, inputs = (), outputs = (), data = None, lazy = False, toolkit = None, frame_rate = 60, template = None, builder = None): # {{{
 		'''Initialize the gui object.
 		name is the program name, which defaults to basename(sys.argv[0])
 		Gtk is a list of Gtk-specific objects which cannot be defined otherwise.
 		Note that using Gtk objects binds the application to the Gtk toolkit.
 		events is a dict linking all possible events to their callback.
 		inputs and outputs are sequences listing all input and output attributes.
+		If lazy is True, top-level elements whose class allows it (the
+		dialogs) and which are not initially shown are only built when
+		they are shown or run for the first time.
+		toolkit is the name of the toolkit to use: 'gtk' (the default)
+		or 'null'. It defaults to the value of the environment
+		variable GUI_TOOLKIT, if it is set.
+		If the environment variable GUI_STATS is set to a nonempty
+		value, _instrument is called before the gui is built.
+		frame_rate is the maximum number of times per second that values
+		from _post are applied.
+		template is a Template; if it is given, its description is used
+		and no file is read. Its names are the defaults for packagename
+		and execname.
+		If builder is True, parts of the interface which only contain
+		plain builtin widgets are created by the toolkit from a single
+		description (with Gtk, using Gtk.Builder), instead of one widget
+		at a time from Python. It defaults to whether the environment
+		variable GUI_BUILDER is set to a nonempty value.
 		
 		If the gui interface description cannot be found, a simple
 		interface is constructed containing a button for each event,
 		an entry for each input and a label for each output.'''
 		self.__data__ = data
+		# Writes which are collected by _batch and applied from an idle callback.
+		self.__pending__ = {}
+		self.__batching__ = 0
+		self.__flush_source__ = None
+		# Writes from other threads, which are collected by _post.
+		self.__post_lock__ = threading.Lock()
+		self.__posted__ = {}
+		self.__post_source__ = None
+		self.__post_time__ = 0
+		self.__frame_time__ = 1. / frame_rate
+		if toolkit is None:
+			toolkit = os.getenv('GUI_TOOLKIT', 'gtk')
+		nice_assert(toolkit in toolkits, 'unknown toolkit %s' % toolkit, exit = True)
+		self.__toolkit__ = get_toolkit(toolkit)
 		if isinstance(widgets, dict):
-			self.__widgets__ = [widgets, builtins]
+			self.__widgets__ = [widgets, self.__toolkit__.builtins]
 		else:
-			self.__widgets__ = list(widgets) + [builtins]
+			self.__widgets__ = list(widgets) + [self.__toolkit__.builtins]
+		# Classes found by __widget_class__, by tag.
+		self.__widget_classes__ = {}
+		if builder is None:
+			builder = bool(os.getenv('GUI_BUILDER'))
+		self.__builder__ = self.__toolkit__.builder if builder else None
 		self.__menuaction__ = 0
 		self.__event__ = {}
-		self.__get__ = {}
-		self.__set__ = {}
+		self.__event_rate__ = {}
+		self.__get__ = GetRegistry()
+		self.__set__ = Registry()
+		self.__getters__ = self.__get__.compiled
+		self.__setters__ = self.__set__.compiled
+		self.__native__ = {}
+		# Widgets by get and set name, for _mirror.
+		self.__name_widgets__ = {}
+		self.__mirror__ = None
+		self.__stats__ = None
+		if os.getenv('GUI_STATS'):
+			self._instrument()
+		self.__memory__ = None
+		if 'tracemalloc' in sys.modules or os.getenv('PYTHONTRACEMALLOC'):
+			import tracemalloc
+			if tracemalloc.is_tracing():
+				self.__memory__ = MemoryAccount()
 		self.__defs__ = {}
 		self.__radio_groups__ = {'': []}
+		self.__repeats__ = {}
+		# Wrappers of containers with a slot attribute, and widgets which are built by _attach.
+		self.__containers__ = {}
+		# The Attachment for widgets that _attach is building.
+		self.__attaching__ = None
+		# The number of attachments which use each name that _attach added, by (id(registry), name).
+		self.__attached__ = {}
 		self.__loop_return__ = None
 		self.__iterating__ = False
-		if not execname:
-			execname = os.path.basename(sys.argv[0])
-			e = os.extsep + 'py'
-			if execname.endswith(e):
-				execname = execname[:-len(e)]
-		if not packagename:
-			packagename = execname
+		self.__async_loop__ = None
+		self.__async_running__ = False
+		# Function that makes _run_async handle toolkit events now; it may be called from any thread.
+		self.__async_wake__ = None
+		self.__tasks__ = set()
+		# Background settings and state by event name, and the executors that run them.
+		self.__background__ = {}
+		self.__executors__ = {}
+		if template is not None:
+			packagename = packagename or template.packagename
+			execname = execname or template.execname
+		packagename, execname = program_names(packagename, execname)
 		self.__packagename__ = packagename
 		self.__execname__ = execname
 		self.__gtk__ = Gtk
 		self.__building__ = True
-		filename = find_path(execname + os.extsep + 'gui', packagename)
-		if filename is None:
+		# The declared names, for checking the names of windows that are built later.
+		self.__declared__ = (inputs, outputs, events)
+		filename = None if template is not None else find_path(execname + os.extsep + 'gui', packagename)
+		if template is not None:
+			# The defs are compiled and never changed, so they are shared with the template.
+			self.__defs__.update(template.__defs__)
+			tree = template.tree()
+		elif filename is None:
 			customs = []
 			for g in Gtk:
 				customs.append(self.__element__('VBox', {}, [self.__element__('Label', {'value': ':' + g}, []), self.__element__('External', {'id': g}, [])]))
@@ -1019,29 +3751,13 @@ class Gui: # {{{
 				with open(filename, 'wb') as f:
 					f.write(repr(tree))
 		else:
-			tree = ET.parse(filename)
-			root = tree.getroot()
-			nice_assert(not root.tail or not root.tail.strip(), 'unexpected data at end of gui description')
-			tree = self.__parse__(root)
-
-		nice_assert(tree.tag == 'Gtk', 'gui description top level element is not <Gtk>')
+			tree = self.__load__(filename)
 		self.__windows__ = []
-		nice_assert(tree.attributes == {}, 'no attributes are allowed on top level tag')
-		# Find all defs.
-		i = 0
-		while i < len(tree.children):
-			w = tree.children[i]
-			if w.tag != 'def':
-				# Apply defs.
-				i += self.__apply_defs__(tree, i)
-				continue
-			if nice_assert('name' in w.attributes, 'def requires a name attribute'):
-				self.__defs__[w.attributes['name']] = w.children
-			i += 1
+		self.__lazy__ = []
 		# Build the interface.
 		self.__accel_groups__ = []
 		for w in tree.children:
-			if w.tag == 'def':
+			if lazy and self.__defer__(w, inputs, outputs, events):
 				continue
 			win = self.__build__(w)
 			if win is None:
@@ -1051,20 +3767,14 @@ class Gui: # {{{
 			for ag in self.__accel_groups__:
 				win.add_accel_group(ag)
 			self.__windows__.append(win)
-		nice_assert(len(self.__windows__) > 0, 'there are no gui elements defined', exit = True)
+		nice_assert(len(self.__windows__) + len(self.__lazy__) > 0, 'there are no gui elements defined', exit = True)
 		for w in self.__windows__:
 			w.connect('destroy', lambda x: self(False, 'destroyed'))
 		# Reverse order, so first defined window is shown last, therefore(most likely) on top
 		self.__windows__.reverse()
 		nice_assert(self.__gtk__ == {}, 'Not all externally provided widgets were used: ' + str(self.__gtk__))
 		del self.__gtk__
-		# Check that only declared inputs, (__get__ has the same keys as __set__) and events are used.
-		for name in self.__get__:
-			nice_assert(name in inputs or name in outputs and name in self.__set__, 'undeclared name %s used in the gui(or output used as input)' % name)
-		for name in self.__set__:
-			nice_assert(name in inputs and name in self.__get__ or name in outputs, 'undeclared name %s used in the gui(or input used as output)' % name)
-		for name in self.__event__:
-			nice_assert(name in events, 'undeclared event name %s used in the gui' % name)
+		self.__check_names__(self.__get__, self.__set__, self.__event__)
 		# Check that all used names are declared.
 		for i in inputs:
 			for o in outputs:
@@ -1080,81 +3790,759 @@ class Gui: # {{{
 		for name in events:
 			if not nice_assert(name in self.__event__, 'event name %s is not in the gui' % name):
 				continue
-			value = events[name]
-			if isinstance(value, (tuple, list)):
-				if nice_assert(len(value) == 2, 'setting event to list or tuple, but length is not 2'):
-					self.__event__[name][0] = value[0]
-					self.__event__[name][1] = value[1]
-			else:
-				self.__event__[name][0] = value
-				self.__event__[name][1] = None
+			self.__handler__(name, events[name])
 		self.__building__ = False
 	# }}}
-	def __copy_def__(self, tags, attrs): # {{{
-		ret = []
-		for t in tags:
-			rattrs = {}
-			for a in t.attributes:
-				val = t.attributes[a]
-				if ':' in val:
-					n, d = val.split(':', 1)
-					if n in attrs:
-						if ':' in attrs[n]:
-							rattrs[a] = attrs[n]
-						else:
-							rattrs[a] = '%s:%s' % (attrs[n], d)
-					else:
-						rattrs[a] = val
-				elif val in attrs:
-					rattrs[a] = attrs[val]
+	def __check_names__(self, get_names, set_names, event_names): # {{{
+		'''Internal function to check that only declared inputs, outputs and events are used.
+		(__get__ has the same keys as __set__)'''
+		inputs, outputs, events = self.__declared__
+		for name in get_names:
+			nice_assert(name in inputs or name in outputs and name in self.__set__, 'undeclared name %s used in the gui(or output used as input)' % name)
+		for name in set_names:
+			nice_assert(name in inputs and name in self.__get__ or name in outputs, 'undeclared name %s used in the gui(or input used as output)' % name)
+		for name in event_names:
+			nice_assert(name in events, 'undeclared event name %s used in the gui' % name)
+	# }}}
+	def __handler__(self, name, value): # {{{
+		'''Internal function to set the handler of an event to a callback or a (callback, argument) pair.'''
+		if isinstance(value, (tuple, list)):
+			if nice_assert(len(value) == 2, 'setting event to list or tuple, but length is not 2'):
+				self.__event__[name][0] = value[0]
+				self.__event__[name][1] = value[1]
+		elif isinstance(value, Background):
+			# These settings replace background options from the gui description.
+			self.__add_name__(self.__background__, name, value.copy())
+			self.__event__[name][0] = value.callback
+			self.__event__[name][1] = None
+		else:
+			self.__event__[name][0] = value
+			self.__event__[name][1] = None
+	# }}}
+	def __load__(self, filename, use_compiled = True): # {{{
+		'''Internal function to read a gui description and apply its defs.
+		The result and the compiled defs are stored in the cache directory, keyed by the file's path, mtime and size, the module version and the cache format.
+		If a matching entry is found there, it is used instead of parsing the file.
+		Otherwise, if use_compiled is True, a module from compile_gui is used if it is newer than the file.'''
+		# These imports are done here, because they are slow and not needed for most uses of the module.
+		import hashlib
+		import xml.etree.ElementTree as ET
+		st = os.stat(filename)
+		key = (os.path.abspath(filename), st.st_mtime_ns, st.st_size, __version__, CACHE_FORMAT)
+		d = cache_dir()
+		if d is not None:
+			cachename = os.path.join(d, hashlib.sha1(key[0].encode('utf-8')).hexdigest() + os.extsep + 'cache')
+			try:
+				with open(cachename, 'rb') as f:
+					data = f.read()
+				with gc_paused():
+					cached_key, packed, defs = marshal.loads(data)
+					if cached_key == key:
+						# The defs are kept for _attach.
+						for name in defs:
+							self.__defs__[name] = DefTemplate(None, defs[name])
+						return self.__element__.unpack(packed, False)
+			except (OSError, EOFError, ValueError, TypeError):
+				# No usable cache; parse the file.
+				pass
+		if use_compiled:
+			tree = self.__load_compiled__(filename, st)
+			if tree is not None:
+				return tree
+		root = ET.parse(filename).getroot()
+		nice_assert(not root.tail or not root.tail.strip(), 'unexpected data at end of gui description')
+		tree = self.__expand__(self.__parse__(root))
+		if d is not None:
+			tmpname = cachename + os.extsep + str(os.getpid())
+			try:
+				os.makedirs(d, exist_ok = True)
+				with open(tmpname, 'wb') as f:
+					marshal.dump((key, tree.pack(), {name: self.__defs__[name].nodes for name in self.__defs__}), f)
+				os.replace(tmpname, cachename)
+			except (OSError, ValueError) as e:
+				error('Warning: unable to write gui cache %s: %s' % (cachename, e))
+		return tree
+	# }}}
+	def __load_compiled__(self, filename, st): # {{{
+		'''Internal function to use the module that compile_gui wrote for filename, if it is newer than the file.
+		st is the result of os.stat for filename. The module is not
+		imported: only assignments of literals, one per line, are
+		accepted, and their values are read with ast.literal_eval, so a
+		file in its place can not run code. The tree and the defs are stored in the format of
+		the cache, so they are read as fast as a cache hit. Returns the
+		element tree, or None if there is no usable module.'''
+		compiled = compiled_path(filename)
+		try:
+			if os.stat(compiled).st_mtime_ns < st.st_mtime_ns:
+				# The description was changed after it was compiled.
+				return None
+			with open(compiled) as f:
+				text = f.read()
+		except OSError:
+			return None
+		# These imports are done here, because they are not needed for most uses of the module.
+		import ast
+		import base64
+		values = {}
+		try:
+			for number, line in enumerate(text.splitlines(), 1):
+				if line.strip() == '' or line.startswith('#'):
+					continue
+				name, sep, value = line.partition(' = ')
+				if not sep or not name.isidentifier():
+					raise ValueError('line %d is not an assignment' % number)
+				if name == 'data':
+					# This is decoded as a quoted base64 string, which is much faster than parsing it as Python.
+					if len(value) < 2 or value[0] != "'" or value[-1] != "'":
+						raise ValueError('data on line %d is not a string' % number)
+					values[name] = base64.b64decode(value[1:-1], validate = True)
 				else:
-					rattrs[a] = val
-			children = self.__copy_def__(t.children, attrs)
-			ret.append(self.__element__(t.tag, rattrs, children))
-		return ret
+					values[name] = ast.literal_eval(value)
+			if set(values) != {'format', 'version', 'size', 'data'}:
+				raise ValueError('unexpected names: %s' % ', '.join(sorted(values)))
+			if values['format'] != CACHE_FORMAT or values['version'] != __version__ or values['size'] != st.st_size:
+				return None
+			with gc_paused():
+				packed, defs = marshal.loads(values['data'])
+				tree = self.__element__.unpack(packed, False)
+		except (SyntaxError, ValueError, TypeError, EOFError, MemoryError, RecursionError) as e:
+			error('Warning: ignoring compiled gui description %s: %s' % (compiled, e))
+			return None
+		for name in defs:
+			self.__defs__[name] = DefTemplate(None, defs[name])
+		return tree
+	# }}}
+	def __expand__(self, tree): # {{{
+		'''Internal function to record all defs in a parsed tree and apply them.
+		A def applies to elements after it. Returns the tree, with the defs removed.'''
+		nice_assert(tree.tag == 'Gtk', 'gui description top level element is not <Gtk>')
+		nice_assert(tree.attributes == {}, 'no attributes are allowed on top level tag')
+		children = []
+		for w in tree.children:
+			for e in self.__apply_defs__(w):
+				if e.tag != 'def':
+					children.append(e)
+				elif nice_assert('name' in e.attributes, 'def requires a name attribute'):
+					self.__defs__[e.attributes['name']] = DefTemplate(e.children)
+		tree.children = children
+		return tree
 	# }}}
-	def __apply_defs__(self, parent, idx): # {{{
-		# Recursively replace parent.children[idx] with defined stuff, if any. Return new number of elements.
-		if parent.children[idx].tag in self.__defs__:
-			nice_assert(len(parent.children[idx].children) == 0, 'Macros must not have child elements')
-			subst = self.__copy_def__(self.__defs__[parent.children[idx].tag], parent.children[idx].attributes)
-			parent.children[idx:idx + 1] = subst
-			return 0
-		i = 0
-		while i < len(parent.children[idx].children):
-			i += self.__apply_defs__(parent.children[idx], i)
-		return 1
+	def __apply_defs__(self, element): # {{{
+		'''Internal function to replace uses of defs in element and its children.
+		Returns the list of elements that replaces element. Child lists are built in a single pass.'''
+		if element.tag == 'def':
+			return [element]
+		template = self.__defs__.get(element.tag)
+		if template is not None:
+			nice_assert(len(element.children) == 0, 'Macros must not have child elements')
+			ret = []
+			template.expand(self.__element__, self.__defs__, element.attributes, ret)
+			return ret
+		children = []
+		for c in element.children:
+			children.extend(self.__apply_defs__(c))
+		element.children = children
+		return [element]
+	# }}}
+	def __defer__(self, desc, inputs, outputs, events): # {{{
+		'''Internal function to register a top-level element for building on first use.
+		Placeholders are registered for all declared names that are used in the element.
+		Returns False if the element must be built immediately.'''
+		widget = self.__widget_class__(desc.tag)
+		if widget is None or not getattr(widget, 'lazy', False):
+			return False
+		entry = LazyWindow(desc)
+		for key in ('show', 'set_show', 'run', 'set_run'):
+			if key not in desc.attributes:
+				continue
+			name, sep, default = desc.attributes[key].partition(':')
+			if key.endswith('show'):
+				if sep and as_bool(default):
+					# Initially shown; there is nothing to gain.
+					return False
+				entry.triggers[name] = 'show'
+			else:
+				entry.triggers[name] = 'run'
+		todo = [desc]
+		names = []
+		while len(todo) > 0:
+			d = todo.pop()
+			if d.tag == 'External':
+				# Externally provided objects must all be used during construction.
+				return False
+			for key, value in d.attributes.items():
+				name, sep, default = value.partition(':')
+				if name != '':
+					names.append((key, name, default if sep else None))
+			todo.extend(d.children)
+		for key, name, default in names:
+			if name in self.__get__ or name in self.__set__:
+				continue
+			if name in events:
+				if name not in self.__event__:
+					self.__event__[name] = [None, None]
+				continue
+			if name in inputs and not key.startswith('set_'):
+				self.__get__[name] = (self.__lazy_get__, (entry, name))
+				entry.stubs.append((self.__get__, name))
+				# A window which has not been built is not shown.
+				entry.defaults[name] = False if entry.triggers.get(name) == 'show' else default
+			if (name in inputs or name in outputs) and not key.startswith('get_'):
+				self.__set__[name] = (self.__lazy_set__, (entry, name))
+				entry.stubs.append((self.__set__, name))
+		self.__lazy__.append(entry)
+		return True
+	# }}}
+	def __lazy_get__(self, target): # {{{
+		'''Internal get callback for names in a window that has not been built yet.'''
+		entry, name = target
+		if not self.__realize__(entry):
+			return entry.value(name)
+		return getattr(self, name)
+	# }}}
+	def __lazy_set__(self, target, value): # {{{
+		'''Internal set callback for names in a window that has not been built yet.
+		The value is stored and applied when the window is built.'''
+		entry, name = target
+		if entry not in self.__lazy__:
+			# The window was built after this callback was retrieved with _setter.
+			setattr(self, name, value)
+			return
+		entry.pending.pop(name, None)
+		entry.pending[name] = value
+		if name in entry.triggers and (entry.triggers[name] == 'run' or as_bool(value)):
+			self.__realize__(entry)
+	# }}}
+	def __realize__(self, entry): # {{{
+		'''Internal function to build a deferred window.
+		If building fails, the window stays deferred and keeps the values
+		that were set for it. Returns whether the window is built.'''
+		if entry not in self.__lazy__:
+			return True
+		position = self.__lazy__.index(entry)
+		self.__lazy__.remove(entry)
+		stubs = [(registry, name, registry.pop(name, None)) for registry, name in entry.stubs]
+		num_groups = len(self.__accel_groups__)
+		old = set(self.__get__), set(self.__set__), set(self.__event__)
+		building = self.__building__
+		self.__building__ = True
+		win = None
+		try:
+			win = self.__build__(entry.desc)
+		finally:
+			self.__building__ = building
+			if win is None:
+				# Put the placeholders back, so the values are kept and building is tried again on the next use.
+				for registry, name, value in stubs:
+					if value is not None:
+						registry[name] = value
+				self.__lazy__.insert(position, entry)
+		if not nice_assert(win is not None, 'unable to build deferred %s; it is built when it is used again' % entry.desc.tag):
+			return False
+		new = [[name for name in r if name not in o] for r, o in zip((self.__get__, self.__set__, self.__event__), old)]
+		# Names in the window were not checked at load time, so check them now.
+		self.__check_names__(*new)
+		if self.__mirror__ is not None:
+			self.__mirror__.watch(new[0])
+		if nice_assert(hasattr(win, 'gtk_window'), 'top-level elements must be windows'):
+			for ag in self.__accel_groups__:
+				win.add_accel_group(ag)
+			for ag in self.__accel_groups__[num_groups:]:
+				for w in self.__windows__:
+					w.add_accel_group(ag)
+			win.connect('destroy', lambda x: self(False, 'destroyed'))
+			self.__windows__.append(win)
+			if not building and getattr(win, 'mem_show', None) == True:
+				self._show(win, True)
+		for name, value in entry.pending.items():
+			setattr(self, name, value)
+		entry.pending.clear()
+		return True
+	# }}}
+	def __submit__(self, background, name, f, args, kwargs): # {{{
+		'''Internal function to start a call of a background event handler.'''
+		if background.future is not None and not background.future.done():
+			if background.busy == 'skip':
+				return
+			if background.busy == 'replace':
+				background.waiting = (f, args, kwargs)
+				return
+		kind = 'process' if background.process else 'thread'
+		executor = self.__executors__.get(kind)
+		if executor is None:
+			# This import is done here, because it is not needed for most uses of the module.
+			import concurrent.futures
+			executor = concurrent.futures.ProcessPoolExecutor() if background.process else concurrent.futures.ThreadPoolExecutor()
+			self.__executors__[kind] = executor
+		future = executor.submit(f, *args, **kwargs)
+		background.future = future
+		GLib = self.__toolkit__.GLib
+		def done(future):
+			GLib.idle_add(self.__background_done__, background, name, future)
+			self.__wake__()
+		future.add_done_callback(done)
+	# }}}
+	def __wake__(self): # {{{
+		'''Internal function to make _run_async handle toolkit events without waiting; it may be called from any thread.'''
+		wake = self.__async_wake__
+		if wake is None:
+			return
+		try:
+			wake()
+		except RuntimeError:
+			# The asyncio loop was closed.
+			pass
+	# }}}
+	def __background_done__(self, background, name, future): # {{{
+		'''Internal main loop callback for a background event handler which has returned.'''
+		if self.__background__.get(name) is not background:
+			# The event was removed by _detach.
+			return False
+		if background.future is future:
+			background.future = None
+		if future.cancelled():
+			# The call was cancelled by _shutdown.
+			return False
+		if background.waiting is not None:
+			if background.future is None:
+				f, args, kwargs = background.waiting
+				background.waiting = None
+				self.__submit__(background, name, f, args, kwargs)
+			# A newer call replaces this one.
+			return False
+		try:
+			value = future.result()
+		except Exception as e:
+			error('exception in background handler of event %s: %s: %s' % (name, type(e).__name__, e))
+			return False
+		if background.result is not None:
+			setattr(self, background.result, value)
+		if background.done is not None:
+			background.done(value)
+		return False
+	# }}}
+	def _shutdown(self, wait = True): # {{{
+		'''Stop the worker threads and processes of background event handlers.
+		Calls which have not started are cancelled, including those that
+		wait for a running call because of busy='replace'. If wait is
+		True, wait until the running calls have returned.'''
+		for background in self.__background__.values():
+			background.waiting = None
+		for executor in self.__executors__.values():
+			executor.shutdown(wait, cancel_futures = True)
+		self.__executors__.clear()
+	# }}}
+	def __event_options__(self, name, options): # {{{
+		'''Internal function to apply the options of an event.'''
+		for mode in ('debounce', 'throttle'):
+			if mode not in options:
+				continue
+			try:
+				interval = int(options[mode])
+			except (TypeError, ValueError):
+				error('invalid interval for %s of event %s: %s' % (mode, name, options[mode]))
+				continue
+			if 'leading' in options or 'trailing' in options:
+				leading = 'leading' in options
+				trailing = 'trailing' in options
+			else:
+				leading = mode == 'throttle'
+				trailing = True
+			if name in self.__event_rate__:
+				# The same event may be used in several places, but always with the same limit.
+				old = self.__event_rate__[name]
+				nice_assert((old.mode, old.interval, old.leading, old.trailing) == (mode, interval, leading, trailing), 'conflicting rate limits for event %s' % name)
+				self.__use_name__(self.__event_rate__, name)
+				continue
+			self.__add_name__(self.__event_rate__, name, RateLimit(self.__toolkit__.GLib, mode, interval, leading, trailing))
+		if 'background' in options:
+			kind = options['background']
+			nice_assert(kind in (True, 'thread', 'process'), 'invalid background option for event %s: %s' % (name, kind))
+			result = options.get('result')
+			nice_assert(result is None or isinstance(result, str), 'result option of event %s needs a name' % name)
+			background = Background(None, None, result if isinstance(result, str) else None, kind == 'process', options.get('busy', 'queue'))
+			old = self.__background__.get(name)
+			if old is None:
+				self.__add_name__(self.__background__, name, background)
+			else:
+				nice_assert((old.result, old.process, old.busy) == (background.result, background.process, background.busy), 'conflicting background options for event %s' % name)
+				self.__use_name__(self.__background__, name)
+		else:
+			nice_assert('result' not in options and 'busy' not in options, 'result and busy options of event %s need the background option' % name)
+		for key in options:
+			nice_assert(key in ('debounce', 'throttle', 'leading', 'trailing', 'background', 'result', 'busy'), 'invalid option %s for event %s' % (key, name))
 	# }}}
 	def __event_cb__(self, object, *args, **kwargs): # {{{
 		'''Internal callback for gui events.'''
+		if self.__mirror__ is not None:
+			# The handler may read the value that the event changed, before the widget signals the change.
+			self.__mirror__.changed(object)
+		if args[-1] in self.__event_rate__:
+			self.__event_rate__[args[-1]](self.__call_event__, args, kwargs)
+		else:
+			self.__call_event__(args, kwargs)
+	# }}}
+	def __call_event__(self, args, kwargs): # {{{
+		'''Internal function to call the handler of an event; the last argument is the event name.'''
 		if self.__event__[args[-1]][0] is not None:
-			f = self.__event__[args[-1]][0]
-			if self.__event__[args[-1]][1] is not None:
-				args = list(args) + [self.__event__[args[-1]][1]]
-			f(*args[:-1], **kwargs)
+			name = args[-1]
+			f = self.__event__[name][0]
+			background = self.__background__.get(name)
+			if self.__event__[name][1] is not None:
+				args = list(args) + [self.__event__[name][1]]
+			if background is not None:
+				self.__submit__(background, name, f, tuple(args[:-1]), kwargs)
+				return
+			ret = f(*args[:-1], **kwargs)
+			if ret is not None and hasattr(ret, '__await__'):
+				self.__schedule__(ret)
+	# }}}
+	def __schedule__(self, awaitable): # {{{
+		'''Internal function to run an awaitable that was returned by an event handler.'''
+		if not nice_assert(self.__async_loop__ is not None, 'event handler returned an awaitable, but the asyncio main loop is not running'):
+			if hasattr(awaitable, 'close'):
+				awaitable.close()
+			return
+		import asyncio
+		task = asyncio.ensure_future(awaitable, loop = self.__async_loop__)
+		# The event loop only keeps weak references to tasks.
+		self.__tasks__.add(task)
+		def done(task): # {{{
+			self.__tasks__.discard(task)
+			if not task.cancelled() and task.exception() is not None:
+				e = task.exception()
+				error('exception in event handler: %s: %s' % (type(e).__name__, e))
+		# }}}
+		task.add_done_callback(done)
 	# }}}
 	def __getattr__(self, name): # {{{
 		'''Get the value of a get variable.'''
-		if not name in self.__get__:
-			raise AttributeError
-		if self.__get__[name][0] is None:
-			return self.__get__[name][1]
-		if self.__get__[name][1] is NO_ARG:
-			return self.__get__[name][0] ()
+		getter = self.__getters__.get(name)
+		if getter is None:
+			raise AttributeError(name)
+		return getter()
+	# }}}
+	def _getter(self, name): # {{{
+		'''Return a function without arguments which returns the value of a get variable.
+		Calling it skips the lookups that are done when the value is read as an attribute.'''
+		return self.__getters__[name]
+	# }}}
+	def _setter(self, name, native = True): # {{{
+		'''Return a function with one argument which sets a set variable.
+		If native is True and the widget provides it, the function expects a
+		value of the right type (for example a float for a SpinButton value),
+		and it does not parse strings. Calling the function skips the
+		lookups done by attribute assignment, and it ignores _batch.'''
+		if native and name in self.__native__:
+			f = self.__native__[name]
+			if self.__stats__ is not None:
+				f = TimedCalls.time(f, name, self.__stats__['set'])
+			if self.__mirror__ is not None:
+				f = self.__mirror__.setter(f, name)
+			return f
+		return self.__setters__[name]
+	# }}}
+	def _row(self, name, key): # {{{
+		'''Return the row with the given key of the Repeat whose items are the set variable name.
+		The get and set variables of the row are its attributes.'''
+		return self.__repeats__[name].rows[key].scope
+	# }}}
+	def _attach(self, slot, description, events = {}, position = None): # {{{
+		'''Add widgets to a container while the gui is running.
+		slot is the value of the slot attribute of the container (a box,
+		notebook or table). description is the text of one or more
+		elements, in the same format as the gui description, and it may use
+		its defs. events gives the handlers for event names which are not
+		yet in the gui, as the events argument of the constructor does. If
+		position is given, the widgets are moved there in a box. Return a
+		handle for _detach.'''
+		import xml.etree.ElementTree as ET
+		wrap = self.__containers__.get(slot)
+		if not nice_assert(wrap is not None, 'no container with slot %s' % slot):
+			return None
+		children = []
+		for c in self.__parse__(ET.fromstring('<Gtk>%s</Gtk>' % description)).children:
+			children.extend(self.__apply_defs__(c))
+		handle = Attachment(slot)
+		if len(children) == 0:
+			return handle
+		self.__attaching__ = handle
+		wrap.desc = self.__element__('slot', {}, children)
+		try:
+			wrap.adder()
+			# Background handlers add names too, so this is done while recording.
+			for name in events:
+				if nice_assert(name in self.__event__, 'event name %s is not in the attached widgets' % name):
+					self.__handler__(name, events[name])
+		finally:
+			wrap.desc = None
+			self.__attaching__ = None
+		if self.__mirror__ is not None:
+			for registry, names in handle.names:
+				if registry is self.__get__:
+					self.__mirror__.watch(names)
+		handle.widgets = [w for w in handle.built if w.get_parent() is wrap.widget]
+		if position is not None:
+			for i, w in enumerate(handle.widgets):
+				wrap.widget.reorder_child(w, position + i)
+		return handle
+	# }}}
+	def _detach(self, handle): # {{{
+		'''Destroy widgets which were added by _attach, and remove their names from the gui.'''
+		if handle is None:
+			return
+		for registry, names in handle.names:
+			for name in names:
+				key = (id(registry), name)
+				self.__attached__[key] -= 1
+				if self.__attached__[key] > 0:
+					# Another attachment still uses this name.
+					continue
+				del self.__attached__[key]
+				if registry is self.__event_rate__ and registry[name].source is not None:
+					self.__toolkit__.GLib.source_remove(registry[name].source)
+				if registry is self.__background__ and name in registry:
+					# Calls that have not started are cancelled; the results of running calls are dropped.
+					background = registry[name]
+					background.waiting = None
+					if background.future is not None:
+						background.future.cancel()
+						background.future = None
+				registry.pop(name, None)
+				self.__pending__.pop(name, None)
+				with self.__post_lock__:
+					self.__posted__.pop(name, None)
+				if self.__stats__ is not None:
+					for histograms in self.__stats__.values():
+						histograms.pop(name, None)
+		if self.__mirror__ is not None:
+			self.__mirror__.forget(handle.built)
+		built = set(handle.built)
+		for group in self.__radio_groups__.values():
+			group[:] = [w for w in group if w not in built]
+		for w in handle.widgets:
+			w.destroy()
+		handle.names = []
+		handle.built = []
+		handle.widgets = []
+	# }}}
+	def __registries__(self): # {{{
+		'''Internal function to list the dicts in which building widgets can add names.'''
+		return [self.__get__, self.__set__, self.__native__, self.__name_widgets__, self.__event__, self.__event_rate__, self.__background__, self.__radio_groups__, self.__repeats__, self.__containers__]
+	# }}}
+	def __add_name__(self, registry, name, value): # {{{
+		'''Internal function to add a name to one of the dicts of names, such as __get__ or __event__.
+		While _attach builds widgets, new names are recorded, so _detach can remove them.'''
+		if self.__attaching__ is not None:
+			self.__use_name__(registry, name)
+		registry[name] = value
+	# }}}
+	def __use_name__(self, registry, name): # {{{
+		'''Internal function to record that the attachment that is being built uses a name of registry.
+		Names from the gui itself are not recorded. Names which were
+		added by _attach are counted for every attachment that uses
+		them, and _detach only removes them with the last one.'''
+		if self.__attaching__ is None:
+			return
+		key = (id(registry), name)
+		if name in registry and key not in self.__attached__:
+			return
+		if self.__attaching__.record(registry, name):
+			self.__attached__[key] = self.__attached__.get(key, 0) + 1
+	# }}}
+	def _instrument(self, enable = True): # {{{
+		'''Start or stop recording the number and duration of event handler and set callback calls.
+		When it is stopped, no time is spent on it. The results of
+		earlier recordings are kept. Functions from _setter are only
+		timed if they were requested while recording.'''
+		if enable:
+			if self.__stats__ is None:
+				self.__stats__ = {'event': {}, 'set': {}}
+			if '__call_event__' not in self.__dict__:
+				call = self.__call_event__
+				histograms = self.__stats__['event']
+				def timed_call(args, kwargs): # {{{
+					start = time.perf_counter()
+					try:
+						call(args, kwargs)
+					finally:
+						histogram = histograms.get(args[-1])
+						if histogram is None:
+							histogram = histograms.setdefault(args[-1], Histogram())
+						histogram.add(time.perf_counter() - start)
+				# }}}
+				self.__call_event__ = timed_call
 		else:
-			return self.__get__[name][0] (self.__get__[name][1])
+			self.__dict__.pop('__call_event__', None)
+		self.__update_setters__()
+	# }}}
+	def __update_setters__(self): # {{{
+		'''Internal function to set __setters__, with the wrappers for _instrument and _mirror if they are enabled.'''
+		setters = self.__set__.compiled
+		if '__call_event__' in self.__dict__:
+			setters = TimedCalls(setters, self.__stats__['set'])
+		if self.__mirror__ is not None:
+			setters = MirrorSetters(setters, self.__mirror__)
+		self.__setters__ = setters
+	# }}}
+	def _mirror(self, enable = True): # {{{
+		'''Start or stop keeping the values of get names in Python.
+		While it is enabled, reading a name only asks the widget for its
+		value if it may have changed since the last read: when the
+		widget signalled a change, a gui event came from it, or one of
+		its set names was written. Widgets for which the toolkit cannot
+		tell that their value changes are always asked.'''
+		if enable:
+			if self.__mirror__ is None:
+				self.__mirror__ = Mirror(self)
+				self.__mirror__.watch(self.__get__)
+				self.__getters__ = self.__mirror__
+		elif self.__mirror__ is not None:
+			self.__mirror__.close()
+			self.__mirror__ = None
+			self.__getters__ = self.__get__.compiled
+		self.__update_setters__()
+	# }}}
+	def _snapshot(self): # {{{
+		'''Return a dict with the values of all get names.
+		With _mirror, values which did not change are not read from the widgets again.
+		Windows which are not built yet are not built for this; their
+		names report the value that was set, or the default.'''
+		getters = self.__getters__
+		ret = {}
+		for name, (cb, arg) in self.__get__.items():
+			if cb == self.__lazy_get__:
+				ret[name] = arg[0].value(name)
+			else:
+				ret[name] = getters[name]()
+		return ret
+	# }}}
+	def _stats(self, reset = False, filename = None): # {{{
+		'''Return the statistics which were recorded by _instrument.
+		The result is a dict with keys 'event' and 'set', which map each
+		event or set name to the number of calls and the total, mean,
+		p50, p99 and max duration in milliseconds. If filename is given,
+		it is also written there as JSON. If reset is True, the
+		statistics are cleared.'''
+		ret = {}
+		if self.__stats__ is not None:
+			for kind in self.__stats__:
+				ret[kind] = {name: h.summary() for name, h in self.__stats__[kind].items()}
+				if reset:
+					self.__stats__[kind].clear()
+		if filename is not None:
+			import json
+			with open(filename, 'w') as f:
+				json.dump(ret, f, indent = '\t')
+		return ret
+	# }}}
+	def _memory(self): # {{{
+		'''Return the Python memory that was allocated for building widgets.
+		The result maps every tag to a dict with the number of widgets
+		('count'), the bytes that were allocated for them, excluding
+		their children ('bytes') and the mean per widget ('mean').
+		Memory is only recorded if tracemalloc was tracing when the Gui
+		was created; otherwise a warning is reported and the result is
+		empty. Memory which is allocated by the toolkit outside of
+		Python is not included.'''
+		if self.__memory__ is None:
+			error('Warning: no memory was recorded, because tracemalloc was not tracing when the gui was created; start it before that, for example with PYTHONTRACEMALLOC=1')
+			return {}
+		return {tag: {'count': count, 'bytes': size, 'mean': size / count} for tag, (count, size) in self.__memory__.tags.items()}
 	# }}}
 	def __setattr__(self, name, value): # {{{
 		'''Set the value of a set variable.'''
-		if name.startswith('_'):
+		if name[0] == '_':
 			self.__dict__[name] = value
-		elif name in self.__set__:
-			if self.__set__[name][1] is NO_ARG:
-				self.__set__[name][0] (value)
-			else:
-				self.__set__[name][0] (self.__set__[name][1], value)
-		else:
+			return
+		setter = self.__setters__.get(name)
+		if setter is None:
 			error('not setting ' + name + ", because it isn't defined in the gui")
+		elif self.__batching__ > 0:
+			# Move the name to the end, so values are applied in the order of their last write.
+			self.__pending__.pop(name, None)
+			self.__pending__[name] = value
+		else:
+			setter(value)
+	# }}}
+	def __apply__(self, name, value): # {{{
+		'''Internal function to call the set callback for a name.'''
+		self.__setters__[name](value)
+	# }}}
+	@contextlib.contextmanager	# _batch {{{
+	def _batch(self):
+		'''Collect writes to set variables, and apply them from a single idle callback.
+		Use this as "with g._batch():". Of repeated writes to the same name,
+		only the last value is applied. Until then, reading a get variable
+		returns its old value. Batches may be nested; the writes are
+		scheduled when the outermost batch ends.'''
+		self.__batching__ += 1
+		try:
+			yield self
+		finally:
+			self.__batching__ -= 1
+			if self.__batching__ == 0 and len(self.__pending__) > 0 and self.__flush_source__ is None:
+				self.__flush_source__ = self.__toolkit__.GLib.idle_add(self.__flush_idle__)
+	# }}}
+	def _update(self, values = {}, **kwargs): # {{{
+		'''Set several set variables in one batch.
+		The values can be passed as a dict, as keyword arguments, or both.'''
+		with self._batch():
+			for name in values:
+				setattr(self, name, values[name])
+			for name in kwargs:
+				setattr(self, name, kwargs[name])
+	# }}}
+	def _flush(self): # {{{
+		'''Apply all writes from finished batches immediately.'''
+		if self.__flush_source__ is not None:
+			self.__toolkit__.GLib.source_remove(self.__flush_source__)
+			self.__flush_source__ = None
+		pending = self.__pending__
+		self.__pending__ = {}
+		for name in pending:
+			if name in self.__set__:
+				self.__apply__(name, pending[name])
+	# }}}
+	def _post(self, values = {}, **kwargs): # {{{
+		'''Set several set variables; this may be called from any thread.
+		The values can be passed as a dict, as keyword arguments, or both.
+		Only the latest value for each name is kept, and all values are
+		applied together from the main loop, at most frame_rate times per
+		second.'''
+		with self.__post_lock__:
+			for v in (values, kwargs):
+				for name in v:
+					self.__posted__.pop(name, None)
+					self.__posted__[name] = v[name]
+			if self.__post_source__ is not None or len(self.__posted__) == 0:
+				# The main loop will pick up the values.
+				return
+			GLib = self.__toolkit__.GLib
+			delay = self.__post_time__ + self.__frame_time__ - time.monotonic()
+			if delay > 0:
+				self.__post_source__ = GLib.timeout_add(int(delay * 1000) + 1, self.__post_idle__)
+			else:
+				self.__post_source__ = GLib.idle_add(self.__post_idle__)
+		self.__wake__()
+	# }}}
+	def __post_idle__(self): # {{{
+		'''Internal main loop callback for applying values from _post.'''
+		with self.__post_lock__:
+			posted = self.__posted__
+			self.__posted__ = {}
+			self.__post_source__ = None
+			self.__post_time__ = time.monotonic()
+		for name in posted:
+			if nice_assert(name in self.__set__, 'not setting %s, because it is not defined in the gui' % name):
+				self.__apply__(name, posted[name])
+		return False
+	# }}}
+	def __flush_idle__(self): # {{{
+		'''Internal idle callback for applying batched writes.'''
+		self.__flush_source__ = None
+		self._flush()
+		return False
 	# }}}
 	def _show(self, w, value): # {{{
 		if as_bool(value):
@@ -1167,15 +4555,32 @@ class Gui: # {{{
 		if not self.__building__:
 			self._show(w, value)
 	# }}}
+	def __widget_class__(self, tag): # {{{
+		'''Internal function to find the class that implements a tag.'''
+		ret = self.__widget_classes__.get(tag)
+		if ret is not None:
+			return ret
+		for w in self.__widgets__:
+			if tag in w:
+				self.__widget_classes__[tag] = w[tag]
+				return w[tag]
+		return None
+	# }}}
 	def __build__(self, desc, fromparent = None): # {{{
 		'''Internal function to create a widget, including contents.'''
-		for w in self.__widgets__:
-			if desc.tag in w:
-				widget = w[desc.tag]
-				break
-		else:
+		if self.__memory__ is not None:
+			return self.__memory__.build(self.__build_widget__, desc, fromparent)
+		return self.__build_widget__(desc, fromparent)
+	# }}}
+	def __build_widget__(self, desc, fromparent): # {{{
+		'''Internal function which does the work for __build__.'''
+		if self.__builder__ is not None and self.__builder__.size(self, desc) >= self.__builder__.minimum:
+			return self.__builder__.build(self, desc, fromparent)
+		widget = self.__widget_class__(desc.tag)
+		if widget is None:
 			error('no widget named %s defined' % desc.tag)
 			return None
+		slot = desc.attributes.pop('slot', None)
 		wrap = Wrapper.create(self, desc, widget, self.__data__)
 		ret = wrap.widget
 		if hasattr(ret, 'return_object'):
@@ -1186,39 +4591,207 @@ class Gui: # {{{
 				return None
 		if not hasattr(ret, 'gtk_window'):
 			ret.show()
-			wrap.register_attribute('show', ret.get_visible, lambda x: self._show(ret, x))
+		return self.__finish__(wrap, ret, fromparent, slot)
+	# }}}
+	def __finish__(self, wrap, ret, fromparent, slot): # {{{
+		'''Internal function to register the attributes that all widgets have, after a widget is created; returns ret.'''
+		desc = wrap.desc
+		if not hasattr(ret, 'gtk_window'):
+			wrap.register_attribute('show', get_visible, set_visible, ret)
 		else:
-			wrap.register_attribute('show', lambda: ret.mem_show, lambda x: self._showwin(ret, x))
-		wrap.register_attribute('sensitive', ret.get_sensitive, lambda x: ret.set_sensitive(as_bool(x)))
-		wrap.register_attribute('can_focus', ret.get_can_focus, lambda x: ret.set_can_focus(as_bool(x)))
+			wrap.register_attribute('show', lambda: getattr(ret, 'mem_show', False), lambda x: self._showwin(ret, x))
+		wrap.register_attribute('sensitive', get_sensitive, set_sensitive, ret)
+		wrap.register_attribute('can_focus', get_can_focus, set_can_focus, ret)
 		if fromparent != None:
 			for k in fromparent:
 				wrap.register_attribute(k, fromparent[k][0], fromparent[k][1], ret)
 		if desc.attributes != {}:
 			error('unused attributes for ' + desc.tag + ': ' + str(desc.attributes))
+		# The description is not needed anymore; _attach sets a new one.
+		wrap.desc = None
+		if slot is not None and nice_assert(hasattr(wrap, 'adder'), 'slot %s is not on a container with any number of children' % slot) and nice_assert(slot not in self.__containers__, 'duplicate slot %s' % slot):
+			self.__add_name__(self.__containers__, slot, wrap)
+		if self.__attaching__ is not None:
+			self.__attaching__.built.append(ret)
 		return ret
 	# }}}
+	def __show_windows__(self): # {{{
+		'''Internal function to show the windows that should be visible when the main loop starts.'''
+		for w in self.__windows__:
+			if not hasattr(w, 'mem_show'):
+				w.mem_show = None
+			if w.mem_show == True:	# True means show, None and False mean hide.
+				self._show(w, True)
+	# }}}
+	async def _run_async(self, interval = .05): # {{{
+		'''Run the main loop inside a running asyncio event loop.
+		Use this as "await g._run_async()"; it returns when the loop is
+		stopped with g(False). While it runs, event handlers may be
+		coroutine functions; the coroutines they return are run as tasks
+		in the asyncio loop.
+		With Gtk, the asyncio loop must run the GLib main context, which
+		is the case for loops of gi.events.GLibEventLoopPolicy, as used by
+		g('asyncio'). GLib then dispatches the toolkit events itself.
+		The null toolkit has no such loop, so its events are handled
+		from the asyncio loop. It waits until the next timeout, or until
+		_post or a background event handler wakes it. Sources that are
+		added from other threads are found by checking with an interval
+		that grows from 1 ms to interval seconds while the gui is idle.'''
+		import asyncio
+		loop = asyncio.get_running_loop()
+		toolkit = self.__toolkit__
+		integrated = toolkit.asyncio_loop(loop)
+		if not nice_assert(integrated or toolkit.next_timeout is not None, 'the asyncio loop does not run the %s main loop; use g(\'asyncio\') or an event loop of gi.events.GLibEventLoopPolicy' % toolkit.name):
+			return None
+		self.__show_windows__()
+		wake = asyncio.Event()
+		outer = self.__async_loop__, self.__async_running__, self.__async_wake__
+		self.__async_loop__ = loop
+		self.__async_running__ = True
+		self.__async_wake__ = lambda: loop.call_soon_threadsafe(wake.set)
+		try:
+			if integrated:
+				# The toolkit sources are dispatched by the asyncio loop; wait until g(False).
+				while self.__async_running__:
+					wake.clear()
+					await wake.wait()
+			else:
+				await self.__poll_async__(wake, interval)
+		finally:
+			self.__async_loop__, self.__async_running__, self.__async_wake__ = outer
+		return self.__loop_return__
+	# }}}
+	async def __poll_async__(self, wake, interval): # {{{
+		'''Internal function to handle the events of a toolkit which cannot be run by the asyncio loop.'''
+		import asyncio
+		Gtk = self.__toolkit__.Gtk
+		next_timeout = self.__toolkit__.next_timeout
+		wait = 0.
+		while self.__async_running__:
+			# Clear it first, so a wake up while events are handled is not lost.
+			wake.clear()
+			handled = False
+			while self.__async_running__ and Gtk.events_pending():
+				Gtk.main_iteration_do(False)
+				handled = True
+			if not self.__async_running__:
+				break
+			if handled:
+				wait = 0.
+				# Yield to asyncio.
+				await asyncio.sleep(0)
+				continue
+			wait = min(interval, max(.001, 2 * wait))
+			timeout = next_timeout()
+			delay = wait if timeout is None else min(wait, timeout)
+			try:
+				await asyncio.wait_for(wake.wait(), delay)
+			except asyncio.TimeoutError:
+				pass
+	# }}}
 	def __call__(self, run = True, ret = None): # {{{
-		'''Run the main loop.'''
+		'''Run the main loop.
+		If run is True, the toolkit main loop is run until it is stopped.
+		If run is 'asyncio', a new asyncio event loop is run, which also
+		handles the toolkit events (see _run_async).
+		Any other true value handles pending events and returns.
+		If run is False, the innermost running loop is stopped, and it returns ret.'''
 		if run:
-			for w in self.__windows__:
-				if not hasattr(w, 'mem_show'):
-					w.mem_show = None
-				if w.mem_show == True:	# True means show, None and False mean hide.
-					self._show(w, True)
+			if run == 'asyncio':
+				import asyncio
+				policy = self.__toolkit__.asyncio_policy()
+				if policy is None:
+					return asyncio.run(self._run_async())
+				# The loop of the policy runs the toolkit main loop; it is kept for later use.
+				return policy.get_event_loop().run_until_complete(self._run_async())
+			self.__show_windows__()
 			if run is True:
-				Gtk.main()
+				self.__toolkit__.Gtk.main()
 			else:
 				self.__iterating__ = True
-				while self.__iterating__ and Gtk.events_pending():
-					Gtk.main_iteration_do(False)
+				while self.__iterating__ and self.__toolkit__.Gtk.events_pending():
+					self.__toolkit__.Gtk.main_iteration_do(False)
 				self.__iterating__ = False
 			return self.__loop_return__
 		else:
 			self.__loop_return__ = ret
 			if self.__iterating__:
 				self.__iterating__ = False
+			elif self.__async_running__:
+				self.__async_running__ = False
+				self.__wake__()
 			else:
-				Gtk.main_quit()
+				self.__toolkit__.Gtk.main_quit()
 	# }}}
 # }}}
+
+class Template: # {{{
+	'''A gui description which is read and expanded once, for creating any number of Gui objects.
+	Every Gui that is created from it has its own widgets and names; it
+	only shares the expanded description and the compiled defs.'''
+	# The description is read in the same way as by Gui.
+	__element__ = Gui.__element__
+	__parse__ = Gui.__parse__
+	__expand__ = Gui.__expand__
+	__apply_defs__ = Gui.__apply_defs__
+	__load__ = Gui.__load__
+	__load_compiled__ = Gui.__load_compiled__
+	def __init__(self, packagename = None, execname = None, filename = None, use_compiled = True): # {{{
+		'''Read and expand a gui description.
+		The names are used to find the file like Gui does; if filename is
+		given, that file is used instead. If use_compiled is False, a
+		module from compile_gui is not used.'''
+		self.packagename, self.execname = program_names(packagename, execname)
+		if filename is None:
+			filename = find_path(self.execname + os.extsep + 'gui', self.packagename)
+			nice_assert(filename is not None, 'gui description for %s not found' % self.execname, exit = True)
+		self.filename = filename
+		self.__defs__ = {}
+		self.packed = self.__load__(filename, use_compiled).pack()
+	# }}}
+	def tree(self): # {{{
+		'''Return a new element tree of the description; building widgets consumes it.'''
+		return self.__element__.unpack(self.packed)
+	# }}}
+	def __call__(self, *args, **kwargs): # {{{
+		'''Create a Gui from this template. The arguments are passed to Gui.'''
+		return Gui(*args, template = self, **kwargs)
+	# }}}
+# }}}
+
+def compile_gui(filename, output = None): # {{{
+	'''Write a Python module with the parsed and expanded gui description in filename.
+	output defaults to compiled_path(filename). Gui uses the module
+	instead of the file if there is no cache entry for it, as long as
+	the module is newer than the file. Returns the name of the module.'''
+	import base64
+	template = Template(filename = filename, use_compiled = False)
+	if output is None:
+		output = compiled_path(filename)
+	# The data is marshalled like in the cache; large Python literals are read much more slowly.
+	data = marshal.dumps((template.packed, {name: template.__defs__[name].nodes for name in template.__defs__}))
+	with open(output, 'w') as f:
+		f.write('# Compiled from %s by python-gui; do not edit.\n' % os.path.basename(filename))
+		f.write('# Gui reads these values as literals; it does not import this module.\n')
+		f.write('format = %r\n' % CACHE_FORMAT)
+		f.write('version = %r\n' % __version__)
+		f.write('size = %r\n' % os.stat(filename).st_size)
+		f.write('data = %r\n' % base64.b64encode(data).decode('ascii'))
+	return output
+# }}}
+
+def main(argv = None): # {{{
+	'''Command line interface: compile gui descriptions.'''
+	import argparse
+	parser = argparse.ArgumentParser(prog = 'python3 -m gui', description = 'Compile gui descriptions to Python modules, which are loaded without parsing XML.')
+	parser.add_argument('files', nargs = '+', help = 'gui description files')
+	parser.add_argument('-o', '--output', help = 'module to write; only allowed with one file; default: foo_gui.py for foo.gui')
+	args = parser.parse_args(argv)
+	if args.output is not None and len(args.files) != 1:
+		parser.error('--output can only be used with one file')
+	for filename in args.files:
+		compile_gui(filename, args.output)
+# }}}
+
+if __name__ == '__main__':
+	main()
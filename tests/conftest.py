@@ -0,0 +1,57 @@
+# Shared fixtures for the tests. They use the null toolkit, so they run without a display.
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gui
+
+@pytest.fixture
+def make_gui(tmp_path, monkeypatch): # {{{
+	'''Return a function which writes a gui description and builds a Gui for it with the null toolkit.'''
+	monkeypatch.setenv('GUI_PATH', str(tmp_path))
+	monkeypatch.setenv('GUI_CACHE', '')
+	guis = []
+	def make(description, name = 'test', **kwargs):
+		with open(os.path.join(str(tmp_path), name + os.extsep + 'gui'), 'w') as f:
+			f.write(description)
+		kwargs.setdefault('toolkit', 'null')
+		ret = gui.Gui(name, name, **kwargs)
+		guis.append(ret)
+		return ret
+	yield make
+	for g in guis:
+		g._shutdown(wait = False)
+	# The null main loop is shared; drop the sources that the test left behind.
+	with gui.null_loop.cond:
+		gui.null_loop.idle.clear()
+		del gui.null_loop.timeouts[:]
+# }}}
+
+@pytest.fixture
+def errors(monkeypatch): # {{{
+	'''Collect the messages that are reported through gui.error, instead of printing them.'''
+	ret = []
+	def error(message, exit = False):
+		ret.append(message)
+		if exit:
+			raise SystemExit(1)
+	monkeypatch.setattr(gui, 'error', error)
+	return ret
+# }}}
+
+@pytest.fixture
+def drain(): # {{{
+	'''Return a function which runs the null main loop until no idle or timeout sources are left.
+	Timeouts are waited for; sources which keep themselves alive stop it after limit iterations.'''
+	def run(limit = 1000):
+		loop = gui.null_loop
+		for i in range(limit):
+			with loop.cond:
+				if len(loop.idle) == 0 and len(loop.timeouts) == 0:
+					return
+			loop.main_iteration_do(True)
+		raise AssertionError('main loop did not become idle')
+	return run
+# }}}
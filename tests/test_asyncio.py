@@ -0,0 +1,104 @@
+# Tests for running the main loop from asyncio.
+
+import time
+import asyncio
+import threading
+import gui
+
+FORM = '''<Gtk>
+	<Window>
+		<VBox>
+			<Entry value='name'/>
+			<Button clicked='go'>Go</Button>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def test_coroutine_handler(make_gui, errors): # {{{
+	async def go():
+		await asyncio.sleep(.01)
+		g.name = 'after sleep'
+		await asyncio.sleep(.01)
+		g(False, g.name)
+	g = make_gui(FORM, inputs = ('name',), events = {'go': go})
+	gui.null_loop.idle_add(g.__name_widgets__['name'].get_parent().children[1].clicked)
+	assert g('asyncio') == 'after sleep'
+	assert errors == []
+# }}}
+
+def test_idle_backoff(make_gui, errors, monkeypatch): # {{{
+	g = make_gui(FORM, inputs = ('name',), events = {'go': lambda: None})
+	toolkit = g.__toolkit__
+	checks = []
+	next_timeout = toolkit.next_timeout
+	def counted():
+		checks.append(time.monotonic())
+		return next_timeout()
+	monkeypatch.setattr(toolkit, 'next_timeout', counted)
+	gui.null_loop.timeout_add(300, lambda: g(False))
+	g('asyncio')
+	# Polling every 10 ms would be 30 checks; with the back off, it is about 10.
+	assert len(checks) < 16
+	assert errors == []
+# }}}
+
+def test_timeout_is_not_delayed(make_gui, errors): # {{{
+	g = make_gui(FORM, inputs = ('name',), events = {'go': lambda: None})
+	start = time.monotonic()
+	fired = []
+	def timeout():
+		fired.append(time.monotonic() - start)
+		g(False)
+	gui.null_loop.timeout_add(130, timeout)
+	g('asyncio')
+	assert .13 <= fired[0] < .16
+	assert errors == []
+# }}}
+
+def test_post_wakes(make_gui, errors): # {{{
+	g = make_gui(FORM, inputs = ('name',), events = {'go': lambda: None})
+	posted = []
+	def post():
+		posted.append(time.monotonic())
+		g._post(name = 'posted')
+	async def main():
+		runner = asyncio.ensure_future(g._run_async(interval = 1))
+		# Let the loop become idle, so it waits for the full interval.
+		await asyncio.sleep(.3)
+		threading.Thread(target = post).start()
+		while g.name != 'posted':
+			await asyncio.sleep(.001)
+		latency = time.monotonic() - posted[0]
+		g(False)
+		await runner
+		return latency
+	assert asyncio.run(main()) < .1
+	assert errors == []
+# }}}
+
+def test_integrated_loop_does_not_poll(make_gui, errors, monkeypatch): # {{{
+	g = make_gui(FORM, inputs = ('name',), events = {'go': lambda: None})
+	toolkit = g.__toolkit__
+	checks = []
+	monkeypatch.setattr(toolkit, 'asyncio_loop', lambda loop: True)
+	monkeypatch.setattr(toolkit, 'next_timeout', lambda: checks.append(1))
+	async def main():
+		runner = asyncio.ensure_future(g._run_async())
+		await asyncio.sleep(.1)
+		stopped = time.monotonic()
+		g(False, 'stopped')
+		ret = await runner
+		return ret, time.monotonic() - stopped
+	ret, latency = asyncio.run(main())
+	assert ret == 'stopped'
+	assert latency < .05
+	assert checks == []
+	assert errors == []
+# }}}
+
+def test_loop_without_toolkit_integration(make_gui, errors, monkeypatch): # {{{
+	g = make_gui(FORM, inputs = ('name',), events = {'go': lambda: None})
+	monkeypatch.setattr(g.__toolkit__, 'next_timeout', None)
+	assert asyncio.run(g._run_async()) is None
+	assert len(errors) == 1
+# }}}
@@ -0,0 +1,91 @@
+# Tests for _attach and _detach.
+
+import time
+import threading
+import gui
+
+GRID = '''<Gtk>
+	<Window>
+		<Table columns='2' slot='grid'>
+			<Label value=':a'/>
+			<Label value=':b'/>
+			<Label value=':c'/>
+		</Table>
+	</Window>
+</Gtk>'''
+
+def registries(g): # {{{
+	'''Return the names in all dicts that _attach can add to.'''
+	return [set(r) for r in g.__registries__()]
+# }}}
+
+def test_attach_table_placement(make_gui, errors): # {{{
+	g = make_gui(GRID)
+	h = g._attach('grid', "<Label value=':d'/><Label value=':e'/>")
+	places = [(p.left, p.top) for p in map(gui.TablePacking.get, h.widgets)]
+	assert places == [(1, 1), (0, 2)]
+	assert errors == []
+# }}}
+
+def test_detach_restores_names(make_gui, errors): # {{{
+	g = make_gui(GRID)
+	g._instrument()
+	before = registries(g)
+	h = g._attach('grid', "<Entry value='name' changed='edited:debounce=50,background'/><VBox slot='inner'><CheckButton value='check'>c</CheckButton><RadioButton group=':choice' value='one'>one</RadioButton></VBox>", events = {'edited': lambda: None})
+	assert g.name == ''
+	g.name = 'x'
+	g.check = True
+	assert set(g._stats()['set']) == {'name', 'check'}
+	assert 'edited' in g.__event_rate__ and 'edited' in g.__background__ and 'inner' in g.__containers__ and 'choice' in g.__radio_groups__
+	g._detach(h)
+	assert registries(g) == before
+	assert g._stats()['set'] == {}
+	assert errors == []
+# }}}
+
+def test_detach_background_handler(make_gui, errors, drain): # {{{
+	g = make_gui(GRID)
+	before = registries(g)
+	release = threading.Event()
+	done = []
+	def work():
+		release.wait(5)
+		return 'late'
+	h = g._attach('grid', "<Button clicked='work'>w</Button>", events = {'work': gui.Background(work, done = done.append)})
+	assert 'work' in g.__background__
+	background = g.__background__['work']
+	h.widgets[0].clicked()
+	future = background.future
+	assert future is not None
+	g._detach(h)
+	assert registries(g) == before
+	assert background.future is None
+	release.set()
+	future.result(5)
+	# The main loop callback is added after the result is available.
+	for i in range(100):
+		if len(gui.null_loop.idle) > 0:
+			break
+		time.sleep(.01)
+	drain()
+	# The result of a call that ran while the event was detached is dropped.
+	assert done == []
+	assert errors == []
+# }}}
+
+def test_detach_shared_event(make_gui, errors): # {{{
+	g = make_gui(GRID)
+	before = registries(g)
+	closed = []
+	first = g._attach('grid', "<Button clicked='close:throttle=50'>a</Button>", events = {'close': lambda: closed.append(True)})
+	second = g._attach('grid', "<Button clicked='close:throttle=50'>b</Button>")
+	g._detach(first)
+	# The second attachment still uses the event and its rate limit.
+	assert 'close' in g.__event__ and 'close' in g.__event_rate__
+	second.widgets[0].clicked()
+	assert closed == [True]
+	g._detach(second)
+	assert registries(g) == before
+	assert g.__attached__ == {}
+	assert errors == []
+# }}}
@@ -0,0 +1,157 @@
+# Tests for event handlers which run in background threads or processes.
+
+import time
+import threading
+import concurrent.futures
+import gui
+
+FORM = '''<Gtk>
+	<Window>
+		<VBox>
+			<Button clicked='work'>Work</Button>
+			<Label value='out'/>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def square(x): # {{{
+	'''Handler for process mode; it must be picklable, so it is defined at module level.'''
+	return x * x
+# }}}
+
+def button(g): # {{{
+	return g.__name_widgets__['out'].get_parent().children[0]
+# }}}
+
+def finish(g, drain): # {{{
+	'''Wait until the background calls of g have returned, and handle their results.'''
+	for i in range(500):
+		drain()
+		if all(b.future is None and b.waiting is None for b in g.__background__.values()):
+			return
+		time.sleep(.01)
+	raise AssertionError('background calls did not finish')
+# }}}
+
+def blocking(calls, release): # {{{
+	'''Return a handler which records its argument and waits for release.'''
+	def work(value):
+		calls.append(value)
+		release.wait(5)
+		return value
+	return work
+# }}}
+
+def test_result_option(make_gui, errors, drain): # {{{
+	threads = []
+	def work():
+		threads.append(threading.current_thread())
+		return 'computed'
+	g = make_gui(FORM.replace("clicked='work'", "clicked='work:background,result=out'"), outputs = ('out',), events = {'work': work})
+	button(g).clicked()
+	finish(g, drain)
+	assert g.out == 'computed'
+	assert threads[0] is not threading.current_thread()
+	assert errors == []
+# }}}
+
+def test_done_runs_on_main_loop(make_gui, errors, drain): # {{{
+	threads = []
+	def done(value):
+		threads.append(threading.current_thread())
+	g = make_gui(FORM, outputs = ('out',), events = {'work': gui.Background(lambda: 'value', done = done, result = 'out')})
+	button(g).clicked()
+	finish(g, drain)
+	assert g.out == 'value'
+	# drain runs the null main loop in this thread.
+	assert threads == [threading.current_thread()]
+	assert errors == []
+# }}}
+
+def test_busy_skip(make_gui, errors, drain): # {{{
+	calls = []
+	release = threading.Event()
+	results = []
+	g = make_gui(FORM, outputs = ('out',), events = {'work': gui.Background(blocking(calls, release), done = results.append, busy = 'skip')})
+	for i in range(3):
+		button(g).emit('clicked', i)
+	release.set()
+	finish(g, drain)
+	assert calls == [0]
+	assert results == [0]
+	assert errors == []
+# }}}
+
+def test_busy_replace(make_gui, errors, drain): # {{{
+	calls = []
+	release = threading.Event()
+	results = []
+	g = make_gui(FORM, outputs = ('out',), events = {'work': gui.Background(blocking(calls, release), done = results.append, result = 'out', busy = 'replace')})
+	for i in range(4):
+		button(g).emit('clicked', i)
+	release.set()
+	finish(g, drain)
+	# The running call finishes, but only the latest call is run after it, and only its result is used.
+	assert calls == [0, 3]
+	assert results == [3]
+	assert g.out == 3
+	assert errors == []
+# }}}
+
+def test_process(make_gui, errors, drain): # {{{
+	results = []
+	g = make_gui(FORM, outputs = ('out',), events = {'work': gui.Background(square, done = results.append, process = True)})
+	button(g).emit('clicked', 7)
+	finish(g, drain)
+	assert results == [49]
+	assert isinstance(g.__executors__['process'], concurrent.futures.ProcessPoolExecutor)
+	g._shutdown()
+	assert g.__executors__ == {}
+	assert errors == []
+# }}}
+
+def test_shutdown_cancels_pending(make_gui, errors, drain): # {{{
+	calls = []
+	release = threading.Event()
+	results = []
+	g = make_gui(FORM, outputs = ('out',), events = {'work': gui.Background(blocking(calls, release), done = results.append)})
+	# One worker, so the other calls wait in the queue.
+	g.__executors__['thread'] = concurrent.futures.ThreadPoolExecutor(1)
+	for i in range(3):
+		button(g).emit('clicked', i)
+	future = g.__background__['work'].future
+	g._shutdown(wait = False)
+	assert future.cancelled()
+	release.set()
+	time.sleep(.1)
+	finish(g, drain)
+	assert calls == [0]
+	assert results == [0]
+	assert errors == []
+# }}}
+
+def test_shutdown_drops_replaced_call(make_gui, errors, drain): # {{{
+	calls = []
+	release = threading.Event()
+	g = make_gui(FORM, outputs = ('out',), events = {'work': gui.Background(blocking(calls, release), busy = 'replace')})
+	for i in range(2):
+		button(g).emit('clicked', i)
+	g._shutdown(wait = False)
+	release.set()
+	finish(g, drain)
+	assert calls == [0]
+	assert errors == []
+# }}}
+
+def test_shutdown_waits(make_gui, errors, drain): # {{{
+	finished = []
+	def work():
+		time.sleep(.1)
+		finished.append(True)
+	g = make_gui(FORM, outputs = ('out',), events = {'work': gui.Background(work)})
+	button(g).clicked()
+	g._shutdown(wait = True)
+	assert finished == [True]
+	finish(g, drain)
+	assert errors == []
+# }}}
@@ -0,0 +1,37 @@
+# Tests for _batch, _update and _flush.
+
+ENTRIES = '''<Gtk>
+	<Window>
+		<VBox>
+			<Entry value='a'/>
+			<Entry value='b'/>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def test_batch(make_gui, errors): # {{{
+	g = make_gui(ENTRIES, inputs = ('a', 'b'))
+	with g._batch():
+		g.a = 'first'
+		g.a = 'second'
+		with g._batch():
+			g.b = 'inner'
+		assert (g.a, g.b) == ('', '')
+	assert (g.a, g.b) == ('', '')
+	g(1)
+	assert (g.a, g.b) == ('second', 'inner')
+	assert errors == []
+# }}}
+
+def test_update_and_flush(make_gui, errors): # {{{
+	g = make_gui(ENTRIES, inputs = ('a', 'b'))
+	g._update({'a': 'x'}, b = 'y')
+	assert g.a == ''
+	g._flush()
+	assert (g.a, g.b) == ('x', 'y')
+	# The idle callback was removed, so processing events changes nothing.
+	g.a = 'direct'
+	g(1)
+	assert g.a == 'direct'
+	assert errors == []
+# }}}
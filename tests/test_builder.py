@@ -0,0 +1,83 @@
+# Tests for building plain widget trees with a Builder, using the null toolkit's stand-in for Gtk.Builder.
+
+import gui
+
+FORM = '''<Gtk>
+	<Window>
+		<VBox>
+			<Label value=':Name'/>
+			<Entry value='name' activate='go'/>
+			<HBox expand=':False'>
+				<SpinButton value='count' range='range:0,10'/>
+				<CheckButton value='check'>Check</CheckButton>
+				<HSeparator/>
+			</HBox>
+			<Frame label='title:Box'>
+				<ScrolledWindow>
+					<Label value='status:ready'/>
+				</ScrolledWindow>
+			</Frame>
+			<Button clicked='go'>Go</Button>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+NAMES = dict(inputs = ('name', 'count', 'check'), outputs = ('range', 'title', 'status'))
+
+def tree(widget): # {{{
+	'''Return the classes, visibility and packing of a widget tree.'''
+	parent = widget.get_parent()
+	packing = parent.child_properties.get(widget) if parent is not None else None
+	# Widgets that are built from Python are instances of a subclass of the builtin class.
+	cls = [c for c in type(widget).__mro__ if c.__name__.startswith('Null')][0]
+	return (cls.__name__, widget.visible, packing, getattr(widget, 'text', None), [tree(c) for c in widget.children])
+# }}}
+
+def make(make_gui, builder, calls, monkeypatch): # {{{
+	builders = []
+	class Recording(gui.NullBuilder):
+		def __init__(self):
+			gui.NullBuilder.__init__(self)
+			builders.append(self)
+	monkeypatch.setattr(gui.NullGtk, 'Builder', Recording)
+	g = make_gui(FORM, builder = builder, events = {'go': lambda: calls.append(g.name)}, **NAMES)
+	return g, builders
+# }}}
+
+def test_builder_matches_python(make_gui, errors, monkeypatch): # {{{
+	calls = []
+	python, unused = make(make_gui, False, calls, monkeypatch)
+	assert unused == []
+	built, builders = make(make_gui, True, calls, monkeypatch)
+	assert len(builders) == 1
+	# The same widgets, with the same packing and text.
+	assert tree(built.__windows__[0]) == tree(python.__windows__[0])
+	for g in (python, built):
+		assert (g.name, g.count, g.check, g.title, g.status) == ('', 0., False, 'Box', 'ready')
+		g.range = (0, 5)
+		g.count = 7
+		assert g.count == 5
+		g.check = True
+		assert g.check is True
+		g.status = 'done'
+		assert g.status == 'done'
+	assert errors == []
+# }}}
+
+def test_builder_signals_and_ids(make_gui, errors, monkeypatch): # {{{
+	calls = []
+	g, builders = make(make_gui, True, calls, monkeypatch)
+	objects = builders[0].objects
+	# The objects are looked up by their id, in the order of the description.
+	vbox = g.__windows__[0].children[0]
+	assert objects['gui0'] is vbox
+	assert objects['gui2'] is g.__name_widgets__['name']
+	assert objects['gui4'] is g.__name_widgets__['count']
+	assert set(objects.values()) >= set(g.__name_widgets__.values())
+	assert len(objects) == 13
+	g.name = 'typed'
+	g.__name_widgets__['name'].emit('activate')
+	vbox.children[-1].clicked()
+	assert calls == ['typed', 'typed']
+	assert errors == []
+# }}}
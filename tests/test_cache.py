@@ -0,0 +1,40 @@
+# Tests for the on-disk cache of parsed gui descriptions.
+
+import os
+import xml.etree.ElementTree as ET
+import gui
+
+FIRST = '''<Gtk>
+	<Window>
+		<Label value='text:first'/>
+	</Window>
+</Gtk>'''
+
+SECOND = '''<Gtk>
+	<Window>
+		<Label value='text:second, changed'/>
+	</Window>
+</Gtk>'''
+
+def test_cache_hit_and_invalidation(make_gui, errors, tmp_path, monkeypatch): # {{{
+	monkeypatch.setenv('GUI_CACHE', str(tmp_path / 'cache'))
+	parsed = []
+	parse = ET.parse
+	def counting_parse(*args, **kwargs):
+		parsed.append(args[0])
+		return parse(*args, **kwargs)
+	monkeypatch.setattr(ET, 'parse', counting_parse)
+	make_gui(FIRST, inputs = ('text',))
+	assert len(parsed) == 1
+	assert len(os.listdir(str(tmp_path / 'cache'))) == 1
+	# The description did not change, so it is not parsed again.
+	g = gui.Gui('test', 'test', inputs = ('text',), toolkit = 'null')
+	assert len(parsed) == 1
+	assert g.text == 'first'
+	g._shutdown(wait = False)
+	# Editing the file invalidates the entry.
+	g = make_gui(SECOND, inputs = ('text',))
+	assert len(parsed) == 2
+	assert g.text == 'second, changed'
+	assert errors == []
+# }}}
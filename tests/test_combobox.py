@@ -0,0 +1,36 @@
+# Tests for the text index of ComboBoxText.
+
+COMBO = '''<Gtk>
+	<Window>
+		<ComboBoxText value='row' text='text' content='content' changed='changed'/>
+	</Window>
+</Gtk>'''
+
+def test_index_round_trip(make_gui, errors): # {{{
+	changes = []
+	g = make_gui(COMBO, inputs = ('row', 'text'), outputs = ('content',), events = {'changed': lambda: changes.append(g.text)})
+	g.content = ['red', 'green', 'blue', 'green']
+	assert g.row == -1
+	assert g.text == ''
+	for text in ('red', 'green', 'blue'):
+		g.text = text
+		assert g.text == text
+	# A duplicate text selects its first row.
+	g.text = 'green'
+	assert g.row == 1
+	g.row = 3
+	assert g.text == 'green'
+	# An unknown text is appended and indexed.
+	g.text = 'black'
+	assert g.row == 4
+	g.row = 0
+	g.text = 'black'
+	assert g.row == 4
+	# New content replaces the index.
+	g.content = 'one\ntwo'
+	assert g.row == -1
+	g.text = 'two'
+	assert g.row == 1
+	assert changes[:3] == ['red', 'green', 'blue']
+	assert errors == []
+# }}}
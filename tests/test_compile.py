@@ -0,0 +1,132 @@
+# Tests for compiled gui descriptions.
+
+import os
+import xml.etree.ElementTree as ET
+import gui
+
+FORM = '''<Gtk>
+	<def name='field'>
+		<HBox>
+			<Label value='label'/>
+			<Entry value='value'/>
+		</HBox>
+	</def>
+	<Window>
+		<VBox>
+			<field label=':Name' value='name:nobody'/>
+			<field label=':Mail' value='mail'/>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def parse_counter(monkeypatch): # {{{
+	'''Count calls of ET.parse.'''
+	parsed = []
+	parse = ET.parse
+	def counting_parse(*args, **kwargs):
+		parsed.append(args[0])
+		return parse(*args, **kwargs)
+	monkeypatch.setattr(ET, 'parse', counting_parse)
+	return parsed
+# }}}
+
+def test_compiled_module_is_used(make_gui, errors, tmp_path, monkeypatch): # {{{
+	g = make_gui(FORM, inputs = ('name', 'mail'))
+	filename = str(tmp_path / 'test.gui')
+	compiled = gui.compile_gui(filename)
+	assert compiled == str(tmp_path / 'test_gui.py')
+	parsed = parse_counter(monkeypatch)
+	c = gui.Gui('test', 'test', inputs = ('name', 'mail'), toolkit = 'null')
+	c._shutdown(wait = False)
+	assert parsed == []
+	assert c._snapshot() == g._snapshot() == {'name': 'nobody', 'mail': ''}
+	# The defs are loaded as well, so _attach can use them.
+	assert set(c.__defs__) == {'field'}
+	# The module is valid Python.
+	namespace = {}
+	with open(compiled) as f:
+		exec(f.read(), namespace)
+	assert namespace['version'] == gui.__version__
+	assert errors == []
+# }}}
+
+def test_changed_description(make_gui, errors, tmp_path, monkeypatch): # {{{
+	make_gui(FORM, inputs = ('name', 'mail'))
+	filename = str(tmp_path / 'test.gui')
+	compiled = gui.compile_gui(filename)
+	def age(seconds):
+		'''Set the mtime of the module relative to that of the description.'''
+		st = os.stat(filename)
+		os.utime(compiled, ns = (st.st_atime_ns, st.st_mtime_ns + seconds * 10 ** 9))
+	parsed = parse_counter(monkeypatch)
+	# A module which is older than the description is not used, even if the size is the same.
+	make_gui(FORM.replace('nobody', 'nobodx'), inputs = ('name', 'mail'))
+	age(-1)
+	g = gui.Gui('test', 'test', inputs = ('name', 'mail'), toolkit = 'null')
+	g._shutdown(wait = False)
+	assert len(parsed) == 2
+	assert g.name == 'nobodx'
+	# A module for a description of a different size is not used, even if it is newer.
+	make_gui(FORM.replace('nobody', 'somebody'), inputs = ('name', 'mail'))
+	age(1)
+	g = gui.Gui('test', 'test', inputs = ('name', 'mail'), toolkit = 'null')
+	g._shutdown(wait = False)
+	assert len(parsed) == 4
+	assert g.name == 'somebody'
+	assert errors == []
+# }}}
+
+def test_code_is_not_run(make_gui, errors, tmp_path, monkeypatch): # {{{
+	make_gui(FORM, inputs = ('name', 'mail'))
+	compiled = gui.compile_gui(str(tmp_path / 'test.gui'))
+	marker = tmp_path / 'ran'
+	with open(compiled) as f:
+		text = f.read()
+	for evil in ('open(%r, "w")\n' % str(marker), 'data = open(%r, "w")\n' % str(marker)):
+		with open(compiled, 'w') as f:
+			f.write(text + evil)
+		parsed = parse_counter(monkeypatch)
+		g = gui.Gui('test', 'test', inputs = ('name', 'mail'), toolkit = 'null')
+		g._shutdown(wait = False)
+		assert not marker.exists()
+		assert len(parsed) == 1
+		assert g.name == 'nobody'
+	assert len(errors) == 2
+	assert all('ignoring compiled gui description' in e for e in errors)
+# }}}
+
+def test_command_line(make_gui, errors, tmp_path): # {{{
+	make_gui(FORM, inputs = ('name', 'mail'))
+	output = str(tmp_path / 'other.py')
+	gui.main([str(tmp_path / 'test.gui'), '-o', output])
+	assert os.path.exists(output)
+	assert not os.path.exists(str(tmp_path / 'test_gui.py'))
+	template = gui.Template(filename = str(tmp_path / 'test.gui'))
+	assert template.tree().children[0].tag == 'Window'
+	assert errors == []
+# }}}
+
+def test_cache_first(make_gui, errors, tmp_path, monkeypatch): # {{{
+	make_gui(FORM, inputs = ('name', 'mail'))
+	gui.compile_gui(str(tmp_path / 'test.gui'))
+	monkeypatch.setenv('GUI_CACHE', str(tmp_path / 'cache'))
+	used = []
+	load_compiled = gui.Gui.__load_compiled__
+	def counting_load(self, *args):
+		used.append(args[0])
+		return load_compiled(self, *args)
+	monkeypatch.setattr(gui.Gui, '__load_compiled__', counting_load)
+	for i in range(2):
+		g = gui.Gui('test', 'test', inputs = ('name', 'mail'), toolkit = 'null')
+		g._shutdown(wait = False)
+		assert g.name == 'nobody'
+	# The compiled module is used while there is no cache entry; it does not write one.
+	assert len(used) == 2
+	os.remove(str(tmp_path / 'test_gui.py'))
+	for i in range(2):
+		g = gui.Gui('test', 'test', inputs = ('name', 'mail'), toolkit = 'null')
+		g._shutdown(wait = False)
+	# After parsing, the cache entry is used, and the module is not looked for.
+	assert len(used) == 3
+	assert errors == []
+# }}}
@@ -0,0 +1,67 @@
+# Tests for DataTable and TableData.
+
+import pytest
+
+TABLE = '''<Gtk>
+	<Window>
+		<DataTable data='rows' sort='order:-name' columns='cols' select='pick'/>
+	</Window>
+</Gtk>'''
+
+INPUTS = ('rows', 'order', 'cols')
+
+ROWS = {'name': ['b', 'c', 'a'], 'size': [2, 3, 1]}
+
+def test_sort_before_data(make_gui, errors): # {{{
+	g = make_gui(TABLE, inputs = INPUTS, events = {'pick': lambda row: None})
+	assert g.order == '-name'
+	assert g.cols == []
+	table = g.__name_widgets__['rows']
+	assert table.shown() == []
+	g.rows = ROWS
+	assert errors == []
+	assert g.cols == ['name', 'size']
+	assert g.order == '-name'
+	assert [cells for row, cells in table.shown()] == [('c', 3), ('b', 2), ('a', 1)]
+# }}}
+
+def test_sort_by_index(make_gui, errors): # {{{
+	g = make_gui(TABLE, inputs = INPUTS, events = {'pick': lambda row: None})
+	g.rows = ROWS
+	g.order = '1'
+	assert g.order == 'size'
+	assert [row for row, cells in g.__name_widgets__['rows'].shown()] == [2, 0, 1]
+	g.order = None
+	assert g.order is None
+	assert [row for row, cells in g.__name_widgets__['rows'].shown()] == [0, 1, 2]
+	assert errors == []
+# }}}
+
+def test_invalid_sort(make_gui, errors): # {{{
+	g = make_gui(TABLE, inputs = INPUTS, events = {'pick': lambda row: None})
+	g.order = 'missing'
+	assert errors == []
+	g.rows = ROWS
+	assert len(errors) == 1
+	assert [row for row, cells in g.__name_widgets__['rows'].shown()] == [0, 1, 2]
+# }}}
+
+def test_reverse_sort_is_stable(make_gui, errors): # {{{
+	g = make_gui(TABLE, inputs = INPUTS, events = {'pick': lambda row: None})
+	table = g.__name_widgets__['rows']
+	sizes = [2, 1, 2, 3, 1, 2]
+	g.rows = {'name': list('abcdef'), 'size': sizes}
+	g.order = '-size'
+	expected = [3, 0, 2, 5, 1, 4]
+	assert [row for row, cells in table.shown()] == expected
+	g.order = 'size'
+	assert [row for row, cells in table.shown()] == [1, 4, 0, 2, 5, 3]
+	# NumPy columns give the same order, with and without a filter.
+	numpy = pytest.importorskip('numpy')
+	g.rows = {'name': numpy.array(list('abcdef')), 'size': numpy.array(sizes)}
+	g.order = '-size'
+	assert [row for row, cells in table.shown()] == expected
+	table.table.set_filter(numpy.array([True, True, True, False, True, True]))
+	assert [row for row, cells in table.shown()] == [0, 2, 5, 1, 4]
+	assert errors == []
+# }}}
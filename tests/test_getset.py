@@ -0,0 +1,29 @@
+# Tests for the compiled get and set callbacks.
+
+SPIN = '''<Gtk>
+	<Window>
+		<VBox>
+			<SpinButton value='value' range='range:0,100'/>
+			<Entry value='text'/>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def test_setter(make_gui, errors): # {{{
+	g = make_gui(SPIN, inputs = ('value', 'text'), outputs = ('range',))
+	get = g._getter('value')
+	native = g._setter('value')
+	native(12.5)
+	assert g.value == 12.5
+	assert get() == 12.5
+	# The native setter takes values of the right type; the other one parses strings.
+	parsing = g._setter('value', native = False)
+	parsing('30')
+	assert get() == 30.
+	g._setter('range')((0, 10))
+	assert g.value == 10.
+	# Names without a native callback get the normal one.
+	g._setter('text')('written')
+	assert g.text == 'written'
+	assert errors == []
+# }}}
@@ -0,0 +1,66 @@
+# Tests for frame buffers on Image.
+
+import time
+import pytest
+import gui
+
+IMAGE = '''<Gtk>
+	<Window>
+		<Image frame='frame' max_fps='fps'/>
+	</Window>
+</Gtk>'''
+
+def test_frame_buffer_tuple(errors): # {{{
+	data, width, height, channels, rowstride = gui.frame_buffer((bytes(2 * 3 * 4), 2, 3))
+	assert (width, height, channels, rowstride) == (2, 3, 4, 8)
+	assert len(data) == 24
+	data, width, height, channels, rowstride = gui.frame_buffer((bytearray(2 * 3 * 3), 2, 3))
+	assert (channels, rowstride) == (3, 6)
+	assert errors == []
+# }}}
+
+def test_frame_buffer_too_short(errors): # {{{
+	assert gui.frame_buffer((bytes(2 * 3 * 3 - 1), 2, 3)) is None
+	assert len(errors) == 1
+	assert 'too short' in errors[0]
+	assert gui.frame_buffer((bytes(2 * 3 * 5), 2, 3)) is None
+	assert len(errors) == 2
+# }}}
+
+def test_frame_buffer_array(errors): # {{{
+	numpy = pytest.importorskip('numpy')
+	frame = numpy.arange(4 * 5 * 3, dtype = numpy.uint8).reshape(4, 5, 3)
+	data, width, height, channels, rowstride = gui.frame_buffer(frame)
+	assert (width, height, channels, rowstride) == (5, 4, 3, 15)
+	assert data.obj is frame
+	# Rows which are not contiguous are copied.
+	data, width, height, channels, rowstride = gui.frame_buffer(frame[:, ::2])
+	assert (width, height, channels, rowstride) == (3, 4, 3, 9)
+	assert bytes(data) == frame[:, ::2].tobytes()
+	assert gui.frame_buffer(frame[:, :, 0]) is None
+	assert len(errors) == 1
+# }}}
+
+def test_max_fps_drops_frames(make_gui, errors, drain): # {{{
+	g = make_gui(IMAGE, inputs = ('frame', 'fps'))
+	image = g.__name_widgets__['frame']
+	frames = [(bytes([i]) * 12, 2, 2) for i in range(5)]
+	# Without a limit, every frame is shown.
+	for frame in frames:
+		g.frame = frame
+	assert image.shown_frames == 5
+	assert image.dropped_frames == 0
+	g.fps = 10
+	# The previous frame was just shown, so these wait; only the latest is kept.
+	start = time.monotonic()
+	for frame in frames:
+		g.frame = frame
+	assert image.shown_frames == 5
+	drain()
+	assert time.monotonic() - start >= .09
+	assert image.shown_frames == 6
+	assert image.dropped_frames == 4
+	assert g.frame is frames[-1]
+	assert bytes(image.pixbuf[0]) == bytes([4]) * 12
+	assert errors == []
+# }}}
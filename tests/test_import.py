@@ -0,0 +1,21 @@
+# Tests for the module attributes which load Gtk on first use.
+
+import sys
+import gui
+
+def test_unknown_name_does_not_load_gtk(): # {{{
+	loaded = 'gi' in sys.modules
+	assert not hasattr(gui, 'nonexistent')
+	assert not hasattr(gui, 'label')
+	assert ('gi' in sys.modules) == loaded
+# }}}
+
+def test_gtk_names_are_defined_by_load_gtk(): # {{{
+	# Every name in gtk_names must be a class defined by load_gtk.
+	import ast
+	with open(gui.__file__) as f:
+		tree = ast.parse(f.read())
+	load_gtk = [n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name == 'load_gtk'][0]
+	classes = set(n.name for n in load_gtk.body if isinstance(n, ast.ClassDef))
+	assert gui.gtk_names == classes | {'Gtk', 'GLib'}
+# }}}
@@ -0,0 +1,93 @@
+# Tests for windows which are built on first use.
+
+import pytest
+import gui
+
+DIALOG = '''<Gtk>
+	<Window>
+		<Entry value='name'/>
+	</Window>
+	<Dialog show='dlg'>
+		<Label value=':OK'/>
+		<Entry value='answer:42'/>
+	</Dialog>
+</Gtk>'''
+
+def test_snapshot_keeps_windows_deferred(make_gui, errors): # {{{
+	g = make_gui(DIALOG, inputs = ('name', 'dlg', 'answer'), lazy = True)
+	assert len(g.__lazy__) == 1
+	assert g._snapshot() == {'name': '', 'dlg': False, 'answer': '42'}
+	assert len(g.__lazy__) == 1
+	g.answer = 'set'
+	assert g._snapshot()['answer'] == 'set'
+	assert len(g.__lazy__) == 1
+	assert errors == []
+# }}}
+
+def test_dialog_show_before_showing(make_gui, errors): # {{{
+	g = make_gui(DIALOG, inputs = ('name', 'dlg', 'answer'), lazy = True)
+	assert g.answer == '42'
+	assert g.__lazy__ == []
+	assert g.dlg is False
+	g.dlg = True
+	assert g.dlg is True
+	assert g._snapshot() == {'name': '', 'dlg': True, 'answer': '42'}
+	assert errors == []
+# }}}
+
+def test_undeclared_name_in_deferred_window(make_gui, errors): # {{{
+	g = make_gui('''<Gtk>
+	<Window>
+		<Entry value='name'/>
+	</Window>
+	<Dialog show='dlg'>
+		<Entry value='anwser'/>
+		<Button clicked='cliked'>Go</Button>
+	</Dialog>
+</Gtk>''', inputs = ('name', 'dlg'), events = {}, lazy = True)
+	assert len(g.__lazy__) == 1
+	g.dlg = True
+	assert g.__lazy__ == []
+	assert any('anwser' in e for e in errors)
+	assert any('cliked' in e for e in errors)
+# }}}
+
+def test_failed_build_keeps_values(make_gui, errors, monkeypatch): # {{{
+	g = make_gui(DIALOG, inputs = ('name', 'dlg', 'answer'), lazy = True)
+	g.answer = 'kept'
+	build = gui.Gui.__build__
+	def fail(self, desc):
+		if desc.tag == 'Dialog':
+			return None
+		return build(self, desc)
+	def crash(self, desc):
+		raise RuntimeError('no display')
+	monkeypatch.setattr(gui.Gui, '__build__', fail)
+	g.dlg = True
+	assert len(g.__lazy__) == 1
+	assert any('unable to build deferred Dialog' in e for e in errors)
+	assert g.answer == 'kept'
+	monkeypatch.setattr(gui.Gui, '__build__', crash)
+	with pytest.raises(RuntimeError):
+		g.dlg = True
+	assert len(g.__lazy__) == 1
+	assert g._snapshot() == {'name': '', 'dlg': True, 'answer': 'kept'}
+	monkeypatch.setattr(gui.Gui, '__build__', build)
+	del errors[:]
+	assert g.answer == 'kept'
+	assert g.__lazy__ == []
+	assert g.dlg is True
+	assert errors == []
+# }}}
+
+def test_mirror_watches_deferred_window(make_gui, errors): # {{{
+	g = make_gui(DIALOG, inputs = ('name', 'dlg', 'answer'), lazy = True)
+	g._mirror()
+	assert g.answer == '42'
+	entry = g.__name_widgets__['answer']
+	# The names of the window are watched once it is built.
+	assert 'answer' in g.__mirror__.names[entry]
+	entry.set_text('typed')
+	assert g.answer == 'typed'
+	assert errors == []
+# }}}
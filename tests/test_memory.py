@@ -0,0 +1,57 @@
+# Tests for the memory accounting per tag.
+
+import tracemalloc
+
+BOXES = '''<Gtk>
+	<Window>
+		<VBox>
+			<Label value=':one'/>
+			<Label value=':two'/>
+			<Label value=':three'/>
+			<Entry value='name'/>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def test_memory_per_tag(make_gui, errors): # {{{
+	assert make_gui(BOXES, inputs = ('name',))._memory() == {}
+	assert len(errors) == 1 and 'tracemalloc was not tracing' in errors[0]
+	del errors[:]
+	tracemalloc.start()
+	try:
+		g = make_gui(BOXES, inputs = ('name',))
+	finally:
+		tracemalloc.stop()
+	memory = g._memory()
+	assert set(memory) == {'Window', 'VBox', 'Label', 'Entry'}
+	assert memory['Label']['count'] == 3
+	assert memory['Entry']['count'] == 1
+	for tag in memory:
+		assert memory[tag]['bytes'] > 0
+		assert memory[tag]['mean'] == memory[tag]['bytes'] / memory[tag]['count']
+	assert errors == []
+# }}}
+
+TABS = '''<Gtk>
+	<Window>
+		<Notebook>
+			<Label value=':one' label=':First'/>
+			<Label value=':two' label='second' page='show_two'/>
+		</Notebook>
+	</Window>
+</Gtk>'''
+
+def test_notebook_bookkeeping(make_gui, errors): # {{{
+	g = make_gui(TABS, inputs = ('second',), outputs = ('show_two',))
+	notebook = g.__name_widgets__['second'].get_parent()
+	first, second = notebook.children
+	# The tab labels and the page are kept by the notebook, not on the widgets.
+	assert notebook.labels == {first: 'First'}
+	assert not hasattr(first, 'mem_label') and not hasattr(notebook, 'mem_page')
+	g.second = 'Second'
+	assert g.second == 'Second'
+	assert notebook.labels[second] == 'Second'
+	g.show_two = True
+	assert notebook.get_current_page() == 1
+	assert errors == []
+# }}}
@@ -0,0 +1,69 @@
+# Tests for _mirror and _snapshot.
+
+import gui
+
+FORM = '''<Gtk>
+	<Window>
+		<VBox slot='box'>
+			<Entry value='name' changed='edited'/>
+			<TextView text='text' append='log'/>
+			<CheckButton value='check'>c</CheckButton>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def make(make_gui): # {{{
+	'''Build the form, and count the reads of the text from its widget.'''
+	g = make_gui(FORM, inputs = ('name', 'text', 'check'), outputs = ('log',), events = {'edited': lambda: None})
+	reads = [0]
+	read = g.__get__.compiled['text']
+	def counted():
+		reads[0] += 1
+		return read()
+	g.__get__['text'] = (counted, gui.NO_ARG)
+	return g, reads
+# }}}
+
+def test_reads_are_cached(make_gui, errors): # {{{
+	g, reads = make(make_gui)
+	g._mirror()
+	for i in range(10):
+		assert g.text == ''
+	assert reads[0] == 1
+	g.text = 'hello'
+	assert g.text == 'hello'
+	assert reads[0] == 2
+	g._mirror(False)
+	g.text
+	g.text
+	assert reads[0] == 4
+	assert errors == []
+# }}}
+
+def test_widget_changes(make_gui, errors, drain): # {{{
+	g, reads = make(make_gui)
+	g._mirror()
+	assert g.name == ''
+	entry = g.__name_widgets__['name']
+	entry.text = 'typed'
+	entry.emit('changed')
+	assert g.name == 'typed'
+	g.log = 'line\n'
+	drain()
+	assert g.text == 'line\n'
+	g._setter('check')(True)
+	snapshot = g._snapshot()
+	assert (snapshot['name'], snapshot['text'], snapshot['check']) == ('typed', 'line\n', True)
+	assert errors == []
+# }}}
+
+def test_attach(make_gui, errors): # {{{
+	g, reads = make(make_gui)
+	g._mirror()
+	h = g._attach('box', "<Entry value='other'/>")
+	g.other = 'x'
+	assert g.other == 'x'
+	g._detach(h)
+	assert all('other' not in names for names in g.__mirror__.names.values())
+	assert errors == []
+# }}}
@@ -0,0 +1,100 @@
+# Tests for Plot and PlotData.
+
+import pytest
+import gui
+
+PLOT = '''<Gtk>
+	<Window>
+		<Plot data='data' append='add' window='window' range='range'/>
+	</Window>
+</Gtk>'''
+
+def make(make_gui, width): # {{{
+	g = make_gui(PLOT, inputs = ('data', 'window', 'range'), outputs = ('add',))
+	plot = g.__name_widgets__['data']
+	plot.width = width
+	return g, plot
+# }}}
+
+def test_decimation(make_gui, errors): # {{{
+	g, plot = make(make_gui, 10)
+	g.data = [i % 7 for i in range(100)]
+	columns, minima, maxima = plot.render()
+	assert list(columns) == list(range(10))
+	assert list(minima) == [0] * 10 and list(maxima) == [6] * 10
+	assert plot.value_range() == (0, 6)
+	assert errors == []
+# }}}
+
+def test_partial_redraw(make_gui, errors): # {{{
+	g, plot = make(make_gui, 100)
+	g.range = '0,100'
+	g.window = 50
+	g.data = [1, 2]
+	plot.dirty = []
+	g.add = [3, 4]
+	g.add = 5
+	assert plot.dirty == [(1, 4), (3, 5)]
+	assert plot.scrolled == []
+	assert errors == []
+# }}}
+
+def test_scroll(make_gui, errors): # {{{
+	g, plot = make(make_gui, 4)
+	g.range = '0,100'
+	g.window = 8
+	g.data = [0]
+	plot.dirty = []
+	for i in range(1, 13):
+		g.add = i
+	# Two samples per column; the drawing moves one column for every two samples that scroll out.
+	assert None not in plot.dirty
+	assert sum(plot.scrolled) == 3
+	columns, minima, maxima = plot.render()
+	assert (list(columns), list(minima), list(maxima)) == ([0, 1, 2, 3], [6, 8, 10, 12], [7, 9, 11, 12])
+	g.add = 13
+	assert plot.scrolled[-1] == 0
+	assert plot.render()[2][-1] == 13
+	g.add = 14
+	assert plot.scrolled[-1] == 1
+	assert list(plot.render()[1]) == [8, 10, 12, 14]
+	assert errors == []
+# }}}
+
+def test_scroll_matches_set(make_gui, errors): # {{{
+	'''The scrolled drawing is the same as when the data is set at once, if the window is aligned.'''
+	g, plot = make(make_gui, 10)
+	g.window = 30
+	g.data = []
+	for i in range(90):
+		g.add = (i * 7) % 11
+	scrolled = plot.render()
+	g.data = [(i * 7) % 11 for i in range(60, 90)]
+	assert plot.render() == scrolled
+	assert errors == []
+# }}}
+
+def test_no_window(make_gui, errors): # {{{
+	g, plot = make(make_gui, 100)
+	g.range = '0,100'
+	g.data = [1, 2, 3, 4]
+	plot.dirty = []
+	# The scale doubles, so only every doubling draws everything.
+	for i in range(28):
+		g.add = i
+	assert plot.dirty.count(None) == 3
+	assert plot.plot.span() == 32
+	assert errors == []
+# }}}
+
+def test_numpy(make_gui, errors): # {{{
+	numpy = pytest.importorskip('numpy')
+	g, plot = make(make_gui, 4)
+	g.window = 8
+	g.data = numpy.zeros(0)
+	for i in range(13):
+		g.add = i
+	columns, minima, maxima = plot.render()
+	assert (list(columns), list(minima), list(maxima)) == ([0, 1, 2, 3], [6, 8, 10, 12], [7, 9, 11, 12])
+	assert errors == []
+# }}}
@@ -0,0 +1,34 @@
+# Tests for _post.
+
+import threading
+
+ENTRIES = '''<Gtk>
+	<Window>
+		<VBox>
+			<Entry value='a'/>
+			<Entry value='b'/>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def test_post(make_gui, errors, drain): # {{{
+	g = make_gui(ENTRIES, inputs = ('a', 'b'))
+	def post():
+		for i in range(100):
+			g._post(a = str(i))
+		g._post({'b': 'done'})
+	t = threading.Thread(target = post)
+	t.start()
+	t.join()
+	assert g.a == ''
+	drain()
+	assert (g.a, g.b) == ('99', 'done')
+	assert errors == []
+# }}}
+
+def test_post_unknown_name(make_gui, errors, drain): # {{{
+	g = make_gui(ENTRIES, inputs = ('a', 'b'))
+	g._post(missing = 1)
+	drain()
+	assert len(errors) == 1
+# }}}
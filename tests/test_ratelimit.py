@@ -0,0 +1,83 @@
+# Tests for the debounce and throttle event options.
+
+import gui
+
+FORM = '''<Gtk>
+	<Window>
+		<VBox slot='box'>
+			<Entry value='name' changed='edited:%s'/>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def make(make_gui, options): # {{{
+	'''Build a gui with an Entry whose changed event has the options.
+	Return the gui, a function that types text in the entry, and the list of values the handler saw.'''
+	calls = []
+	g = make_gui(FORM % options, inputs = ('name',), events = {'edited': lambda: calls.append(g.name)})
+	entry = g.__name_widgets__['name']
+	def type(text):
+		entry.text = text
+		entry.emit('changed')
+	return g, type, calls
+# }}}
+
+def test_debounce_trailing(make_gui, errors, drain): # {{{
+	g, type, calls = make(make_gui, 'debounce=20')
+	for text in ('a', 'ab', 'abc'):
+		type(text)
+	assert calls == []
+	drain()
+	assert calls == ['abc']
+	assert errors == []
+# }}}
+
+def test_debounce_leading(make_gui, errors, drain): # {{{
+	g, type, calls = make(make_gui, 'debounce=20,leading')
+	for text in ('a', 'ab', 'abc'):
+		type(text)
+	assert calls == ['a']
+	drain()
+	assert calls == ['a']
+	# After the interval, a new burst starts.
+	type('x')
+	assert calls == ['a', 'x']
+	assert errors == []
+# }}}
+
+def test_throttle(make_gui, errors, drain): # {{{
+	g, type, calls = make(make_gui, 'throttle=20')
+	for text in ('a', 'ab', 'abc'):
+		type(text)
+	assert calls == ['a']
+	drain()
+	assert calls == ['a', 'abc']
+	assert g.__event_rate__['edited'].source is None
+	assert errors == []
+# }}}
+
+def test_throttle_leading_only(make_gui, errors, drain): # {{{
+	g, type, calls = make(make_gui, 'throttle=20,leading')
+	for text in ('a', 'ab'):
+		type(text)
+	drain()
+	assert calls == ['a']
+	assert errors == []
+# }}}
+
+def test_cancel_on_detach(make_gui, errors, drain): # {{{
+	calls = []
+	g = make_gui(FORM % 'debounce=20', inputs = ('name',), events = {'edited': lambda: calls.append(g.name)})
+	h = g._attach('box', "<Entry value='other' changed='typed:debounce=20'/>", events = {'typed': lambda: calls.append('typed')})
+	entry = h.widgets[0]
+	entry.emit('changed')
+	limit = g.__event_rate__['typed']
+	assert limit.source is not None
+	g._detach(h)
+	assert 'typed' not in g.__event_rate__
+	with gui.null_loop.cond:
+		assert all(t[1] != limit.source for t in gui.null_loop.timeouts)
+	drain()
+	assert calls == []
+	assert errors == []
+# }}}
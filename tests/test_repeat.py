@@ -0,0 +1,120 @@
+# Tests for Repeat and _row.
+
+DEVICES = '''<Gtk>
+	<def name='DeviceRow'><HBox><Label value='name'/><SpinButton value='level' range=':0,100'/><Button clicked='remove'>X</Button></HBox></def>
+	<Window>
+		<VBox>
+			<Repeat items='devices' key='id'><DeviceRow/></Repeat>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+WORDS = '''<Gtk>
+	<Window>
+		<Repeat items='words'><Label value='item'/></Repeat>
+	</Window>
+</Gtk>'''
+
+def devices(*ids): # {{{
+	return [{'id': i, 'name': 'dev%d' % i, 'level': i} for i in ids]
+# }}}
+
+def make(make_gui, removed = None): # {{{
+	'''Build the devices gui; return it and the Repeat widget.'''
+	g = make_gui(DEVICES, inputs = ('devices',), events = {'remove': lambda key: removed.append(key)})
+	return g, g.__name_widgets__['devices']
+# }}}
+
+def names(repeat): # {{{
+	'''Return the texts of the name labels of the rows, in order.'''
+	return [row.children[0].text for row in repeat.children]
+# }}}
+
+def test_rows(make_gui, errors): # {{{
+	g, repeat = make(make_gui)
+	g.devices = devices(0, 1, 2)
+	assert names(repeat) == ['dev0', 'dev1', 'dev2']
+	assert g._row('devices', 1).name == 'dev1'
+	assert g._row('devices', 1).level == 1
+	assert errors == []
+# }}}
+
+def test_reconcile(make_gui, errors): # {{{
+	g, repeat = make(make_gui)
+	g.devices = devices(0, 1, 2, 3)
+	widgets = {key: repeat.children[i] for i, key in enumerate((0, 1, 2, 3))}
+	# Changes by the user are kept, as long as the item does not change.
+	g._row('devices', 2).level = 42
+	g.devices = devices(3, 0, 2, 5)
+	assert names(repeat) == ['dev3', 'dev0', 'dev2', 'dev5']
+	assert repeat.children[:3] == [widgets[3], widgets[0], widgets[2]]
+	assert widgets[1] not in repeat.children
+	assert g._row('devices', 2).level == 42
+	assert sorted(repeat.rows) == [0, 2, 3, 5]
+	g.devices = []
+	assert repeat.children == [] and repeat.rows == {}
+	assert errors == []
+# }}}
+
+def test_changed_item(make_gui, errors): # {{{
+	g, repeat = make(make_gui)
+	g.devices = devices(0, 1)
+	first = repeat.children[0]
+	g.devices = [{'id': 0, 'name': 'renamed', 'level': 7}] + devices(1)
+	assert repeat.children[0] is first
+	assert names(repeat) == ['renamed', 'dev1']
+	assert g._row('devices', 0).level == 7
+	assert errors == []
+# }}}
+
+def test_row_events(make_gui, errors): # {{{
+	removed = []
+	g, repeat = make(make_gui, removed)
+	g.devices = devices(4, 7)
+	repeat.children[1].children[2].clicked()
+	repeat.children[0].children[2].clicked()
+	assert removed == [7, 4]
+	assert errors == []
+# }}}
+
+def test_items_without_key(make_gui, errors): # {{{
+	g = make_gui(WORDS, inputs = ('words',))
+	repeat = g.__name_widgets__['words']
+	g.words = ['a', 'b']
+	first = repeat.children[0]
+	g.words = ['c', 'a']
+	assert [row.text for row in repeat.children] == ['c', 'a']
+	assert repeat.children[1] is first
+	assert g._row('words', 'c').item == 'c'
+	assert errors == []
+# }}}
+
+GROUPS = '''<Gtk>
+	<Window>
+		<Repeat items='groups' key='id'>
+			<VBox>
+				<Label value='name'/>
+				<HBox slot='extra'/>
+				<Repeat items='members'><Button clicked='pick'><Label value='item'/></Button></Repeat>
+			</VBox>
+		</Repeat>
+	</Window>
+</Gtk>'''
+
+def test_row_slots_and_nesting(make_gui, errors): # {{{
+	picked = []
+	g = make_gui(GROUPS, inputs = ('groups',), events = {'pick': lambda *keys: picked.append(keys)})
+	# Only the names of the gui itself are registered with it.
+	assert set(g.__containers__) == set()
+	assert set(g.__repeats__) == {'groups'}
+	g.groups = [{'id': 1, 'name': 'a', 'members': ['x', 'y']}, {'id': 2, 'name': 'b', 'members': ['z']}]
+	assert set(g.__containers__) == set()
+	row = g._row('groups', 2)
+	h = row._attach('extra', "<Label value=':more'/>")
+	assert [w.text for w in h.widgets] == ['more']
+	assert row._row('members', 'z').item == 'z'
+	g._row('groups', 1)._row('members', 'y').__name_widgets__['item'].get_parent().clicked()
+	# Events of nested rows get the keys of all rows that contain them.
+	assert picked == [(1, 'y')]
+	assert errors == []
+# }}}
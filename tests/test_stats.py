@@ -0,0 +1,46 @@
+# Tests for the timing of event handlers and set callbacks.
+
+import json
+import pytest
+
+FORM = '''<Gtk>
+	<Window>
+		<VBox>
+			<Entry value='name' activate='go'/>
+			<Label value='status'/>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def test_stats_count_calls(make_gui, errors, tmp_path): # {{{
+	g = make_gui(FORM, inputs = ('name',), outputs = ('status',), events = {'go': lambda: None})
+	entry = g.__name_widgets__['name']
+	entry.emit('activate')
+	g.status = 'not recorded'
+	assert g._stats() == {}
+	g._instrument()
+	for i in range(3):
+		entry.emit('activate')
+	for i in range(5):
+		g.status = str(i)
+	assert g.status == '4'
+	filename = str(tmp_path / 'stats.json')
+	stats = g._stats(filename = filename)
+	assert stats['event']['go']['count'] == 3
+	assert stats['set']['status']['count'] == 5
+	assert 'name' not in stats['set']
+	for summary in (stats['event']['go'], stats['set']['status']):
+		assert 0 <= summary['p50'] <= summary['max']
+		assert summary['mean'] * summary['count'] == pytest.approx(summary['total'])
+	with open(filename) as f:
+		assert json.load(f) == stats
+	# Stopping keeps the results, and nothing more is counted.
+	g._instrument(False)
+	entry.emit('activate')
+	g.status = 'after'
+	stats = g._stats(reset = True)
+	assert stats['event']['go']['count'] == 3
+	assert stats['set']['status']['count'] == 5
+	assert g._stats() == {'event': {}, 'set': {}}
+	assert errors == []
+# }}}
@@ -0,0 +1,37 @@
+# Tests for Template.
+
+import os
+import gui
+
+ROWS = '''<Gtk>
+	<def name='Row'><HBox><Label value='label'/><Entry value='name'/></HBox></def>
+	<Window>
+		<VBox>
+			<Row label=':a' name='x'/>
+			<Row label=':b' name='y'/>
+			<Button clicked='go'>Go</Button>
+		</VBox>
+	</Window>
+</Gtk>'''
+
+def test_template(tmp_path, monkeypatch, errors): # {{{
+	(tmp_path / 'rows.gui').write_text(ROWS)
+	monkeypatch.setenv('GUI_PATH', str(tmp_path))
+	monkeypatch.setenv('GUI_CACHE', '')
+	t = gui.Template('rows', 'rows')
+	# The file is not read again.
+	os.unlink(str(tmp_path / 'rows.gui'))
+	hits = []
+	guis = [t(toolkit = 'null', inputs = ('x', 'y'), events = {'go': lambda i = i: hits.append(i)}) for i in range(3)]
+	guis[0].x = 'one'
+	guis[1].x = 'two'
+	assert [g.x for g in guis] == ['one', 'two', '']
+	assert guis[0].__get__ is not guis[1].__get__
+	assert sorted(guis[2].__defs__) == ['Row']
+	assert guis[2].__execname__ == 'rows'
+	# Every gui calls its own handler.
+	for g in guis:
+		g.__name_widgets__['x'].get_parent().get_parent().children[-1].clicked()
+	assert hits == [0, 1, 2]
+	assert errors == []
+# }}}
@@ -0,0 +1,56 @@
+# Tests for appending to a TextView.
+
+LOG = '''<Gtk>
+	<Window>
+		<TextView text='text' append='log' max_lines='limit' autoscroll='scroll'/>
+	</Window>
+</Gtk>'''
+
+NAMES = ('text', 'log', 'limit', 'scroll')
+
+def test_append(make_gui, errors, drain): # {{{
+	g = make_gui(LOG, inputs = NAMES)
+	view = g.__name_widgets__['text']
+	g.log = 'first'
+	g.log = 'second\nthird\n'
+	# Lines are written to the buffer once per frame.
+	assert g.text == ''
+	assert g.log == 'third'
+	drain()
+	assert g.text == 'first\nsecond\nthird\n'
+	assert not view.scrolled
+	g.scroll = True
+	g.log = 4
+	drain()
+	assert g.text == 'first\nsecond\nthird\n4\n'
+	assert view.scrolled
+	assert errors == []
+# }}}
+
+def test_max_lines(make_gui, errors, drain): # {{{
+	g = make_gui(LOG, inputs = NAMES)
+	g.limit = 3
+	for i in range(10):
+		g.log = str(i)
+	# Only the lines that will be kept are queued.
+	assert len(g.__name_widgets__['text'].log_pending) == 3
+	drain()
+	assert g.text == '7\n8\n9\n'
+	g.log = 'a\nb'
+	drain()
+	assert g.text == '9\na\nb\n'
+	assert errors == []
+# }}}
+
+def test_max_lines_without_final_newline(make_gui, errors, drain): # {{{
+	g = make_gui(LOG, inputs = NAMES)
+	g.text = 'one\ntwo\nthree'
+	g.limit = 3
+	g.log = ' and more'
+	drain()
+	assert g.text == 'one\ntwo\nthree and more\n'
+	g.log = 'four'
+	drain()
+	assert g.text == 'two\nthree and more\nfour\n'
+	assert errors == []
+# }}}